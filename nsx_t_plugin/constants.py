@@ -21,6 +21,15 @@ STATE_SUCCESS = 'success'
 
 # SEGMENTS
 TASK_DELETE = 'delete_task'
+# DHCP static bindings are usually realized within few seconds
+STATIC_BINDING_INITIAL_DELAY = 0.5
+
+# REALIZATION
+# Seconds to wait for a resource to be realized inside the operation before
+# falling back to retry the operation
+REALIZATION_TIMEOUT = 60
+REALIZATION_INITIAL_DELAY = 1
+REALIZATION_MAX_DELAY = 10
 
 # OPERATIONS
 DELETE_OPERATION = 'cloudify.interfaces.lifecycle.delete'
@@ -35,3 +44,4 @@ NSXT_ID_PROPERTY = 'id'
 NSXT_NAME_PROPERTY = 'name'
 NSXT_TYPE_PROPERTY = 'type'
 NSXT_RESOURCE_CONFIG_PROPERTY = 'resource_config'
+NSXT_METRICS_PROPERTY = 'api_metrics'
@@ -23,7 +23,11 @@ from cloudify.utils import exception_to_error_cause
 from cloudify.decorators import operation
 from cloudify import ctx as CloudifyContext
 
+from com.vmware.vapi.std.errors_client import ServiceUnavailable
+
+from nsx_t_sdk import metrics
 from nsx_t_plugin.utils import (
+    export_operation_metrics,
     get_ctx_object,
     populate_nsx_t_instance_from_ctx,
     update_runtime_properties_for_instance
@@ -43,9 +47,26 @@ def with_nsx_t_client(class_decl):
                 kwargs
             )
             try:
-                func(**kwargs)
+                with metrics.collect() as collector:
+                    try:
+                        resource = func(**kwargs)
+                    finally:
+                        export_operation_metrics(
+                            kwargs['nsx_t_resource'],
+                            _ctx,
+                            operation_name,
+                            collector
+                        )
             except OperationRetry:
                 raise
+            except ServiceUnavailable as error:
+                # The manager is still throttling or unavailable after the
+                # api call was retried, so retry the whole operation later
+                # instead of failing the deployment
+                raise OperationRetry(
+                    'NSX-T Manager is unavailable while trying to run '
+                    'operation: {0}: {1}'.format(operation_name, error)
+                )
             except Exception as error:
                 _, _, tb = sys.exc_info()
                 raise NonRecoverableError(
@@ -56,7 +77,8 @@ def with_nsx_t_client(class_decl):
                 update_runtime_properties_for_instance(
                     kwargs['nsx_t_resource'],
                     _ctx,
-                    operation_name
+                    operation_name,
+                    resource
                 )
         return wrapper
     return operation(func=_decorator, resumable=True)
@@ -27,9 +27,9 @@ def _update_tier_1_gateway(client_config, tier1_gateway_id, dhcp_server_paths):
         },
         logger=ctx.logger
     )
-    tier1_object = tier1.get(to_dict=False)
-    tier1_object.dhcp_config_paths = dhcp_server_paths
-    tier1.update(tier1_gateway_id, tier1_object)
+    # Only the DHCP config paths are sent, so other changes of the gateway
+    # are kept, and nothing is sent if the gateway is already up to date
+    tier1.patch_delta({'dhcp_config_paths': dhcp_server_paths})
 
 
 def _link_dhcp_server_to_tier_1(client_config, tier1_gateway_id):
@@ -57,6 +57,7 @@ def create(nsx_t_resource):
 
     # Save path as runtime property to use it later on
     ctx.instance.runtime_properties['path'] = resource.path
+    return resource
 
 
 @with_nsx_t_client(DhcpServerConfig)
@@ -0,0 +1,186 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+import time
+
+from cloudify import ctx
+
+from com.vmware.vapi.std.errors_client import NotFound
+
+from nsx_t_plugin.decorators import with_nsx_t_client
+from nsx_t_plugin.constants import (
+    STATE_IN_PROGRESS,
+    STATE_SUCCESS,
+    STATE_PENDING,
+    STATE_IN_SYNC,
+    TASK_DELETE
+)
+from nsx_t_plugin.utils import (
+    get_realization_timeout,
+    update_subnet_configuration,
+    wait_for_resource_started,
+    wait_for_resources_deleted
+)
+from nsx_t_sdk.hierarchical import HierarchicalBatch
+from nsx_t_sdk.resources import (
+    Infra,
+    Segment,
+    SegmentState,
+    Tier1,
+    Tier1state,
+    DhcpServerConfig,
+    DhcpV4StaticBindingConfig,
+    DhcpV6StaticBindingConfig,
+    DhcpStaticBindingState
+)
+
+# The order of the resources follow the dependencies between them, so that
+# DHCP servers are created before the gateways that use them and gateways
+# are created before the segments connected to them
+INFRA_RESOURCES = (
+    ('dhcp_server_configs', DhcpServerConfig),
+    ('tier1s', Tier1),
+    ('segments', Segment),
+)
+INFRA_STATIC_BINDINGS = (
+    ('dhcp_v4_static_bindings', DhcpV4StaticBindingConfig),
+    ('dhcp_v6_static_bindings', DhcpV6StaticBindingConfig),
+)
+
+
+def _get_infra_resources(client_config, resource_config):
+    """
+    Generate all resources declared in the infra resource config
+    :param client_config: NSXT client config
+    :param resource_config: Infra resource config
+    :return: Generator of tuples (resource, parent)
+    """
+    for config_key, class_type in INFRA_RESOURCES:
+        for config in resource_config.get(config_key) or []:
+            config = copy.deepcopy(config)
+            if class_type is Segment:
+                update_subnet_configuration(config)
+            yield class_type(
+                client_config=client_config,
+                resource_config=config,
+                logger=ctx.logger
+            ), None
+
+    for config_key, class_type in INFRA_STATIC_BINDINGS:
+        for config in resource_config.get(config_key) or []:
+            config = copy.deepcopy(config)
+            segment = Segment(
+                client_config=client_config,
+                resource_config={'id': config.pop('segment_id')},
+                logger=ctx.logger
+            )
+            yield class_type(
+                client_config=client_config,
+                resource_config=config,
+                logger=ctx.logger
+            ), segment
+
+
+def _apply_infra_resources(nsx_t_resource, marked_for_delete=False):
+    batch = HierarchicalBatch(nsx_t_resource.client_config, ctx.logger)
+    for resource, parent in _get_infra_resources(
+            nsx_t_resource.client_config,
+            nsx_t_resource.resource_config
+    ):
+        batch.add(
+            resource,
+            parent=parent,
+            marked_for_delete=marked_for_delete
+        )
+    batch.apply()
+
+
+@with_nsx_t_client(Infra)
+def create(nsx_t_resource):
+    _apply_infra_resources(nsx_t_resource)
+    # Infra does not have its own id, so use the node instance id
+    nsx_t_resource.resource_id = ctx.instance.id
+
+
+@with_nsx_t_client(Infra)
+def start(nsx_t_resource):
+    client_config = nsx_t_resource.client_config
+    # All resources share the same realization timeout
+    deadline = time.time() + get_realization_timeout(nsx_t_resource)
+    for resource, parent in _get_infra_resources(
+            client_config,
+            nsx_t_resource.resource_config
+    ):
+        if isinstance(resource, Segment):
+            state, args = SegmentState, (resource.resource_id,)
+            ready_states = [STATE_SUCCESS]
+        elif isinstance(resource, Tier1):
+            state, args = Tier1state, (resource.resource_id,)
+            ready_states = [STATE_SUCCESS, STATE_IN_SYNC]
+        elif parent:
+            state = DhcpStaticBindingState
+            args = (parent.resource_id, resource.resource_id,)
+            ready_states = [STATE_SUCCESS, STATE_IN_SYNC]
+        else:
+            continue
+        wait_for_resource_started(
+            '{0} {1}'.format(resource.resource_type, resource.resource_id),
+            state(
+                client_config=client_config,
+                resource_config={},
+                logger=ctx.logger
+            ),
+            [STATE_PENDING, STATE_IN_PROGRESS],
+            ready_states,
+            args=args,
+            timeout=max(deadline - time.time(), 0)
+        )
+
+
+@with_nsx_t_client(Infra)
+def delete(nsx_t_resource):
+    # Send the delete request only once and then wait for all resources on
+    # the next retries
+    if not ctx.instance.runtime_properties.get(TASK_DELETE):
+        _apply_infra_resources(nsx_t_resource, marked_for_delete=True)
+        ctx.instance.runtime_properties[TASK_DELETE] = True
+
+    resources = [
+        (resource, (parent.resource_id, resource.resource_id,)
+         if parent else None)
+        for resource, parent in _get_infra_resources(
+            nsx_t_resource.client_config,
+            nsx_t_resource.resource_config
+        )
+    ]
+
+    def _list_remaining_resources():
+        remaining = []
+        for resource, args in resources:
+            try:
+                resource.get(args=args, fields=['id'])
+            except NotFound:
+                continue
+            remaining.append(resource)
+        return remaining
+
+    # All the resources are polled together, so that the operation is not
+    # retried once per resource that is still deleted
+    wait_for_resources_deleted(
+        'Infra',
+        _list_remaining_resources,
+        get_realization_timeout(nsx_t_resource)
+    )
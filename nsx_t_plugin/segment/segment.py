@@ -14,40 +14,41 @@
 #    * limitations under the License.
 
 import time
+from functools import partial
 
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError
 
+from com.vmware.vapi.std.errors_client import NotFound, ServiceUnavailable
+
 from nsx_t_plugin.decorators import with_nsx_t_client
 from nsx_t_plugin.constants import (
     STATE_IN_PROGRESS,
     STATE_SUCCESS,
     STATE_PENDING,
-    STATE_IN_SYNC
+    STATE_IN_SYNC,
+    STATIC_BINDING_INITIAL_DELAY
 )
 from nsx_t_plugin.utils import (
-    validate_if_resource_started,
+    wait_for_resource_started,
+    wait_for_resources_started,
+    wait_for_resources_deleted,
+    get_realization_timeout,
+    update_subnet_configuration,
     validate_if_resource_deleted
 )
+from nsx_t_sdk.executor import BoundedExecutor
+from nsx_t_sdk.exceptions import ConcurrentTaskError
 from nsx_t_sdk.resources import (
     Segment,
     SegmentState,
+    DhcpStaticBindingConfigs,
     DhcpV4StaticBindingConfig,
     DhcpV6StaticBindingConfig,
     DhcpStaticBindingState
 )
 
 
-def _update_subnet_configuration(resource_config):
-    subnet = resource_config.pop('subnet', {})
-    if subnet:
-        resource_config['subnets'] = []
-        for ip_option in ['ip_v4_config', 'ip_v6_config']:
-            ip_option_config = subnet.get(ip_option)
-            if ip_option_config:
-                resource_config['subnets'].append(ip_option_config)
-
-
 def _get_networks_info_from_inputs(
         network_unique_id,
         ip_v4_address,
@@ -99,120 +100,191 @@ def _prepare_dhcp_static_binding_configs(
     return dhcp_v4_config, dhcp_v6_config
 
 
-def _handle_dhcp_static_bindings(
-        class_type,
-        dhcp_type,
+def _put_dhcp_static_binding(dhcp_binding, segment_id, dhcp_config):
+    response = dhcp_binding.update(
+        segment_id,
+        dhcp_binding.resource_id,
+        dhcp_config
+    )
+    # Keep the time of the request in order to compute the realization
+    # latency of the binding even when the operation is retried
+    return response, time.time()
+
+
+def _set_dhcp_static_binding(dhcp_type, dhcp_binding, response, created_at):
+    tasks = ctx.target.instance.runtime_properties.setdefault('tasks', {})
+    tasks[dhcp_binding.resource_id] = created_at
+    ctx.target.instance.runtime_properties[
+        'dhcp_{0}_static_binding_id'.format(dhcp_type)] = \
+        dhcp_binding.resource_id
+    ctx.target.instance.runtime_properties[
+        'dhcp_{0}_static_binding'.format(dhcp_type)] = response.to_dict()
+
+
+def _wait_on_created_dhcp_static_bindings(
         segment_id,
         client_config,
-        dhcp_config):
+        binding_ids):
+    static_state = DhcpStaticBindingState(
+        client_config=client_config,
+        resource_config={},
+        logger=ctx.logger
+    )
+    resources = [
+        ('DhcpStaticBinding {0}'.format(binding_id),
+         static_state,
+         (segment_id, binding_id,))
+        for binding_id in binding_ids
+    ]
+    ready_at = wait_for_resources_started(
+        resources,
+        [STATE_PENDING, STATE_IN_PROGRESS],
+        [STATE_SUCCESS, STATE_IN_SYNC],
+        initial_delay=STATIC_BINDING_INITIAL_DELAY
+    )
+    tasks = ctx.target.instance.runtime_properties['tasks']
+    latency = ctx.target.instance.runtime_properties.setdefault(
+        'dhcp_static_bindings_latency', {}
+    )
+    for (resource_name, _, _), binding_id in zip(resources, binding_ids):
+        created_at = tasks.get(binding_id)
+        # Bindings created before the latency was recorded are marked
+        # only as `True`
+        if isinstance(created_at, bool) or resource_name not in ready_at:
+            continue
+        latency[binding_id] = round(ready_at[resource_name] - created_at, 3)
+        ctx.logger.info(
+            'DhcpStaticBinding {0} realized after {1} seconds'.format(
+                binding_id, latency[binding_id])
+        )
+
+
+def _create_dhcp_static_binding_configs(
+        segment_id,
+        client_config,
+        dhcp_v4_config,
+        dhcp_v6_config
+):
     tasks = ctx.target.instance.runtime_properties.setdefault('tasks', {})
-    if dhcp_config:
+    executor = BoundedExecutor()
+    bindings = {}
+    binding_ids = []
+    for class_type, dhcp_type, dhcp_config in (
+            (DhcpV4StaticBindingConfig, 'v4', dhcp_v4_config),
+            (DhcpV6StaticBindingConfig, 'v6', dhcp_v6_config)
+    ):
+        if not dhcp_config:
+            continue
         dhcp_binding = class_type(
             client_config=client_config,
             logger=ctx.logger,
             resource_config=dhcp_config)
+        bindings[dhcp_type] = dhcp_binding
+        binding_ids.append(dhcp_binding.resource_id)
+        # Bindings created by previous run of the operation are only waited
         if not tasks.get(dhcp_binding.resource_id):
-            dhcp_binding_response = dhcp_binding.update(
+            executor.submit(
+                dhcp_type,
+                _put_dhcp_static_binding,
+                dhcp_binding,
                 segment_id,
-                dhcp_binding.resource_id,
                 dhcp_config
             )
-            tasks[dhcp_binding.resource_id] = True
-            ctx.target.instance.runtime_properties[
-                'dhcp_{0}_static_binding_id'.format(dhcp_type)] = \
-                dhcp_binding.resource_id
-            ctx.target.instance.runtime_properties[
-                'dhcp_{0}_static_binding'.format(dhcp_type)] = \
-                dhcp_binding_response.to_dict()
 
-        ctx.logger.info(
-            'Waiting 30 seconds before get'
-            ' the state of the bindings'
+    # Both bindings are created concurrently and then their states are
+    # polled together, so that one binding does not wait for the other
+    failure = None
+    try:
+        responses = executor.run()
+    except ConcurrentTaskError as error:
+        failure = error
+        responses = error.results
+    # Record the created bindings even when the other one failed so that
+    # they are not created again when the operation is retried
+    for dhcp_type, (response, created_at) in responses.items():
+        _set_dhcp_static_binding(
+            dhcp_type,
+            bindings[dhcp_type],
+            response,
+            created_at
         )
-        time.sleep(30)
-        static_state = DhcpStaticBindingState(
-            client_config=client_config,
-            resource_config={},
-            logger=ctx.logger
+    if failure:
+        for error in failure.errors.values():
+            # The manager is still throttling or unavailable, so the error
+            # is raised as is for the operation to be retried later
+            if isinstance(error, ServiceUnavailable):
+                raise error
+        raise NonRecoverableError(
+            'Failed to create DHCP static bindings: {0}'.format(failure)
         )
-        validate_if_resource_started(
-            'DhcpStaticBinding',
-            static_state,
-            [STATE_PENDING, STATE_IN_PROGRESS],
-            [STATE_SUCCESS, STATE_IN_SYNC],
-            args=(segment_id, dhcp_binding.resource_id,)
+
+    if binding_ids:
+        _wait_on_created_dhcp_static_bindings(
+            segment_id,
+            client_config,
+            binding_ids
         )
 
 
-def _create_dhcp_static_binding_configs(
-        segment_id,
-        client_config,
-        dhcp_v4_config,
-        dhcp_v6_config
-):
-    _handle_dhcp_static_bindings(
-        DhcpV4StaticBindingConfig,
-        'v4',
-        segment_id,
-        client_config,
-        dhcp_v4_config
-    )
-    _handle_dhcp_static_bindings(
-        DhcpV6StaticBindingConfig,
-        'v6',
-        segment_id,
-        client_config,
-        dhcp_v6_config
-    )
+def _list_dhcp_static_bindings(dhcp_binding, segment_id):
+    # V4 & V6 bindings are listed using the same api
+    return [
+        static_binding['id'] for static_binding in dhcp_binding.iter_list(
+            filters={
+                'segment_id': segment_id
+            },
+            fields=DhcpStaticBindingConfigs.id_fields
+        )
+    ]
 
 
-def _wait_on_dhcp_static_bindings(segment_id, client_config):
-    dhcp_v4_binding = DhcpV4StaticBindingConfig(
-        client_config=client_config,
-        resource_config={},
-        logger=ctx.logger
-    )
+def _delete_dhcp_static_binding(dhcp_binding, segment_id, binding_id):
+    try:
+        dhcp_binding.delete(segment_id, binding_id)
+    except NotFound:
+        pass
+
 
-    dhcp_v6_binding = DhcpV6StaticBindingConfig(
+def _wait_on_dhcp_static_bindings(segment_id, client_config):
+    dhcp_binding = DhcpStaticBindingConfigs(
         client_config=client_config,
         resource_config={},
         logger=ctx.logger
     )
-
-    bindings_v4 = []
-    bindings_v6 = []
-    for static_v4_bindings in dhcp_v4_binding.list(
-            filters={
-                'segment_id': segment_id
-            }
-    ):
-        bindings_v4.append(static_v4_bindings['id'])
-
-    for dhcp_v6_binding in dhcp_v6_binding.list(
-            filters={
-                'segment_id': segment_id
-            }
-    ):
-        bindings_v6.append(dhcp_v6_binding['id'])
-
-    if not any([bindings_v4, bindings_v6]):
-        ctx.logger.info('All DHCP Static Binding objects are deleted')
-    else:
-        for binding_v4_id in bindings_v4:
-            validate_if_resource_deleted(
-                dhcp_v4_binding, (segment_id, binding_v4_id,)
+    bindings = _list_dhcp_static_bindings(dhcp_binding, segment_id)
+    if bindings:
+        # Delete all the bindings of the segment concurrently and then wait
+        # on the whole set instead of one binding per operation retry
+        executor = BoundedExecutor()
+        for binding_id in bindings:
+            executor.submit(
+                binding_id,
+                _delete_dhcp_static_binding,
+                dhcp_binding,
+                segment_id,
+                binding_id
             )
-
-        for binding_v6_id in bindings_v6:
-            validate_if_resource_deleted(
-                dhcp_v6_binding, (segment_id, binding_v6_id,)
+        try:
+            executor.run()
+        except ConcurrentTaskError as error:
+            # Bindings that failed to be deleted are still listed and so
+            # they are deleted again when the operation is retried
+            ctx.logger.warning(
+                'Failed to delete {0} DHCP Static Binding '
+                'objects: {1}'.format(len(error.errors), error)
             )
 
+    wait_for_resources_deleted(
+        'DHCP Static Binding',
+        partial(_list_dhcp_static_bindings, dhcp_binding, segment_id),
+        get_realization_timeout(dhcp_binding)
+    )
+
 
 @with_nsx_t_client(Segment)
 def create(nsx_t_resource):
     # Update the subnet configuration for segment
-    _update_subnet_configuration(nsx_t_resource.resource_config)
+    update_subnet_configuration(nsx_t_resource.resource_config)
     # Trigger the actual call to the NSXT Manager API
     resource = nsx_t_resource.create()
     # Update the resource_id with the new "id" returned from API
@@ -220,11 +292,12 @@ def create(nsx_t_resource):
 
     # Set the unique_id to use it later on
     ctx.instance.runtime_properties['unique_id'] = resource.unique_id
+    return resource
 
 
 @with_nsx_t_client(SegmentState)
 def start(nsx_t_resource):
-    validate_if_resource_started(
+    wait_for_resource_started(
         'Segment',
         nsx_t_resource,
         [STATE_PENDING, STATE_IN_PROGRESS],
@@ -95,7 +95,9 @@ class NSXTPluginTestBase(unittest.TestCase):
             'host': 'localhost',
             'port': '80',
             'insecure': False,
-            'auth_type': 'basic'
+            'auth_type': 'basic',
+            # Do not wait for realization inside the tested operations
+            'realization_timeout': 0
         }
 
     @property
@@ -0,0 +1,106 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Compare the classification of the IP addresses of network interfaces by
+version with the previous implementation, which parsed each address twice
+using IPy:
+
+    python -m nsx_t_plugin.tests.benchmarks.ip_addresses --count 100000
+"""
+
+import random
+import argparse
+
+from IPy import IP
+
+from nsx_t_plugin.utils import get_ip_version
+
+from nsx_t_plugin.tests.benchmarks.utils import run_scenario, print_report
+
+
+def generate_addresses(count, seed=0):
+    """
+    :return: List of addresses, mostly plain IPv4 & IPv6 addresses with a
+    few IPv4 mapped IPv6 addresses
+    """
+    generator = random.Random(seed)
+    addresses = []
+    for index in range(count):
+        if index % 100 == 0:
+            addresses.append('::ffff:10.{0}.{1}.{2}'.format(
+                *[generator.randint(0, 255) for _ in range(3)]))
+        elif index % 2:
+            addresses.append('.'.join(
+                str(generator.randint(0, 255)) for _ in range(4)))
+        else:
+            addresses.append('2001:db8::{0:x}:{1:x}'.format(
+                generator.randint(0, 0xffff), generator.randint(0, 0xffff)))
+    return addresses
+
+
+def classify_with_ipy(addresses):
+    # Previous implementation
+    ipv_4 = []
+    ipv_6 = []
+    for ip_address in addresses:
+        if IP(ip_address).version() == 4:
+            ipv_4.append(ip_address)
+        elif IP(ip_address).version() == 6:
+            ipv_6.append(ip_address)
+    return ipv_4, ipv_6
+
+
+def classify(addresses):
+    ipv_4 = []
+    ipv_6 = []
+    for ip_address in addresses:
+        ip_version = get_ip_version(ip_address)
+        if ip_version == 4:
+            ipv_4.append(ip_address)
+        elif ip_version == 6:
+            ipv_6.append(ip_address)
+    return ipv_4, ipv_6
+
+
+def _parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the classification of IP addresses'
+    )
+    parser.add_argument('--count', type=int, default=100000,
+                        help='Number of addresses classified by each call')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--output', help='Dump the results as JSON')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = _parse_args(args)
+    addresses = generate_addresses(options.count)
+    if classify(addresses) != classify_with_ipy(addresses):
+        raise RuntimeError('The classifications are different')
+    results = [
+        run_scenario('ipy_classify',
+                     lambda _: classify_with_ipy(addresses),
+                     options.iterations),
+        run_scenario('get_ip_version',
+                     lambda _: classify(addresses),
+                     options.iterations),
+    ]
+    print_report(results, options.output)
+
+
+if __name__ == '__main__':
+    main()
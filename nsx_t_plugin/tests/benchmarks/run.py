@@ -0,0 +1,81 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Run the benchmarks against the local mock NSX-T server:
+
+    python -m nsx_t_plugin.tests.benchmarks.run \
+        --iterations 200 --concurrency 8 --latency 5
+"""
+
+import logging
+import argparse
+import warnings
+
+from nsx_t_sdk.tests.mock_server import MockNSXTServer, without_ca_bundle
+
+from nsx_t_plugin.tests.benchmarks.scenarios import SCENARIOS
+from nsx_t_plugin.tests.benchmarks.utils import print_report
+
+
+def _parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the NSX-T SDK & plugin operations against '
+                    'a local mock NSX-T server'
+    )
+    parser.add_argument('scenarios', nargs='*', choices=[[]] + list(SCENARIOS),
+                        help='Scenarios to run, default to all of them')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Milliseconds added to each server response')
+    parser.add_argument('--realization-delay', type=float, default=0,
+                        help='Seconds before resources are realized')
+    parser.add_argument('--realization-timeout', type=float, default=60)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--list-size', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--bindings', type=int, default=250,
+                        help='DHCP static bindings of each stopped segment')
+    parser.add_argument('--max-retries', type=int, default=5,
+                        help='Retries of api calls rejected with 429 & 503')
+    parser.add_argument('--rate-limit', type=int,
+                        help='Maximum api requests per second')
+    parser.add_argument('--auth-type', choices=['basic', 'session'],
+                        default='session')
+    parser.add_argument('--output', help='Dump the results as JSON')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = _parse_args(args)
+    logging.basicConfig(level=logging.WARNING)
+    # The certificate of the mock server is self signed
+    warnings.simplefilter('ignore')
+    server = MockNSXTServer(
+        latency=options.latency / 1000.0,
+        page_size=options.page_size,
+        realization_delay=options.realization_delay
+    )
+    results = []
+    with without_ca_bundle(), server:
+        for name in options.scenarios or SCENARIOS:
+            server.reset()
+            results.append(SCENARIOS[name](server, options))
+    print_report(results, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import logging
+from collections import OrderedDict
+
+from cloudify.state import current_ctx
+from cloudify.exceptions import OperationRetry
+from cloudify.mocks import MockContext, MockNodeInstanceContext
+
+from nsx_t_sdk.hierarchical import HierarchicalBatch
+from nsx_t_sdk.resources import Segment, VirtualMachine
+from nsx_t_plugin.segment import segment
+from nsx_t_plugin.tests.base import (
+    CustomMockCloudifyContext,
+    CustomMockNodeContext
+)
+
+from nsx_t_plugin.tests.benchmarks.utils import (
+    run_scenario,
+    run_async_scenario
+)
+
+logger = logging.getLogger('nsx-t-benchmarks')
+
+
+def _client_config(server, options):
+    return server.client_config(
+        auth_type=options.auth_type,
+        realization_timeout=options.realization_timeout,
+        max_retries=options.max_retries,
+        rate_limit=options.rate_limit
+    )
+
+
+def _segment(server, options, segment_id):
+    return Segment(
+        client_config=_client_config(server, options),
+        resource_config={'id': segment_id},
+        logger=logger
+    )
+
+
+def _set_node_ctx(server, options, operation, resource_config,
+                  runtime_properties=None):
+    properties = {
+        'client_config': _client_config(server, options),
+        'resource_config': resource_config
+    }
+    ctx = CustomMockCloudifyContext(
+        node_id='segment',
+        node_name='segment',
+        deployment_id='benchmark',
+        properties=properties,
+        runtime_properties=runtime_properties or {},
+        operation={'retry_number': 0, 'name': operation}
+    )
+    ctx._node = CustomMockNodeContext('segment', properties)
+    # Operations log each realized resource
+    ctx.logger.setLevel(logging.WARNING)
+    current_ctx.set(ctx)
+    return ctx
+
+
+def _set_relationship_ctx(server, options, operation, segment_id, index):
+    properties = {
+        'client_config': _client_config(server, options),
+        'resource_config': {'id': segment_id}
+    }
+    target = MockContext({
+        'instance': MockNodeInstanceContext(
+            id='segment_{0}'.format(index),
+            runtime_properties={'id': segment_id}),
+        'node': CustomMockNodeContext('segment', properties),
+        '_context': {'node_id': 'segment'}
+    })
+    source = MockContext({
+        'instance': MockNodeInstanceContext(
+            id='server_{0}'.format(index),
+            runtime_properties={
+                'id': 'server_{0}'.format(index),
+                'networks': [{
+                    'name': 'nic',
+                    'mac': '00:50:56:00:{0:02x}:{1:02x}'.format(
+                        index // 256 % 256, index % 256)
+                }]
+            }),
+        'node': CustomMockNodeContext('server', {}),
+        '_context': {'node_id': 'server'}
+    })
+    ctx = CustomMockCloudifyContext(
+        node_id='segment',
+        deployment_id='benchmark',
+        source=source,
+        target=target,
+        operation={'retry_number': 0, 'name': operation}
+    )
+    ctx.logger.setLevel(logging.WARNING)
+    current_ctx.set(ctx)
+    return ctx
+
+
+def sdk_create_segment(server, options):
+    def _create(index):
+        _segment(server, options, 'create-{0}'.format(index)).create()
+    return run_scenario('sdk_create_segment', _create,
+                        options.iterations, options.concurrency)
+
+
+def sdk_get_segment(server, options):
+    _segment(server, options, 'get').create()
+
+    def _get(index):
+        _segment(server, options, 'get').get()
+    return run_scenario('sdk_get_segment', _get,
+                        options.iterations, options.concurrency)
+
+
+def sdk_get_segment_with_errors(server, options):
+    _segment(server, options, 'errors').create()
+    # One out of ten calls is rejected with service unavailable, which is
+    # retried after the Retry-After delay unless --max-retries is 0
+    server.inject_error(503, path='/segments/errors',
+                        count=options.iterations // 10,
+                        headers={'Retry-After': '1'})
+
+    def _get(index):
+        _segment(server, options, 'errors').get()
+    stats = run_scenario('sdk_get_segment_with_errors', _get,
+                         options.iterations, options.concurrency)
+    server.clear_errors()
+    return stats
+
+
+def sdk_iter_list_segments(server, options):
+    batch = HierarchicalBatch(_client_config(server, options), logger)
+    for index in range(options.list_size):
+        batch.add(_segment(server, options, 'list-{0}'.format(index)))
+    batch.apply()
+
+    def _iter_list(index):
+        for _ in _segment(server, options, 'list-0').iter_list(
+                page_size=options.page_size, fields=['id']):
+            pass
+    return run_scenario('sdk_iter_list_segments', _iter_list,
+                        max(options.iterations // 10, 1),
+                        options.concurrency)
+
+
+def sdk_hierarchical_batch(server, options):
+    def _apply(index):
+        batch = HierarchicalBatch(_client_config(server, options), logger)
+        for child in range(options.batch_size):
+            batch.add(_segment(
+                server, options, 'batch-{0}-{1}'.format(index, child)))
+        batch.apply()
+    return run_scenario('sdk_hierarchical_batch', _apply,
+                        max(options.iterations // 10, 1),
+                        options.concurrency)
+
+
+def sdk_lookup_virtual_machine(server, options):
+    for index in range(options.list_size):
+        server.add_resource('/api/v1/fabric/virtual-machines', {
+            'id': 'vm-{0}'.format(index),
+            'external_id': 'vm-{0}'.format(index),
+            'display_name': 'vm-{0}'.format(index),
+            'resource_type': 'VirtualMachine'
+        })
+
+    def _lookup(index):
+        VirtualMachine(
+            client_config=_client_config(server, options),
+            resource_config={
+                'vm_name': 'vm-{0}'.format(index % options.list_size)
+            },
+            logger=logger
+        ).get()
+    return run_scenario('sdk_lookup_virtual_machine', _lookup,
+                        options.iterations, options.concurrency)
+
+
+def aio_get_segment(server, options):
+    # The async client is python 3 only
+    import asyncio
+    from nsx_t_sdk.aio import AsyncNSXTClient
+
+    _segment(server, options, 'get').create()
+    loop = asyncio.new_event_loop()
+    client = AsyncNSXTClient(_client_config(server, options), logger,
+                             max_concurrency=options.concurrency)
+    loop.run_until_complete(client.open())
+
+    def _get(index):
+        return client.resource(Segment, {'id': 'get'}).get()
+    try:
+        return run_async_scenario('aio_get_segment', loop, _get,
+                                  options.iterations)
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
+
+
+def plugin_segment_create_start(server, options):
+    def _create_start(index):
+        segment_id = 'plugin-{0}'.format(index)
+        ctx = _set_node_ctx(server, options,
+                            'cloudify.interfaces.lifecycle.create',
+                            {'id': segment_id})
+        segment.create()
+        _set_node_ctx(server, options,
+                      'cloudify.interfaces.lifecycle.start',
+                      {'id': segment_id},
+                      dict(ctx.instance.runtime_properties))
+        segment.start()
+    return run_scenario('plugin_segment_create_start', _create_start,
+                        options.iterations, options.concurrency)
+
+
+def plugin_add_static_bindings(server, options):
+    for index in range(options.iterations):
+        _segment(server, options, 'bindings-{0}'.format(index)).create()
+
+    def _add_static_bindings(index):
+        _set_relationship_ctx(
+            server, options,
+            'cloudify.interfaces.relationship_lifecycle.preconfigure',
+            'bindings-{0}'.format(index), index
+        )
+        segment.add_static_bindings(
+            network_unique_id='nic',
+            ip_v4_address='10.{0}.{1}.10'.format(
+                index // 256 % 256, index % 256),
+            ip_v6_address='fc7e:f206:db42::{0:x}'.format(index)
+        )
+    return run_scenario('plugin_add_static_bindings', _add_static_bindings,
+                        options.iterations, options.concurrency)
+
+
+def plugin_segment_stop(server, options):
+    iterations = max(options.iterations // 20, 1)
+    for index in range(iterations):
+        segment_id = 'stop-{0}'.format(index)
+        _segment(server, options, segment_id).create()
+        for binding in range(options.bindings):
+            server.add_resource(
+                '/infra/segments/{0}/dhcp-static-binding-configs'.format(
+                    segment_id),
+                {
+                    'id': 'binding-{0}'.format(binding),
+                    'resource_type': 'DhcpV4StaticBindingConfig'
+                }
+            )
+
+    def _stop(index):
+        segment_id = 'stop-{0}'.format(index)
+        while True:
+            _set_node_ctx(server, options,
+                          'cloudify.interfaces.lifecycle.stop',
+                          {'id': segment_id},
+                          {'id': segment_id})
+            try:
+                segment.stop()
+                return
+            except OperationRetry:
+                pass
+    return run_scenario('plugin_segment_stop', _stop,
+                        iterations, options.concurrency)
+
+
+SCENARIOS = OrderedDict(
+    (scenario.__name__, scenario) for scenario in (
+        sdk_create_segment,
+        sdk_get_segment,
+        sdk_get_segment_with_errors,
+        sdk_iter_list_segments,
+        sdk_hierarchical_batch,
+        sdk_lookup_virtual_machine,
+        aio_get_segment,
+        plugin_segment_create_start,
+        plugin_add_static_bindings,
+        plugin_segment_stop,
+    )
+)
@@ -0,0 +1,103 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Measure the cold import time of each plugin operation entry point, the way
+the agent loads it in a new process:
+
+    python -m nsx_t_plugin.tests.benchmarks.startup --repeat 5
+"""
+
+from __future__ import print_function
+
+import sys
+import json
+import argparse
+import subprocess
+
+from nsx_t_plugin.tests.benchmarks.utils import LatencyStats
+
+# Modules of the operations declared in plugin.yaml
+ENTRY_POINTS = (
+    'nsx_t_plugin.dhcp_server.dhcp_server_config',
+    'nsx_t_plugin.infra.infra',
+    'nsx_t_plugin.segment.segment',
+    'nsx_t_plugin.tier1.tier1',
+    'nsx_t_plugin.virtual_machine.virtual_machine',
+)
+
+_IMPORT_SCRIPT = """
+import sys, time, json, importlib
+start = time.time()
+importlib.import_module({module!r})
+elapsed = time.time() - start
+clients = [name for name in sys.modules
+           if name.startswith('com.vmware.') and name.endswith('_client')]
+print(json.dumps({{'seconds': elapsed, 'clients': sorted(clients)}}))
+"""
+
+
+def measure_import(module):
+    """
+    Import the module in a new interpreter
+    :return: Dict with the import time in seconds and the vAPI client
+    modules that were loaded by the import
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', _IMPORT_SCRIPT.format(module=module)]
+    )
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def _parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Measure the cold import time of the plugin operations'
+    )
+    parser.add_argument('modules', nargs='*',
+                        choices=[[]] + list(ENTRY_POINTS),
+                        help='Entry points to measure, default to all of them')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of new processes for each entry point')
+    parser.add_argument('--output', help='Dump the results as JSON')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = _parse_args(args)
+    row = '{name:<46} {p50_ms:>9} {max_ms:>9} {clients:>8}'
+    print(row.format(name='entry point', p50_ms='p50 ms', max_ms='max ms',
+                     clients='clients'))
+    summaries = []
+    for module in options.modules or ENTRY_POINTS:
+        stats = LatencyStats(module)
+        clients = []
+        for _ in range(options.repeat):
+            result = measure_import(module)
+            stats.add(result['seconds'])
+            clients = result['clients']
+        summary = stats.summary()
+        summary['clients'] = clients
+        summaries.append(summary)
+        print(row.format(name=module,
+                         p50_ms=summary['p50_ms'],
+                         max_ms=summary['max_ms'],
+                         clients=len(clients)))
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(summaries, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
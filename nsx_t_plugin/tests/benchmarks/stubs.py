@@ -0,0 +1,89 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Compare the cost of instantiating resources and resolving their service stub
+with new connections (cold) and with pooled connections (warm):
+
+    python -m nsx_t_plugin.tests.benchmarks.stubs --iterations 1000
+"""
+
+import logging
+import argparse
+
+from nsx_t_sdk.pool import get_client_pool
+from nsx_t_sdk.resources import (
+    Segment,
+    Tier1,
+    DhcpServerConfig,
+    VirtualMachine
+)
+
+from nsx_t_plugin.tests.benchmarks.utils import run_scenario, print_report
+
+RESOURCES = (Segment, Tier1, DhcpServerConfig, VirtualMachine)
+
+# No request is sent while instantiating resources with basic auth
+CLIENT_CONFIG = {
+    'host': 'localhost',
+    'port': 443,
+    'username': 'admin',
+    'password': 'admin',
+    'auth_type': 'basic',
+    'insecure': False
+}
+
+
+def _instantiate(class_type, cold):
+    logger = logging.getLogger('benchmarks')
+
+    def _run(index):
+        if cold:
+            get_client_pool().clear()
+        resource = class_type(CLIENT_CONFIG, {'id': str(index)}, logger)
+        resource._get_service_client()
+    return _run
+
+
+def _parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the instantiation of NSX-T resources'
+    )
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--output', help='Dump the results as JSON')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = _parse_args(args)
+    results = []
+    for class_type in RESOURCES:
+        for cold in (True, False):
+            get_client_pool().clear()
+            # Import the client module & the generated bindings before
+            # measuring
+            _instantiate(class_type, cold=True)(0)
+            results.append(run_scenario(
+                '{0}_{1}'.format(class_type.__name__,
+                                 'cold' if cold else 'warm'),
+                _instantiate(class_type, cold),
+                options.iterations
+            ))
+    get_client_pool().clear()
+    print_report(results, options.output)
+
+
+if __name__ == '__main__':
+    main()
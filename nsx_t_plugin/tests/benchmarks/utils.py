@@ -0,0 +1,157 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+from __future__ import division, print_function
+
+import json
+import time
+import threading
+
+from nsx_t_sdk._compat import queue
+
+
+class LatencyStats(object):
+    """
+    Collect the latency of each call of one scenario
+    """
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def add_error(self):
+        with self._lock:
+            self.errors += 1
+
+    @property
+    def count(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self):
+        return self.count / self.elapsed if self.elapsed else 0
+
+    def percentile(self, percent):
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        # Nearest rank percentile
+        index = max(int(round(percent / 100.0 * len(latencies))) - 1, 0)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def summary(self):
+        return {
+            'name': self.name,
+            'count': self.count,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'throughput': round(self.throughput, 2),
+            'p50_ms': round(self.percentile(50) * 1000, 2),
+            'p99_ms': round(self.percentile(99) * 1000, 2),
+            'max_ms': round(max(self.latencies or [0]) * 1000, 2),
+        }
+
+
+def run_scenario(name, func, iterations, concurrency=1):
+    """
+    Call `func(index)` for each iteration using `concurrency` threads and
+    measure the latency of each call
+    :return: Instance of `LatencyStats`
+    """
+    stats = LatencyStats(name)
+    pending = queue.Queue()
+    for index in range(iterations):
+        pending.put(index)
+
+    def _worker():
+        while True:
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.time()
+            try:
+                func(index)
+            except Exception:
+                stats.add_error()
+            else:
+                stats.add(time.time() - start)
+
+    workers = [
+        threading.Thread(target=_worker)
+        for _ in range(max(min(concurrency, iterations), 1))
+    ]
+    start = time.time()
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stats.elapsed = time.time() - start
+    return stats
+
+
+def run_async_scenario(name, loop, func, iterations):
+    """
+    Schedule `func(index)` coroutines for all the iterations at once on the
+    event loop and measure the latency of each of them, the concurrency is
+    bounded by the async client
+    :return: Instance of `LatencyStats`
+    """
+    import asyncio
+    stats = LatencyStats(name)
+
+    def _schedule(index):
+        start = time.time()
+
+        def _done(future):
+            if future.exception():
+                stats.add_error()
+            else:
+                stats.add(time.time() - start)
+        future = asyncio.ensure_future(func(index), loop=loop)
+        future.add_done_callback(_done)
+        return future
+
+    start = time.time()
+    loop.run_until_complete(
+        asyncio.wait([_schedule(index) for index in range(iterations)])
+    )
+    stats.elapsed = time.time() - start
+    return stats
+
+
+def print_report(results, output=None):
+    """
+    Print the summary of each scenario as table and optionally dump it as
+    JSON to the output file
+    """
+    row = '{name:<36} {count:>7} {errors:>7} {throughput:>10} ' \
+          '{p50_ms:>9} {p99_ms:>9} {max_ms:>9}'
+    print(row.format(name='scenario', count='calls', errors='errors',
+                     throughput='calls/s', p50_ms='p50 ms',
+                     p99_ms='p99 ms', max_ms='max ms'))
+    summaries = [stats.summary() for stats in results]
+    for summary in summaries:
+        print(row.format(**summary))
+    if output:
+        with open(output, 'w') as output_file:
+            json.dump(summaries, output_file, indent=2)
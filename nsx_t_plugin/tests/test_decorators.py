@@ -16,6 +16,8 @@
 # Third Parties Imports
 import mock
 
+from com.vmware.vapi.std.errors_client import NotFound, ServiceUnavailable
+
 from cloudify.state import current_ctx
 from cloudify.exceptions import NonRecoverableError, OperationRetry
 
@@ -27,6 +29,7 @@ from nsx_t_plugin.tests.base import (
     MockNodeContext
 )
 from nsx_t_plugin.decorators import with_nsx_t_client
+from nsx_t_sdk import metrics
 from nsx_t_sdk.resources import NSXTResource
 
 
@@ -84,6 +87,44 @@ class DecoratorTestCase(NSXTPluginTestBase):
             mock_delete.assert_not_called()
             func.assert_called()
 
+    def test_errors_with_nsx_t_client(self):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='foo.operation')
+        func = mock.Mock(side_effect=[ServiceUnavailable(), NotFound()])
+        func.__name__ = 'foo_func'
+        with mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client'):
+            # The manager is throttling the requests
+            with self.assertRaises(OperationRetry):
+                with_nsx_t_client(NSXTResource)(func)()
+            with self.assertRaises(NonRecoverableError):
+                with_nsx_t_client(NSXTResource)(func)()
+
+    def test_export_operation_metrics_with_nsx_t_client(self):
+        properties = self.node_properties
+        properties['client_config']['metrics_runtime_properties'] = True
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=properties,
+            ctx_operation_name='foo.operation')
+
+        def _func(**_):
+            with metrics.ApiCall('segments', 'get', 'Segment'):
+                pass
+            raise OperationRetry('Still in progress')
+
+        _func.__name__ = 'foo_func'
+        with mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client'):
+            with self.assertRaises(OperationRetry):
+                with_nsx_t_client(NSXTResource)(_func)()
+        operations_metrics = \
+            self._ctx.instance.runtime_properties['api_metrics']
+        self.assertEqual(list(operations_metrics.keys()), ['foo.operation'])
+        self.assertEqual(
+            operations_metrics['foo.operation']['Segment.get']['count'], 1
+        )
+
     @mock.patch('nsx_t_plugin.utils.get_relationship_subject_context')
     @mock.patch('nsx_t_plugin.utils.delete_runtime_properties_from_instance')
     @mock.patch('nsx_t_plugin.utils.set_basic_runtime_properties_for_instance')
@@ -127,6 +127,21 @@ class DHCPServerConfigTestCase(NSXTPluginTestBase):
             []
         )
 
+    @mock.patch('nsx_t_sdk.resources.Tier1.patch_delta')
+    def test_update_tier_1_gateway(self, mock_patch_delta, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='cloudify.interfaces.lifecycle.configure')
+        dhcp_server_config._update_tier_1_gateway(
+            self.client_config,
+            'test_tier1_gateway_id',
+            ['/test/path/dhcp-server-config']
+        )
+        mock_patch_delta.assert_called_once_with(
+            {'dhcp_config_paths': ['/test/path/dhcp-server-config']}
+        )
+
     @mock.patch('nsx_t_sdk.resources.DhcpServerConfig.delete')
     def test_delete_dhcp_server_config(self, mock_delete, _):
         self._prepare_context_for_operation(
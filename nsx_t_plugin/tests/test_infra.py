@@ -0,0 +1,156 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Third Parties Imports
+import mock
+
+from com.vmware.nsx_policy.model_client import (
+    DhcpStaticBindingState,
+    SegmentConfigurationState,
+    Tier1GatewayState,
+    LogicalRouterState
+)
+from com.vmware.vapi.std.errors_client import NotFound
+
+from cloudify.exceptions import OperationRetry
+
+# Local Imports
+from nsx_t_plugin.tests.base import NSXTPluginTestBase
+from nsx_t_plugin.infra import infra
+
+
+@mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+class InfraTestCase(NSXTPluginTestBase):
+
+    @property
+    def resource_config(self):
+        return {
+            'tier1s': [
+                {
+                    'id': 'test_tier1',
+                    'display_name': 'Test Tier1 Router'
+                }
+            ],
+            'segments': [
+                {
+                    'id': 'test_segment',
+                    'display_name': 'Test Segment',
+                    'subnet': {
+                        'ip_v4_config': {
+                            'gateway_address': '192.168.11.12/24'
+                        }
+                    }
+                }
+            ],
+            'dhcp_v4_static_bindings': [
+                {
+                    'segment_id': 'test_segment',
+                    'id': 'test_binding',
+                    'ip_address': '192.168.11.20',
+                    'mac_address': '00:50:56:00:00:01'
+                }
+            ]
+        }
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_create_infra(self, mock_invoke, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='cloudify.interfaces.lifecycle.create')
+        infra.create()
+
+        # All resources are sent in one request
+        self.assertEqual(mock_invoke.call_count, 1)
+        action, args = mock_invoke.call_args[0]
+        self.assertEqual(action, 'patch')
+        children = [child.to_dict() for child in args[0]['children']]
+        self.assertEqual(
+            [child['resource_type'] for child in children],
+            ['ChildTier1', 'ChildSegment']
+        )
+        segment = children[1]['Segment']
+        self.assertEqual(
+            segment['subnets'],
+            [{'gateway_address': '192.168.11.12/24'}]
+        )
+        self.assertEqual(
+            segment['children'][0]['DhcpStaticBindingConfig']['id'],
+            'test_binding'
+        )
+        self.assertEqual(
+            self._ctx.instance.runtime_properties['type'],
+            infra.Infra.resource_type
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_start_infra_on_pending(self, mock_invoke, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='cloudify.interfaces.lifecycle.start')
+        mock_invoke.side_effect = [
+            Tier1GatewayState(tier1_state=LogicalRouterState(state='success')),
+            SegmentConfigurationState(state='pending'),
+        ]
+        with self.assertRaises(OperationRetry):
+            infra.start()
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_start_infra_on_success(self, mock_invoke, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='cloudify.interfaces.lifecycle.start')
+        mock_invoke.side_effect = [
+            Tier1GatewayState(tier1_state=LogicalRouterState(state='success')),
+            SegmentConfigurationState(state='success'),
+            DhcpStaticBindingState(state='success')
+        ]
+        infra.start()
+        self.assertEqual(mock_invoke.call_count, 3)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource.get')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_delete_infra_in_progress(self, mock_invoke, mock_get, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            ctx_operation_name='cloudify.interfaces.lifecycle.delete')
+        mock_get.return_value = {'id': 'test_tier1'}
+        with self.assertRaises(OperationRetry) as error:
+            infra.delete()
+        # All the resources are polled before the operation is retried
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertIn('3 Infra objects', str(error.exception))
+        action, args = mock_invoke.call_args[0]
+        self.assertEqual(action, 'patch')
+        for child in args[0]['children']:
+            self.assertTrue(child.to_dict()['marked_for_delete'])
+        self.assertTrue(self._ctx.instance.runtime_properties['delete_task'])
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource.get')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_delete_infra_with_success(self, mock_invoke, mock_get, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            test_runtime_properties={'delete_task': True},
+            ctx_operation_name='cloudify.interfaces.lifecycle.delete')
+        mock_get.side_effect = NotFound
+        infra.delete()
+        self.assertFalse(mock_invoke.called)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self._ctx.instance.runtime_properties, {})
@@ -25,7 +25,11 @@ from com.vmware.nsx_policy.model_client import (
     DhcpV6StaticBindingConfig as vmDhcpV6StaticBindingConfig,
     SegmentConfigurationState
 )
-from com.vmware.vapi.std.errors_client import Error, NotFound
+from com.vmware.vapi.std.errors_client import (
+    Error,
+    NotFound,
+    ServiceUnavailable
+)
 
 from cloudify.exceptions import NonRecoverableError, OperationRetry
 
@@ -37,6 +41,7 @@ from nsx_t_plugin.tests.base import (
     MockNodeContext
 )
 from nsx_t_plugin.segment import segment
+from nsx_t_plugin.utils import update_subnet_configuration
 
 
 @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
@@ -85,7 +90,7 @@ class SegmentTestCase(NSXTPluginTestBase):
 
         res = copy.deepcopy(self.resource_config)
         res['unique_id'] = 'unique_test_segment'
-        segment._update_subnet_configuration(res)
+        update_subnet_configuration(res)
         mock_create.return_value = vmSegment(**res)
         mock_invoke.return_value = vmSegment(**res)
         segment.create()
@@ -149,11 +154,11 @@ class SegmentTestCase(NSXTPluginTestBase):
         with self.assertRaises(NonRecoverableError):
             segment.start()
 
-    @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.list')
-    @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.list')
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingConfigs.delete')
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingConfigs.iter_list')
     def test_stop_segment_with_dhcp_resource(self,
-                                             mock_dhcp4_list,
-                                             mock_dhcp6_list,
+                                             mock_dhcp_list,
+                                             mock_dhcp_delete,
                                              _):
         self._prepare_context_for_operation(
             test_name='NodeInstanceContext',
@@ -161,15 +166,13 @@ class SegmentTestCase(NSXTPluginTestBase):
             test_runtime_properties={'id': 'test_segment'},
             ctx_operation_name='cloudify.interfaces.lifecycle.stop')
 
-        mock_dhcp4_list.return_value = [
+        bindings = [
             {
                 'id': 'dhcpv4_1'
             },
             {
                 'id': 'dhcpv4_2'
             },
-        ]
-        mock_dhcp6_list.return_value = [
             {
                 'id': 'dhcpv6_1'
             },
@@ -177,14 +180,40 @@ class SegmentTestCase(NSXTPluginTestBase):
                 'id': 'dhcpv6_2'
             },
         ]
+        mock_dhcp_list.return_value = bindings
         with self.assertRaises(OperationRetry):
             segment.stop()
+        # All the bindings are deleted before retrying the operation
+        self.assertEqual(
+            sorted(call[0][1] for call in mock_dhcp_delete.call_args_list),
+            ['dhcpv4_1', 'dhcpv4_2', 'dhcpv6_1', 'dhcpv6_2']
+        )
+
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingConfigs.delete')
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingConfigs.iter_list')
+    def test_stop_segment_delete_dhcp_resource(self,
+                                               mock_dhcp_list,
+                                               mock_dhcp_delete,
+                                               _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties=self.node_properties,
+            test_runtime_properties={'id': 'test_segment'},
+            ctx_operation_name='cloudify.interfaces.lifecycle.stop')
+
+        bindings = [{'id': 'dhcpv4_{0}'.format(index)} for index in range(50)]
+        mock_dhcp_list.side_effect = [bindings, []]
+        # Bindings already deleted or failed to be deleted do not stop the
+        # deletion of the others
+        mock_dhcp_delete.side_effect = \
+            [NotFound(), Error()] + [None] * 48
+        segment.stop()
+        self.assertEqual(mock_dhcp_delete.call_count, 50)
+        self.assertEqual(mock_dhcp_list.call_count, 2)
 
-    @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.list')
-    @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.list')
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingConfigs.iter_list')
     def test_stop_segment_with_no_dhcp_resource(self,
-                                                mock_dhcp4_list,
-                                                mock_dhcp6_list,
+                                                mock_dhcp_list,
                                                 _):
         self._prepare_context_for_operation(
             test_name='NodeInstanceContext',
@@ -192,8 +221,7 @@ class SegmentTestCase(NSXTPluginTestBase):
             test_runtime_properties={'id': 'test_segment'},
             ctx_operation_name='cloudify.interfaces.lifecycle.stop')
 
-        mock_dhcp4_list.return_value = []
-        mock_dhcp6_list.return_value = []
+        mock_dhcp_list.return_value = []
         segment.stop()
 
     @mock.patch('nsx_t_sdk.resources.Segment.delete')
@@ -334,6 +362,13 @@ class SegmentTestCase(NSXTPluginTestBase):
             self._ctx.target.instance.runtime_properties[
                 'tasks']['test_segment-dhcpv6']
         )
+        # Both bindings are realized on the first check
+        self.assertEqual(mock_get_state_binding.call_count, 2)
+        self.assertEqual(
+            sorted(self._ctx.target.instance.runtime_properties[
+                'dhcp_static_bindings_latency'].keys()),
+            ['test_segment-dhcpv4', 'test_segment-dhcpv6']
+        )
 
     @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.delete')
     @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.delete')
@@ -395,3 +430,122 @@ class SegmentTestCase(NSXTPluginTestBase):
         segment.remove_static_bindings()
         mock_delete_binding_v4.assert_called()
         mock_delete_binding_v6.assert_called()
+
+    def _prepare_static_bindings_context(self, runtime_properties=None):
+        target = CustomMockContext({
+            'instance': MockNodeInstanceContext(
+                id='test_segment_wjkog',
+                runtime_properties=runtime_properties or {}),
+            'node': MockNodeContext(
+                id='test_segment',
+                properties={
+                    'client_config': self.client_config,
+                    'resource_config': self.resource_config,
+                }
+            ), '_context': {
+                'node_id': 'test_segment'
+            }})
+
+        source = CustomMockContext({
+            'instance': MockNodeInstanceContext(
+                id='vpshere_server_okijw',
+                runtime_properties={
+                    'networks': [
+                        {
+                            'name': 'test_nic1',
+                            'mac': 'test_mac1'
+                        }
+                    ],
+                    'id': 'vpshere_server_loki'
+                }),
+            'node': MockNodeContext(
+                id='vpshere_server_loki',
+                properties={
+                    'client_config': self.client_config,
+                    'resource_config': self.resource_config,
+                }
+            ), '_context': {
+                'node_id': 'vpshere_server'
+            }})
+        self._set_context_operation(
+            instance_type='relationship-instance',
+            source=source,
+            target=target,
+            ctx_operation_name='cloudify.interfaces.'
+                               'relationship_lifecycle.preconfigure',
+            node_id='test_segment'
+        )
+
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingState.get')
+    @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.update')
+    @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.update')
+    def test_add_static_bindings_with_failure(self,
+                                              mock_update_binding_v4,
+                                              mock_update_binding_v6,
+                                              mock_get_state_binding,
+                                              _):
+        self._prepare_static_bindings_context()
+        mock_update_binding_v4.return_value = vmDhcpV4StaticBindingConfig(
+            resource_type='DhcpV4StaticBindingConfig',
+            id='test_segment-dhcpv4'
+        )
+        mock_update_binding_v6.side_effect = Error
+        with self.assertRaises(NonRecoverableError):
+            segment.add_static_bindings(network_unique_id='test_nic1',
+                                        ip_v4_address='192.168.10.2',
+                                        ip_v6_address='fc7e:f206:db42::')
+        runtime_properties = self._ctx.target.instance.runtime_properties
+        # The v4 binding is kept so that it is not created again on retry
+        self.assertTrue(runtime_properties['tasks']['test_segment-dhcpv4'])
+        self.assertNotIn('test_segment-dhcpv6', runtime_properties['tasks'])
+        self.assertNotIn('dhcp_v6_static_binding_id', runtime_properties)
+        self.assertFalse(mock_get_state_binding.called)
+
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingState.get')
+    @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.update')
+    @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.update')
+    def test_add_static_bindings_with_unavailable_manager(
+            self,
+            mock_update_binding_v4,
+            mock_update_binding_v6,
+            mock_get_state_binding,
+            _):
+        self._prepare_static_bindings_context()
+        mock_update_binding_v4.return_value = vmDhcpV4StaticBindingConfig(
+            resource_type='DhcpV4StaticBindingConfig',
+            id='test_segment-dhcpv4'
+        )
+        # The manager returned 503 after the api call was retried
+        mock_update_binding_v6.side_effect = ServiceUnavailable
+        with self.assertRaises(OperationRetry):
+            segment.add_static_bindings(network_unique_id='test_nic1',
+                                        ip_v4_address='192.168.10.2',
+                                        ip_v6_address='fc7e:f206:db42::')
+        runtime_properties = self._ctx.target.instance.runtime_properties
+        self.assertTrue(runtime_properties['tasks']['test_segment-dhcpv4'])
+        self.assertNotIn('test_segment-dhcpv6', runtime_properties['tasks'])
+        self.assertFalse(mock_get_state_binding.called)
+
+    @mock.patch('nsx_t_sdk.resources.DhcpStaticBindingState.get')
+    @mock.patch('nsx_t_sdk.resources.DhcpV6StaticBindingConfig.update')
+    @mock.patch('nsx_t_sdk.resources.DhcpV4StaticBindingConfig.update')
+    def test_add_static_bindings_on_retry(self,
+                                          mock_update_binding_v4,
+                                          mock_update_binding_v6,
+                                          mock_get_state_binding,
+                                          _):
+        self._prepare_static_bindings_context({
+            'tasks': {'test_segment-dhcpv4': 100.0}
+        })
+        mock_update_binding_v6.return_value = vmDhcpV6StaticBindingConfig(
+            resource_type='DhcpV6StaticBindingConfig',
+            id='test_segment-dhcpv6'
+        )
+        mock_get_state_binding.return_value = {'state': 'success'}
+        segment.add_static_bindings(network_unique_id='test_nic1',
+                                    ip_v4_address='192.168.10.2',
+                                    ip_v6_address='fc7e:f206:db42::')
+        self.assertFalse(mock_update_binding_v4.called)
+        mock_update_binding_v6.assert_called_once()
+        # Both bindings are waited even though only one is created
+        self.assertEqual(mock_get_state_binding.call_count, 2)
@@ -76,6 +76,13 @@ class Tier1TestCase(NSXTPluginTestBase):
             self._ctx.instance.runtime_properties['path'],
             '/test/path/tier1-config'
         )
+        # Runtime properties are set from the create response without
+        # fetching the resource again
+        self.assertEqual(mock_invoke.call_count, 1)
+        self.assertEqual(
+            self._ctx.instance.runtime_properties['resource_config']['path'],
+            '/test/path/tier1-config'
+        )
 
     @mock.patch('nsx_t_sdk.resources.NSXTResource._invoke')
     def test_start_tier1_on_success(self, mock_invoke, _):
@@ -13,8 +13,17 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+# Standard Imports
+import os
+import json
+import shutil
+import tempfile
+
 # Third Parties Imports
 import mock
+from IPy import IP
+
+from com.vmware.nsx_policy.model_client import Segment as vmSegment
 
 from cloudify.state import current_ctx
 from cloudify.exceptions import NonRecoverableError, OperationRetry
@@ -29,13 +38,18 @@ from nsx_t_plugin.tests.base import (
 
 from nsx_t_sdk.resources import NSXTResource
 
+from nsx_t_sdk import metrics
 from nsx_t_plugin.utils import (
+    export_operation_metrics,
     get_ctx_object,
+    get_ip_version,
     populate_nsx_t_instance_from_ctx,
     delete_runtime_properties_from_instance,
     set_basic_runtime_properties_for_instance,
     update_runtime_properties_for_instance,
-    validate_if_resource_started
+    validate_if_resource_started,
+    wait_for_resource_started,
+    wait_for_resources_started
 )
 
 
@@ -144,6 +158,75 @@ class UtilsTestCase(NSXTPluginTestBase):
         )
         current_ctx.clear()
 
+    def test_set_basic_runtime_properties_from_created_resource(self):
+        self._set_context_operation()
+        resource = mock.Mock(
+            resource_type='Segment',
+            resource_id='test_segment',
+            client_config={}
+        )
+        set_basic_runtime_properties_for_instance(
+            resource,
+            self._ctx,
+            vmSegment(id='test_segment', display_name='Test Segment')
+        )
+        # The created object is used as is without fetching it again
+        self.assertFalse(resource.get.called)
+        self.assertEqual(
+            self._ctx.instance.runtime_properties['name'],
+            'Test Segment'
+        )
+        self.assertEqual(
+            self._ctx.instance.runtime_properties['resource_config']['id'],
+            'test_segment'
+        )
+        current_ctx.clear()
+
+    def test_set_basic_runtime_properties_with_refresh(self):
+        self._set_context_operation()
+        resource = mock.Mock(
+            resource_type='Segment',
+            resource_id='test_segment',
+            client_config={'refresh_after_create': True}
+        )
+        resource.get = mock.Mock(
+            return_value={'display_name': 'Realized Segment'}
+        )
+        set_basic_runtime_properties_for_instance(
+            resource,
+            self._ctx,
+            vmSegment(id='test_segment', display_name='Test Segment')
+        )
+        resource.get.assert_called_once()
+        self.assertEqual(
+            self._ctx.instance.runtime_properties['name'],
+            'Realized Segment'
+        )
+        current_ctx.clear()
+
+    def test_export_operation_metrics(self):
+        self._set_context_operation()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'metrics.json')
+        resource = mock.Mock(client_config={'metrics_file': path})
+        collector = metrics.MetricsCollector()
+        export_operation_metrics(resource, self._ctx, 'foo', collector)
+        # Nothing is exported when there are no api calls
+        self.assertFalse(os.path.exists(path))
+
+        collector.record(metrics.CallMetric(
+            'segments', 'get', 'Segment', 0.1, 0, 200, 10, None, 0, 0
+        ))
+        export_operation_metrics(resource, self._ctx, 'foo', collector)
+        with open(path) as metrics_file:
+            record = json.loads(metrics_file.read())
+        self.assertEqual(record['operation'], 'foo')
+        self.assertEqual(record['node_id'], 'NodeInstanceContext')
+        self.assertEqual(record['metrics']['Segment.get']['count'], 1)
+        self.assertNotIn('api_metrics', self._ctx.instance.runtime_properties)
+        current_ctx.clear()
+
     @mock.patch('nsx_t_plugin.utils.delete_runtime_properties_from_instance')
     @mock.patch('nsx_t_plugin.utils.set_basic_runtime_properties_for_instance')
     def test_update_runtime_properties_for_instance(self,
@@ -205,3 +288,126 @@ class UtilsTestCase(NSXTPluginTestBase):
             pending_states,
             ready_states
         )
+
+    @mock.patch('nsx_t_plugin.utils.time.sleep')
+    def test_wait_for_resource_started(self, mock_sleep):
+        self._set_context_operation()
+        nsx_t_state = mock.Mock(state_attr='state')
+        nsx_t_state.get = mock.Mock(side_effect=[
+            {'state': 'pending'},
+            {'state': 'pending'},
+            {'state': 'started'}
+        ])
+        wait_for_resource_started(
+            'foo_resource',
+            nsx_t_state,
+            ['pending'],
+            ['started'],
+            timeout=30
+        )
+        self.assertEqual(nsx_t_state.get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        # Backoff delay is doubled after each check
+        first_delay = mock_sleep.call_args_list[0][0][0]
+        second_delay = mock_sleep.call_args_list[1][0][0]
+        self.assertTrue(0.5 <= first_delay <= 1)
+        self.assertTrue(1 <= second_delay <= 2)
+
+    @mock.patch('nsx_t_plugin.utils.time.sleep')
+    @mock.patch('nsx_t_plugin.utils.time.time')
+    def test_wait_for_resource_started_timeout(self, mock_time, mock_sleep):
+        self._set_context_operation()
+        mock_time.side_effect = [100, 101, 112]
+        nsx_t_state = mock.Mock(state_attr='state')
+        nsx_t_state.get = mock.Mock(return_value={'state': 'pending'})
+        with self.assertRaises(OperationRetry):
+            wait_for_resource_started(
+                'foo_resource',
+                nsx_t_state,
+                ['pending'],
+                ['started'],
+                timeout=10
+            )
+        self.assertEqual(nsx_t_state.get.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    @mock.patch('nsx_t_plugin.utils.time.sleep')
+    def test_wait_for_resource_started_from_client_config(self, mock_sleep):
+        nsx_t_state = mock.Mock(
+            state_attr='state',
+            client_config={'realization_timeout': 0}
+        )
+        nsx_t_state.get = mock.Mock(return_value={'state': 'pending'})
+        with self.assertRaises(OperationRetry):
+            wait_for_resource_started(
+                'foo_resource',
+                nsx_t_state,
+                ['pending'],
+                ['started']
+            )
+        self.assertFalse(mock_sleep.called)
+
+    @mock.patch('nsx_t_plugin.utils.time.sleep')
+    def test_wait_for_resources_started(self, mock_sleep):
+        self._set_context_operation()
+        first_state = mock.Mock(state_attr='state')
+        first_state.get = mock.Mock(return_value={'state': 'started'})
+        second_state = mock.Mock(state_attr='state')
+        second_state.get = mock.Mock(side_effect=[
+            {'state': 'pending'},
+            {'state': 'started'}
+        ])
+        ready_at = wait_for_resources_started(
+            [('first', first_state, None), ('second', second_state, None)],
+            ['pending'],
+            ['started'],
+            timeout=30,
+            initial_delay=0.5
+        )
+        # Ready resources are not polled again
+        self.assertEqual(first_state.get.call_count, 1)
+        self.assertEqual(second_state.get.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertTrue(0.25 <= mock_sleep.call_args[0][0] <= 0.5)
+        self.assertEqual(sorted(ready_at.keys()), ['first', 'second'])
+
+    @mock.patch('nsx_t_plugin.utils.time.sleep')
+    def test_wait_for_resources_started_with_failed(self, mock_sleep):
+        self._set_context_operation()
+        pending_state = mock.Mock(state_attr='state')
+        pending_state.get = mock.Mock(return_value={'state': 'pending'})
+        failed_state = mock.Mock(state_attr='state')
+        failed_state.get = mock.Mock(return_value={'state': 'failed'})
+        with self.assertRaises(NonRecoverableError):
+            wait_for_resources_started(
+                [('pending', pending_state, None),
+                 ('failed', failed_state, None)],
+                ['pending'],
+                ['started'],
+                timeout=0
+            )
+        self.assertFalse(mock_sleep.called)
+
+    def test_get_ip_version(self):
+        for address in (
+                '0.0.0.0',
+                '192.168.1.1',
+                '255.255.255.255',
+                '010.1.1.1',
+                '10.1',
+                '10.0.0.0/8',
+                '::',
+                '::1',
+                'fc7e:f206:db42::',
+                'FC7E:F206::DB42',
+                '2001:db8::8a2e:370:7334',
+                '1:2:3:4:5:6:7:8',
+                '1:2:3:4:5:6:7::',
+                '::ffff:192.168.1.1'):
+            self.assertEqual(
+                get_ip_version(address), IP(address).version(), address
+            )
+        for address in ('256.1.1.1', '1::2::3', '1:2:3:4:5:6:7:8:9',
+                        '12345::', ':::', 'foo'):
+            with self.assertRaises(ValueError):
+                get_ip_version(address)
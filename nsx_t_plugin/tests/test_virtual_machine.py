@@ -18,13 +18,16 @@ import mock
 
 from com.vmware.nsx_policy.model_client import (
     IpAddressInfo,
+    PortAttachment,
+    SegmentPort as vmSegmentPort,
+    SegmentPortListResult,
     VirtualMachineListResult,
     VirtualNetworkInterfaceListResult,
     VirtualMachine as vmVirtualMachine,
     VirtualNetworkInterface as vmVirtualNetworkInterface
 )
 
-from cloudify.exceptions import NonRecoverableError
+from cloudify.exceptions import NonRecoverableError, OperationRetry
 
 # Local Imports
 from nsx_t_plugin.tests.base import NSXTPluginTestBase
@@ -179,3 +182,133 @@ class VirtualMachineTestCase(NSXTPluginTestBase):
             'test_nic2' in self._ctx.instance.runtime_properties[
                 'networks']['networks']
         )
+
+    @mock.patch('nsx_t_plugin.virtual_machine.virtual_machine'
+                '._lookup_segment_ports')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_configure_with_network_ids(self, mock_invoke, mock_ports, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties={
+                'client_config': self.client_config,
+                'resource_config': {
+                    'vm_name': 'test_vm_name',
+                    'network_ids': ['segment_1', 'segment_2']
+                }
+            },
+            test_runtime_properties={'id': 'test_vm_name'},
+            ctx_operation_name='cloudify.interfaces.lifecycle.configure')
+
+        segments_ports = {
+            'segment_1': {'port_1': {}},
+            'segment_2': {'port_2': {}, 'port_3': {}}
+        }
+        mock_ports.side_effect = \
+            lambda segment_port, network_id, refresh: \
+            segments_ports[network_id]
+        mock_invoke.return_value = VirtualNetworkInterfaceListResult(
+            results=[
+                vmVirtualNetworkInterface(
+                    ip_address_info=[
+                        IpAddressInfo(ip_addresses=['192.168.1.1'])
+                    ],
+                    display_name='test_nic1',
+                    lport_attachment_id='port_1'
+                ),
+                vmVirtualNetworkInterface(
+                    ip_address_info=[
+                        IpAddressInfo(ip_addresses=['fc7e:f206:db42::'])
+                    ],
+                    display_name='test_nic2',
+                    lport_attachment_id='port_2'
+                )
+            ]
+        )
+        virtual_machine.configure()
+        # The network interfaces are listed once for both networks
+        mock_invoke.assert_called_once()
+        self.assertEqual(mock_ports.call_count, 2)
+        runtime_properties = self._ctx.instance.runtime_properties
+        self.assertEqual(
+            runtime_properties['segment_1']['display_name'], 'test_nic1'
+        )
+        self.assertEqual(
+            runtime_properties['segment_1']['ipv4_addresses'],
+            ['192.168.1.1']
+        )
+        self.assertEqual(
+            runtime_properties['segment_2']['display_name'], 'test_nic2'
+        )
+        self.assertEqual(
+            runtime_properties['segment_2']['ipv6_addresses'],
+            ['fc7e:f206:db42::']
+        )
+        self.assertEqual(
+            sorted(runtime_properties['networks']['networks']),
+            ['test_nic1', 'test_nic2']
+        )
+
+        # Retry until all the networks are attached
+        del segments_ports['segment_2']['port_2']
+        with self.assertRaises(OperationRetry) as error:
+            virtual_machine.configure()
+        self.assertIn('segment_2', str(error.exception))
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_configure_lists_segments_ports_concurrently(
+            self, mock_invoke, _):
+        self._prepare_context_for_operation(
+            test_name='NodeInstanceContext',
+            test_properties={
+                'client_config': self.client_config,
+                'resource_config': {
+                    'vm_name': 'test_vm_name',
+                    'network_ids': ['segment_1', 'segment_2']
+                }
+            },
+            test_runtime_properties={'id': 'test_vm_name'},
+            ctx_operation_name='cloudify.interfaces.lifecycle.configure')
+
+        vifs = VirtualNetworkInterfaceListResult(
+            results=[
+                vmVirtualNetworkInterface(
+                    ip_address_info=[
+                        IpAddressInfo(ip_addresses=['192.168.1.1'])
+                    ],
+                    display_name='test_nic1',
+                    lport_attachment_id='attachment_1'
+                ),
+                vmVirtualNetworkInterface(
+                    ip_address_info=[
+                        IpAddressInfo(ip_addresses=['fc7e:f206:db42::'])
+                    ],
+                    display_name='test_nic2',
+                    lport_attachment_id='attachment_2'
+                )
+            ]
+        )
+
+        def _invoke(action, args=None, kwargs=None):
+            segment_id = (kwargs or {}).get('segment_id')
+            if not segment_id:
+                return vifs
+            attachment_id = segment_id.replace('segment', 'attachment')
+            return SegmentPortListResult(results=[
+                vmSegmentPort(
+                    id='{0}_port'.format(segment_id),
+                    attachment=PortAttachment(id=attachment_id)
+                )
+            ])
+
+        mock_invoke.side_effect = _invoke
+        virtual_machine.configure()
+        # The network interfaces are listed once and the ports once per
+        # segment from the worker threads
+        self.assertEqual(mock_invoke.call_count, 3)
+        runtime_properties = self._ctx.instance.runtime_properties
+        self.assertEqual(
+            runtime_properties['segment_1']['display_name'], 'test_nic1'
+        )
+        self.assertEqual(
+            runtime_properties['segment_2']['display_name'], 'test_nic2'
+        )
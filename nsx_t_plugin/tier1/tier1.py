@@ -22,7 +22,7 @@ from nsx_t_plugin.constants import (
     STATE_IN_SYNC
 )
 from nsx_t_plugin.utils import (
-    validate_if_resource_started,
+    wait_for_resource_started,
     validate_if_resource_deleted,
 )
 from nsx_t_sdk.resources import Tier1, Tier1state
@@ -36,11 +36,12 @@ def create(nsx_t_resource):
     nsx_t_resource.resource_id = resource.id
     # Save path as runtime property to use it later on
     ctx.instance.runtime_properties['path'] = resource.path
+    return resource
 
 
 @with_nsx_t_client(Tier1state)
 def start(nsx_t_resource):
-    validate_if_resource_started(
+    wait_for_resource_started(
         'Tier1',
         nsx_t_resource,
         [STATE_IN_PROGRESS, STATE_PENDING],
@@ -13,20 +13,82 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import re
+import time
+import random
+
+from IPy import IP
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError, OperationRetry
 from cloudify.constants import NODE_INSTANCE, RELATIONSHIP_INSTANCE
 
 from com.vmware.vapi.std.errors_client import NotFound, Error
+from vmware.vapi.bindings.struct import VapiStruct
 
+from nsx_t_sdk.metrics import export_to_file
 from nsx_t_plugin.constants import (
     DELETE_OPERATION,
     CREATE_OPERATION,
+    REALIZATION_TIMEOUT,
+    REALIZATION_INITIAL_DELAY,
+    REALIZATION_MAX_DELAY,
     NSXT_ID_PROPERTY,
     NSXT_NAME_PROPERTY,
     NSXT_TYPE_PROPERTY,
-    NSXT_RESOURCE_CONFIG_PROPERTY
+    NSXT_RESOURCE_CONFIG_PROPERTY,
+    NSXT_METRICS_PROPERTY
+)
+
+
+# Common forms of addresses, which are classified without parsing them
+_IPV4_PATTERN = re.compile(
+    r'^(?:(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\.){3}'
+    r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\Z'
 )
+_IPV6_PATTERN = re.compile(r'^[0-9A-Fa-f:]{2,39}\Z')
+
+
+def _is_ipv6_address(address):
+    if not _IPV6_PATTERN.match(address):
+        return False
+    head, compressed, tail = address.partition('::')
+    if '::' in tail:
+        return False
+    hextets = (head.split(':') if head else []) + \
+        (tail.split(':') if tail else [])
+    if not all(1 <= len(hextet) <= 4 for hextet in hextets):
+        return False
+    return len(hextets) < 8 if compressed else len(hextets) == 8
+
+
+def get_ip_version(address):
+    """
+    Classify IP address by version. Plain dotted & colon addresses are
+    matched by patterns and only the other forms, i.e IPv4 mapped IPv6
+    addresses, are parsed by IPy
+    :param address: IP address as string
+    :return: 4 or 6
+    """
+    if _IPV4_PATTERN.match(address):
+        return 4
+    if _is_ipv6_address(address):
+        return 6
+    return IP(address).version()
+
+
+def update_subnet_configuration(resource_config):
+    """
+    Replace the `subnet` of the segment config with the `subnets` list
+    expected by the NSX-T api
+    :param resource_config: Segment resource config, which is updated
+    """
+    subnet = resource_config.pop('subnet', {})
+    if subnet:
+        resource_config['subnets'] = []
+        for ip_option in ['ip_v4_config', 'ip_v6_config']:
+            ip_option_config = subnet.get(ip_option)
+            if ip_option_config:
+                resource_config['subnets'].append(ip_option_config)
 
 
 def get_relationship_subject_context(_ctx):
@@ -124,15 +186,30 @@ def delete_runtime_properties_from_instance(_ctx):
         del _ctx.instance.runtime_properties[key]
 
 
-def set_basic_runtime_properties_for_instance(nsx_t_resource, _ctx):
+def set_basic_runtime_properties_for_instance(
+        nsx_t_resource,
+        _ctx,
+        resource=None
+):
     """
     Set NSXT "id" & "type" as runtime properties for node instance
     :param nsx_t_resource: NSXT resource instance
     :param _ctx: Cloudify node instance which is could be an instance of
     RelationshipSubjectContext or CloudifyContext
+    :param resource: The object returned by the NSXT Manager API when the
+    resource was created, so that it does not need to be fetched again
     """
     if _ctx and nsx_t_resource:
-        resource_config = nsx_t_resource.get()
+        refresh = nsx_t_resource.client_config.get('refresh_after_create')
+        if resource is not None and not refresh:
+            resource_config = resource.to_dict() \
+                if isinstance(resource, VapiStruct) else resource
+        # Resources that cannot be fetched back keep the config they are
+        # created with
+        elif nsx_t_resource.allow_get:
+            resource_config = nsx_t_resource.get()
+        else:
+            resource_config = nsx_t_resource.resource_config
         _ctx.instance.runtime_properties[
             NSXT_TYPE_PROPERTY] = nsx_t_resource.resource_type
         _ctx.instance.runtime_properties[
@@ -146,7 +223,12 @@ def set_basic_runtime_properties_for_instance(nsx_t_resource, _ctx):
             NSXT_RESOURCE_CONFIG_PROPERTY] = resource_config
 
 
-def update_runtime_properties_for_instance(nsx_t_resource, _ctx, operation):
+def update_runtime_properties_for_instance(
+        nsx_t_resource,
+        _ctx,
+        operation,
+        resource=None
+):
     """
     This method will update runtime properties for node instance based on
     the operation task being running
@@ -154,32 +236,73 @@ def update_runtime_properties_for_instance(nsx_t_resource, _ctx, operation):
     :param _ctx: Cloudify node instance which is could be an instance of
     RelationshipSubjectContext or CloudifyContext
     :param str operation:
+    :param resource: The object returned by the operation if any
     """
     if operation == CREATE_OPERATION:
-        set_basic_runtime_properties_for_instance(nsx_t_resource, _ctx)
+        set_basic_runtime_properties_for_instance(
+            nsx_t_resource,
+            _ctx,
+            resource
+        )
     elif operation == DELETE_OPERATION:
         delete_runtime_properties_from_instance(_ctx)
 
 
-def validate_if_resource_started(
-        resource_name,
-        nsx_t_state,
-        pending_states,
-        ready_states,
-        args=None
-):
+def export_operation_metrics(nsx_t_resource, _ctx, operation, collector):
     """
-    This method will validate if the nsx_t_resource is ready to use and started
-    :param resource_name: The name of the resource we need to get state for
-    :param nsx_t_state: Instance derived from "NSXTResource" class
-    :param pending_states: List of pending state to wait for
-    :param ready_states: List of ready states to say that resource is ready
-    :param args any extra args to passed to the get state api
+    Export the metrics of the NSX-T api calls made by the operation based
+    on the "client_config" of the resource. "metrics_runtime_properties"
+    keep the summary of the last run of each operation as runtime property
+    and "metrics_file" append the summary to json lines file
+    :param nsx_t_resource: NSXT resource instance
+    :param _ctx: Cloudify node instance which is could be an instance of
+    RelationshipSubjectContext or CloudifyContext
+    :param str operation: The name of the operation
+    :param collector: Instance of `MetricsCollector` used by the operation
     """
+    client_config = nsx_t_resource.client_config
+    to_runtime_properties = client_config.get('metrics_runtime_properties')
+    metrics_file = client_config.get('metrics_file')
+    if not (to_runtime_properties or metrics_file) or not len(collector):
+        return
+    summary = collector.summary()
+    if to_runtime_properties:
+        operations_metrics = dict(
+            _ctx.instance.runtime_properties.get(NSXT_METRICS_PROPERTY) or {}
+        )
+        operations_metrics[operation] = summary
+        _ctx.instance.runtime_properties[NSXT_METRICS_PROPERTY] = \
+            operations_metrics
+    if metrics_file:
+        try:
+            export_to_file(
+                metrics_file,
+                summary,
+                node_id=_ctx.node.id,
+                instance_id=_ctx.instance.id,
+                operation=operation
+            )
+        except (IOError, OSError) as error:
+            ctx.logger.warning(
+                'Failed to write api metrics to {0}: {1}'.format(
+                    metrics_file, error)
+            )
+
+
+def _get_resource_state(nsx_t_state, args=None):
     resource_state = nsx_t_state.get(args=args)
     state = resource_state[nsx_t_state.state_attr]
     if isinstance(state, dict):
         state = state['state']
+    return state
+
+
+def _validate_resource_state(
+        resource_name,
+        state,
+        pending_states,
+        ready_states
+):
     if state in pending_states:
         raise OperationRetry(
             '{0} state '
@@ -197,6 +320,176 @@ def validate_if_resource_started(
         )
 
 
+def get_realization_timeout(nsx_t_resource):
+    """
+    Return the number of seconds to wait for resource realization inside
+    the operation, which is configured using `realization_timeout` of the
+    client config
+    :param nsx_t_resource: Instance derived from "NSXTResource" class
+    """
+    timeout = nsx_t_resource.client_config.get('realization_timeout')
+    return REALIZATION_TIMEOUT if timeout is None else float(timeout)
+
+
+def validate_if_resource_started(
+        resource_name,
+        nsx_t_state,
+        pending_states,
+        ready_states,
+        args=None
+):
+    """
+    This method will validate if the nsx_t_resource is ready to use and started
+    :param resource_name: The name of the resource we need to get state for
+    :param nsx_t_state: Instance derived from "NSXTResource" class
+    :param pending_states: List of pending state to wait for
+    :param ready_states: List of ready states to say that resource is ready
+    :param args any extra args to passed to the get state api
+    """
+    _validate_resource_state(
+        resource_name,
+        _get_resource_state(nsx_t_state, args),
+        pending_states,
+        ready_states
+    )
+
+
+def wait_for_resources_started(
+        resources,
+        pending_states,
+        ready_states,
+        timeout=None,
+        initial_delay=REALIZATION_INITIAL_DELAY
+):
+    """
+    This method will wait for many nsx_t_resources to be ready to use by
+    polling their states together inside the operation using exponential
+    backoff with jitter. The operation is retried only when one of the
+    resources is still pending after the timeout
+    :param resources: List of tuples (resource_name, nsx_t_state, args)
+    where nsx_t_state is instance derived from "NSXTResource" class and args
+    are any extra args to passed to the get state api
+    :param pending_states: List of pending state to wait for
+    :param ready_states: List of ready states to say that resource is ready
+    :param timeout: Seconds to wait before retry the operation, default to
+    the `realization_timeout` of the client config
+    :param initial_delay: Seconds to wait before the second state check
+    :return: Dict of resource_name to the time it was found ready
+    """
+    if timeout is None:
+        timeout = get_realization_timeout(resources[0][1])
+    deadline = time.time() + timeout
+    delay = initial_delay
+    states = {}
+    ready_at = {}
+    pending = list(resources)
+    while True:
+        still_pending = []
+        for resource in pending:
+            resource_name, nsx_t_state, args = resource
+            state = _get_resource_state(nsx_t_state, args)
+            states[resource_name] = state
+            if state in pending_states:
+                still_pending.append(resource)
+            else:
+                ready_at[resource_name] = time.time()
+        pending = still_pending
+        if not pending:
+            break
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        ctx.logger.debug(
+            '{0} still pending, check again in {1} seconds'.format(
+                ', '.join(resource[0] for resource in pending), delay)
+        )
+        time.sleep(min(remaining, random.uniform(delay / 2.0, delay)))
+        delay = min(delay * 2, REALIZATION_MAX_DELAY)
+
+    # Report failed resources before asking to retry for pending ones
+    for resource_name, _, _ in sorted(
+            resources,
+            key=lambda resource: states[resource[0]] in pending_states
+    ):
+        _validate_resource_state(
+            resource_name,
+            states[resource_name],
+            pending_states,
+            ready_states
+        )
+    return ready_at
+
+
+def wait_for_resource_started(
+        resource_name,
+        nsx_t_state,
+        pending_states,
+        ready_states,
+        args=None,
+        timeout=None
+):
+    """
+    This method will wait for the nsx_t_resource to be ready to use by
+    polling its state inside the operation using exponential backoff with
+    jitter. The operation is retried only when the resource is still pending
+    after the timeout
+    :param resource_name: The name of the resource we need to get state for
+    :param nsx_t_state: Instance derived from "NSXTResource" class
+    :param pending_states: List of pending state to wait for
+    :param ready_states: List of ready states to say that resource is ready
+    :param args any extra args to passed to the get state api
+    :param timeout: Seconds to wait before retry the operation, default to
+    the `realization_timeout` of the client config
+    """
+    wait_for_resources_started(
+        [(resource_name, nsx_t_state, args)],
+        pending_states,
+        ready_states,
+        timeout=timeout
+    )
+
+
+def wait_for_resources_deleted(
+        resource_name,
+        list_resources,
+        timeout,
+        initial_delay=REALIZATION_INITIAL_DELAY
+):
+    """
+    This method will wait for a set of resources to be deleted by polling
+    `list_resources` inside the operation using exponential backoff with
+    jitter. The operation is retried only when some of the resources still
+    exist after the timeout
+    :param resource_name: The name of the resources we need to wait for
+    :param list_resources: Callable that return the resources that still
+    exist
+    :param timeout: Seconds to wait before retry the operation
+    :param initial_delay: Seconds to wait before the second check
+    """
+    deadline = time.time() + timeout
+    delay = initial_delay
+    resources = list_resources()
+    while resources:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        ctx.logger.debug(
+            '{0} {1} objects still exist, check again '
+            'in {2} seconds'.format(len(resources), resource_name, delay)
+        )
+        time.sleep(min(remaining, random.uniform(delay / 2.0, delay)))
+        delay = min(delay * 2, REALIZATION_MAX_DELAY)
+        resources = list_resources()
+
+    if resources:
+        raise OperationRetry(
+            message='{0} {1} objects deletion is in progress.'.format(
+                len(resources), resource_name
+            )
+        )
+    ctx.logger.info('All {0} objects are deleted'.format(resource_name))
+
+
 def validate_if_resource_deleted(nsx_t_resource, args=None):
     """
     This method will validate if the NSXT resource get deleted or not
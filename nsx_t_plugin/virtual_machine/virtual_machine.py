@@ -13,12 +13,13 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-from IPy import IP
-
 from cloudify import ctx
 from cloudify.exceptions import NonRecoverableError, OperationRetry
 
 from nsx_t_plugin.decorators import with_nsx_t_client
+from nsx_t_plugin.utils import get_ip_version
+from nsx_t_sdk.exceptions import ConcurrentTaskError
+from nsx_t_sdk.executor import BoundedExecutor
 from nsx_t_sdk.resources import (
      VirtualMachine,
      VirtualNetworkInterface,
@@ -26,38 +27,29 @@ from nsx_t_sdk.resources import (
 )
 
 
-def _update_network_with_ipv4_and_ipv6(network):
-    ipv_4 = []
-    ipv_6 = []
+def _get_ip_addresses(network):
     ip_address_info = network.get('ip_address_info', []) or []
     for ip_address_obj in ip_address_info:
-        ip_addresses = ip_address_obj.get('ip_addresses', []) or []
-        for ip_address in ip_addresses:
-            if IP(ip_address).version() == 4:
-                ipv_4.append(ip_address)
-            elif IP(ip_address).version() == 6:
-                ipv_6.append(ip_address)
+        for ip_address in ip_address_obj.get('ip_addresses', []) or []:
+            yield ip_address
 
-    network['ipv4_addresses'] = ipv_4
-    network['ipv6_addresses'] = ipv_6
 
+def _update_networks_with_ipv4_and_ipv6(networks):
+    for network in networks:
+        ipv_4 = []
+        ipv_6 = []
+        for ip_address in _get_ip_addresses(network):
+            ip_version = get_ip_version(ip_address)
+            if ip_version == 4:
+                ipv_4.append(ip_address)
+            elif ip_version == 6:
+                ipv_6.append(ip_address)
+        network['ipv4_addresses'] = ipv_4
+        network['ipv6_addresses'] = ipv_6
 
-def _lookup_segment_ports(client_config, network_name):
-    segment_port = SegmentPort(
-        client_config=client_config,
-        logger=ctx.logger,
-        resource_config={}
-    )
-    ports = []
-    for nsx_t_port in segment_port.list(
-            filters={
-                'segment_id': network_name
-            }
-    ):
-        if nsx_t_port.get('attachment'):
-            ports.append(nsx_t_port['attachment']['id'])
 
-    return ports
+def _lookup_segment_ports(segment_port, network_name, refresh):
+    return segment_port.get_attachment_index(network_name, refresh=refresh)
 
 
 def _get_target_network(ports, network):
@@ -66,43 +58,95 @@ def _get_target_network(ports, network):
     return network if network['lport_attachment_id'] in ports else {}
 
 
+def _get_network_ids(resource_config):
+    network_ids = list(resource_config.get('network_ids') or [])
+    network_id = resource_config.get('network_id')
+    if network_id and network_id not in network_ids:
+        network_ids.insert(0, network_id)
+    return network_ids
+
+
+def _lookup_segments_ports(client_config, network_ids):
+    # The ports of all the segments are listed concurrently. The context is
+    # local to this thread, so everything that needs it is prepared here
+    # and only the listing runs in the worker threads
+    executor = BoundedExecutor()
+    # The retries list the ports again in case the cached ones are not
+    # attached to the virtual machine yet
+    refresh = bool(ctx.operation.retry_number)
+    for network_id in network_ids:
+        segment_port = SegmentPort(
+            client_config=client_config,
+            logger=ctx.logger,
+            resource_config={}
+        )
+        executor.submit(
+            network_id,
+            _lookup_segment_ports,
+            segment_port,
+            network_id,
+            refresh
+        )
+    try:
+        return executor.run()
+    except ConcurrentTaskError as error:
+        # Raise the error of the first segment that failed, so that it is
+        # handled the same way as when one segment is looked up
+        raise next(iter(error.errors.values()))
+
+
 def _populate_networks_for_virtual_machine(
         client_config,
         owner_vm_id,
-        network_id,
+        network_ids,
         networks
 ):
-    ports = _lookup_segment_ports(client_config, network_id)
-    if not ports:
+    segments_ports = _lookup_segments_ports(client_config, network_ids)
+    not_connected = [
+        network_id for network_id in network_ids
+        if not segments_ports[network_id]
+    ]
+    if not_connected:
         raise OperationRetry(
             'Network {0} is not connected to any virtual machine'.format(
-                network_id)
+                ', '.join(not_connected))
         )
     else:
         networks_obj = {}
         networks_obj['networks'] = {}
-        target_network = {}
+        target_networks = dict(
+            (network_id, {}) for network_id in network_ids
+        )
+        _update_networks_with_ipv4_and_ipv6(networks)
         for network in networks:
-            _update_network_with_ipv4_and_ipv6(network)
-            if not target_network:
-                target_network = _get_target_network(ports, network)
+            for network_id in network_ids:
+                if not target_networks[network_id]:
+                    target_networks[network_id] = _get_target_network(
+                        segments_ports[network_id], network
+                    )
             networks_obj['networks'][network['display_name']] = network
 
-        if not target_network:
+        not_attached = [
+            network_id for network_id in network_ids
+            if not target_networks[network_id]
+        ]
+        if not_attached:
             raise OperationRetry(
                 'The selected network {0} still not '
                 'attached to target virtual machine {1}'
-                ''.format(network_id, owner_vm_id)
+                ''.format(', '.join(not_attached), owner_vm_id)
             )
         else:
-            ctx.instance.runtime_properties[network_id] = target_network
+            for network_id in network_ids:
+                ctx.instance.runtime_properties[network_id] = \
+                    target_networks[network_id]
             ctx.instance.runtime_properties['networks'] = networks_obj
 
 
 @with_nsx_t_client(VirtualMachine)
 def create(nsx_t_resource):
-    network_id = nsx_t_resource.resource_config.get('network_id')
-    if not network_id:
+    network_ids = _get_network_ids(nsx_t_resource.resource_config)
+    if not network_ids:
         raise NonRecoverableError(
             'Network name is required in order '
             'to fetch the network interface attached to target '
@@ -111,7 +155,7 @@ def create(nsx_t_resource):
     ctx.logger.info(
         'Preparing resource to fetch target network interface'
         ' {0} for target virtual machine'
-        ''.format(network_id)
+        ''.format(', '.join(network_ids))
     )
 
 
@@ -120,12 +164,15 @@ def configure(nsx_t_resource):
     owner_vm_id = ctx.instance.runtime_properties.get('id')
     if not owner_vm_id:
         owner_vm_id = nsx_t_resource.resource_id
-    filters = {
-        'owner_vm_id': owner_vm_id
-    }
-    # This will list all networks interface attached to specific vm
-    networks = nsx_t_resource.list(filters=filters)
-    network_id = nsx_t_resource.resource_config.get('network_id')
+    # This will list all networks interface attached to specific vm, the
+    # retries get them from the manager in case the cached ones are not
+    # attached to the network yet. The interfaces are listed once for all
+    # the networks
+    networks = nsx_t_resource.lookup(
+        owner_vm_id=owner_vm_id,
+        refresh=bool(ctx.operation.retry_number)
+    )
+    network_ids = _get_network_ids(nsx_t_resource.resource_config)
     if not networks:
         raise NonRecoverableError(
             'Virtual Machine is not attached to any '
@@ -134,6 +181,6 @@ def configure(nsx_t_resource):
     _populate_networks_for_virtual_machine(
         nsx_t_resource.client_config,
         owner_vm_id,
-        network_id,
+        network_ids,
         networks
     )
@@ -21,12 +21,23 @@ PY2 = sys.version_info[0] == 2
 
 
 if PY2:
+    import Queue as queue
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+    from collections import Mapping
     text_type = unicode
 
 else:
+    import queue
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+    from collections.abc import Mapping
     text_type = str
 
 
 __all__ = [
-    'PY2', 'text_type',
+    'PY2', 'queue', 'text_type', 'HTTPServer', 'BaseHTTPRequestHandler',
+    'ThreadingMixIn', 'urlparse', 'parse_qs', 'Mapping',
 ]
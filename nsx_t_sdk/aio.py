@@ -0,0 +1,786 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Asyncio variant of the NSX-T resources, for tools that drive many api calls
+concurrently from one thread. It requires python 3 & aiohttp:
+
+    async with AsyncNSXTClient(client_config, logger) as client:
+        segments = [
+            client.resource(Segment, {'id': segment_id})
+            for segment_id in segment_ids
+        ]
+        results = await asyncio.gather(
+            *[segment.get() for segment in segments]
+        )
+"""
+
+import ssl
+import asyncio
+from string import Formatter
+from urllib.parse import quote
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from vmware.vapi.bindings.common import NameToTypeResolver
+from vmware.vapi.bindings.converter import RestConverter, TypeConverter
+from vmware.vapi.bindings.error import UnresolvedError, VapiError
+from vmware.vapi.bindings.struct import VapiStruct
+from vmware.vapi.bindings.type import DynamicStructType
+from vmware.vapi.data.serializers.cleanjson import DataValueConverter
+from vmware.vapi.data.serializers.rest import RestSerializer
+
+from com.vmware.vapi.std import errors_client
+from com.vmware.vapi.std.errors_client import (
+    Unauthenticated,
+    Unauthorized,
+    ServiceUnavailable,
+    ConcurrentChange,
+    InvalidRequest
+)
+
+from nsx_t_sdk import metrics
+from nsx_t_sdk.common import (
+    NSXTResource,
+    AUTH_SESSION,
+    ACTION_DELETE,
+    ACTION_GET,
+    ACTION_LIST,
+    ACTION_UPDATE,
+    ACTION_PATCH,
+    REVISION_FIELD,
+    get_included_fields,
+    get_delta,
+    get_new_results,
+    get_revision,
+    project_fields
+)
+from nsx_t_sdk.exceptions import NSXTSDKException
+from nsx_t_sdk.inventory import index_attachments
+from nsx_t_sdk.ratelimit import SharedTokenBucket
+from nsx_t_sdk.registry import LazyModuleRegistry
+from nsx_t_sdk.resources import (
+    DhcpServerConfig,
+    DhcpStaticBindingConfigs,
+    Infra,
+    Segment,
+    SegmentPort,
+    Tier1,
+    VirtualMachine,
+    VirtualNetworkInterface
+)
+from nsx_t_sdk.session import (
+    SESSION_TIMEOUT,
+    SESSION_CREATE_PATH,
+    SESSION_DESTROY_PATH,
+    SessionToken
+)
+
+# Maximum number of api calls sent at the same time by one client, which is
+# the default concurrency limit per client of the NSX-T Manager
+AIO_MAX_CONCURRENCY = 40
+
+NSX_MODEL_MODULES = LazyModuleRegistry({
+    'nsx': 'com.vmware.nsx.model_client',
+    'nsx_policy': 'com.vmware.nsx_policy.model_client'
+})
+
+HTTP_METHODS = {
+    ACTION_GET: 'GET',
+    ACTION_LIST: 'GET',
+    ACTION_UPDATE: 'PUT',
+    ACTION_PATCH: 'PATCH',
+    ACTION_DELETE: 'DELETE'
+}
+
+# Polymorphic resources, i.e dhcp static bindings, are returned as untyped
+# structures the same way the synchronous stubs return them
+_DYNAMIC_STRUCT_TYPE = DynamicStructType(
+    'vmware.vapi.dynamic_struct', {}, VapiStruct
+)
+
+# All the standard errors are resolved, the rest api does not tell which of
+# them an operation raises
+_ERROR_RESOLVER = NameToTypeResolver(dict(
+    (error_type.definition.name, error_type) for error_type in (
+        getattr(errors_client, name).get_binding_type()
+        for name in dir(errors_client)
+        if isinstance(getattr(errors_client, name), type)
+        and issubclass(getattr(errors_client, name), VapiError)
+        and getattr(errors_client, name) is not VapiError
+    )
+))
+
+
+class RestResource(object):
+    """
+    REST api of one resource as documented by the NSX-T api guide
+    :param path: Path of the collection of the resource, with the ids of its
+    parents as named fields, i.e "/policy/api/v1/infra/segments/{segment_id}
+    /ports"
+    :param models: Name of the models module, "nsx" or "nsx_policy"
+    :param model: Name of the model of the resource, default to untyped
+    structure
+    :param list_model: Name of the model of the list results
+    """
+    def __init__(self, path, models, model=None, list_model=None):
+        self.path = path
+        self.models = models
+        self.model = model
+        self.list_model = list_model
+        self.path_fields = [
+            name for _, name, _, _ in Formatter().parse(path) if name
+        ]
+
+    def get_path(self, ids):
+        """
+        :param ids: The ids of the parents of the resource, followed by the
+        id of the resource unless the collection is requested
+        :return: The url path of the resource
+        """
+        if len(ids) < len(self.path_fields):
+            raise NSXTSDKException(
+                'Missing ids of {0}'.format(', '.join(self.path_fields))
+            )
+        ids = [quote(str(resource_id), safe='') for resource_id in ids]
+        path = self.path.format(
+            **dict(zip(self.path_fields, ids[:len(self.path_fields)]))
+        )
+        for resource_id in ids[len(self.path_fields):]:
+            path = '{0}/{1}'.format(path, resource_id)
+        return path
+
+    def get_type(self, model):
+        """
+        :param model: Name of the model, None for untyped structures
+        :return: The binding type of the model
+        """
+        if model is None:
+            return _DYNAMIC_STRUCT_TYPE
+        models = NSX_MODEL_MODULES[self.models]
+        return getattr(models, model).get_binding_type()
+
+    def get_result_type(self, action):
+        """
+        :return: The binding type of the result of the action, None when the
+        action does not return anything
+        """
+        if action in (ACTION_PATCH, ACTION_DELETE):
+            return None
+        if action == ACTION_LIST:
+            return self.get_type(self.list_model)
+        return self.get_type(self.model)
+
+
+REST_RESOURCES = {
+    Infra: RestResource('/policy/api/v1/infra', 'nsx_policy', 'Infra'),
+    Segment: RestResource(
+        '/policy/api/v1/infra/segments',
+        'nsx_policy',
+        'Segment',
+        'SegmentListResult'
+    ),
+    SegmentPort: RestResource(
+        '/policy/api/v1/infra/segments/{segment_id}/ports',
+        'nsx_policy',
+        'SegmentPort',
+        'SegmentPortListResult'
+    ),
+    DhcpStaticBindingConfigs: RestResource(
+        '/policy/api/v1/infra/segments/{segment_id}'
+        '/dhcp-static-binding-configs',
+        'nsx_policy',
+        list_model='DhcpStaticBindingConfigListResult'
+    ),
+    DhcpServerConfig: RestResource(
+        '/policy/api/v1/infra/dhcp-server-configs',
+        'nsx_policy',
+        'DhcpServerConfig',
+        'DhcpServerConfigListResult'
+    ),
+    Tier1: RestResource(
+        '/policy/api/v1/infra/tier-1s',
+        'nsx_policy',
+        'Tier1',
+        'Tier1ListResult'
+    ),
+    VirtualMachine: RestResource(
+        '/api/v1/fabric/virtual-machines',
+        'nsx',
+        'VirtualMachine',
+        'VirtualMachineListResult'
+    ),
+    VirtualNetworkInterface: RestResource(
+        '/api/v1/fabric/vifs',
+        'nsx',
+        'VirtualNetworkInterface',
+        'VirtualNetworkInterfaceListResult'
+    )
+}
+
+
+class RestRequest(object):
+    """
+    One api call of a resource, sent over the REST api
+    :param rest_resource: Instance of `RestResource`
+    :param action: The action of the resource, i.e "get"
+    :param args: The ids of the resource, followed by the object for the
+    update & patch actions
+    :param kwargs: The params of the list action
+    """
+    def __init__(self, rest_resource, action, args, kwargs):
+        if action not in HTTP_METHODS:
+            raise NSXTSDKException(
+                '{0} is not supported by the async client'.format(action)
+            )
+        self.method = HTTP_METHODS[action]
+        self.body = None
+        self.params = {}
+        ids = list(args)
+        if action in (ACTION_UPDATE, ACTION_PATCH):
+            # Same conversion as the synchronous stubs, so that objects can
+            # be dicts with the fields names of the bindings
+            self.body = DataValueConverter.convert_to_json(
+                TypeConverter.convert_to_vapi(
+                    ids.pop(),
+                    rest_resource.get_type(rest_resource.model),
+                    RestConverter.SWAGGER_REST
+                )
+            )
+        elif action == ACTION_LIST:
+            params = dict(kwargs)
+            ids = [
+                params.pop(name, None) for name in rest_resource.path_fields
+            ]
+            if None in ids:
+                ids = ids[:ids.index(None)]
+            for name, value in params.items():
+                if value is None:
+                    continue
+                if isinstance(value, bool):
+                    value = 'true' if value else 'false'
+                self.params[name] = str(value)
+        self.path = rest_resource.get_path(ids)
+        self.result_type = rest_resource.get_result_type(action)
+
+    def parse_response(self, status, body):
+        """
+        :return: The result of the call as binding
+        :raise: The error of the response as binding
+        """
+        method_result = RestSerializer.deserialize_response(
+            status, body, False
+        )
+        if method_result.success():
+            if self.result_type is None:
+                return None
+            return TypeConverter.convert_to_python(
+                method_result.output,
+                self.result_type,
+                _ERROR_RESOLVER,
+                RestConverter.SWAGGER_REST
+            )
+        error_type = _ERROR_RESOLVER.resolve(method_result.error.name)
+        if error_type is None:
+            raise UnresolvedError(method_result.error)
+        raise TypeConverter.convert_to_python(
+            method_result.error,
+            error_type,
+            _ERROR_RESOLVER,
+            RestConverter.SWAGGER_REST
+        )
+
+
+def get_rest_resource(resource_class):
+    """
+    :param resource_class: Subclass of `NSXTResource`, i.e `Segment`
+    :return: Instance of `RestResource` of the resource class or of its
+    closest base class
+    """
+    for class_type in resource_class.__mro__:
+        if class_type in REST_RESOURCES:
+            return REST_RESOURCES[class_type]
+    raise NSXTSDKException(
+        '{0} is not supported by the async client'.format(
+            resource_class.__name__)
+    )
+
+
+class AsyncNSXTClient(object):
+    """
+    Send the api calls of the async resources to one NSX-T Manager over a
+    pool of keep-alive connections, with at most `max_concurrency` calls in
+    flight at any time. It must be opened inside the event loop that runs
+    the calls, i.e using `async with`
+    :param client_config: Same client config as the synchronous resources
+    :param logger: Logger used by the resources
+    :param max_concurrency: Maximum number of api calls sent at once
+    :param pool_size: Maximum number of connections, default to the max
+    concurrency
+    """
+    def __init__(self,
+                 client_config,
+                 logger,
+                 max_concurrency=AIO_MAX_CONCURRENCY,
+                 pool_size=None):
+        if aiohttp is None:
+            raise NSXTSDKException(
+                'aiohttp must be installed in order to use the async client'
+            )
+        if max_concurrency < 1:
+            raise NSXTSDKException('max_concurrency must be greater than 0')
+        self.client_config = client_config
+        self.logger = logger
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size or max_concurrency
+        self._session = None
+        self._semaphore = None
+        self._login_lock = None
+        self._token = None
+
+    @property
+    def url(self):
+        return 'https://{0}:{1}'.format(
+            self.client_config.get('host'), self.client_config.get('port')
+        )
+
+    @property
+    def auth_type(self):
+        return self.client_config.get('auth_type')
+
+    def resource(self, resource_class, resource_config=None):
+        """
+        :param resource_class: Subclass of `NSXTResource`, i.e `Segment`
+        :param resource_config: Same resource config as the synchronous
+        resource
+        :return: Async instance of the resource class
+        """
+        return get_async_resource_class(resource_class)(
+            self, resource_config
+        )
+
+    def _get_ssl(self):
+        # Same semantic as the `verify` & `cert` options of requests
+        verify = self.client_config.get('insecure')
+        cert = self.client_config.get('cert')
+        if verify is False and not cert:
+            return False
+        context = ssl.create_default_context(
+            cafile=verify if isinstance(verify, str) else None
+        )
+        if verify is False:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if isinstance(cert, (list, tuple)):
+            context.load_cert_chain(*cert)
+        elif cert:
+            context.load_cert_chain(cert)
+        return context
+
+    async def open(self):  # noqa: E999 python 3 only
+        auth = None
+        if self.auth_type != AUTH_SESSION:
+            auth = aiohttp.BasicAuth(
+                self.client_config.get('username'),
+                self.client_config.get('password')
+            )
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ssl=self._get_ssl()
+            ),
+            auth=auth,
+            # The session cookie is sent with the other session headers
+            cookie_jar=aiohttp.DummyCookieJar()
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._login_lock = asyncio.Lock()
+        return self
+
+    async def close(self):
+        if self._session is None:
+            return
+        try:
+            if self._token:
+                self.logger.debug('Destroying NSX-T Manager session....')
+                async with self._session.post(
+                    '{0}/{1}'.format(self.url, SESSION_DESTROY_PATH),
+                    headers=self._token.headers
+                ):
+                    pass
+        finally:
+            self._token = None
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _login(self):
+        self.logger.debug('Creating new session with NSX-T Manager....')
+        async with self._session.post(
+            '{0}/{1}'.format(self.url, SESSION_CREATE_PATH),
+            data={
+                'j_username': self.client_config.get('username'),
+                'j_password': self.client_config.get('password')
+            }
+        ) as response:
+            response.raise_for_status()
+            return SessionToken(
+                response.headers.get('Set-Cookie'),
+                response.headers.get('X-XSRF-TOKEN'),
+                timeout=self.client_config.get('session_timeout')
+                or SESSION_TIMEOUT
+            )
+
+    async def _refresh_session_auth(self, stale_token=None):
+        # Only the first of the calls that find the token missing, expiring
+        # or rejected login again
+        async with self._login_lock:
+            token = self._token
+            if token is None or token is stale_token or token.is_expiring():
+                self._token = token = await self._login()
+            return token
+
+    async def _request(self, request, call, headers=None):
+        request_headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+        if headers:
+            request_headers.update(headers)
+        async with self._session.request(
+            request.method,
+            '{0}{1}'.format(self.url, request.path),
+            params=request.params,
+            data=request.body,
+            headers=request_headers
+        ) as response:
+            response_body = await response.text(encoding='utf-8')
+            call.status = response.status
+            call.retry_after = response.headers.get('Retry-After')
+            call.response_size = len(response_body)
+        return request.parse_response(call.status, response_body)
+
+    async def send(self, request, call):
+        """
+        Send one api call
+        :param request: Instance of `RestRequest`
+        :param call: Instance of `metrics.ApiCall` that record the call
+        :return: The result of the call
+        """
+        if self._session is None:
+            raise NSXTSDKException('The async client is not opened')
+        async with self._semaphore:
+            if self.auth_type != AUTH_SESSION:
+                return await self._request(request, call)
+            token = await self._refresh_session_auth()
+            try:
+                result = await self._request(request, call, token.headers)
+            except (Unauthenticated, Unauthorized):
+                # The session expired or destroyed on the manager side,
+                # login again and retry once
+                self.logger.debug('Session is rejected, login again....')
+                call.add_retry()
+                token = await self._refresh_session_auth(stale_token=token)
+                result = await self._request(request, call, token.headers)
+            token.touch()
+            return result
+
+
+async def _acquire(rate_limiter):
+    """
+    Wait without blocking the event loop until the rate limiter has a token
+    :return: The number of seconds waited
+    """
+    waited = 0
+    while True:
+        if isinstance(rate_limiter, SharedTokenBucket):
+            # The lock of the file of the bucket is blocking
+            wait = await asyncio.get_event_loop().run_in_executor(
+                None, rate_limiter.try_acquire
+            )
+        else:
+            wait = rate_limiter.try_acquire()
+        if not wait:
+            return waited
+        await asyncio.sleep(wait)
+        waited += wait
+
+
+class AsyncNSXTResource(NSXTResource):
+    """
+    Base class of the async resources, which are built from the resource
+    classes using `AsyncNSXTClient.resource`. The `create`, `update`,
+    `patch`, `patch_fields`, `patch_delta`, `delete`, `get` & `list`
+    methods return coroutines and `iter_list` is an async
+    generator. The api calls are sent over the REST api of the resource,
+    see `REST_RESOURCES`. Lookups that are specific to one resource class
+    have their own async classes, i.e `AsyncVirtualMachine`
+    """
+    def __init__(self, client, resource_config=None):
+        self._client = client
+        super(AsyncNSXTResource, self).__init__(
+            client.client_config, resource_config, client.logger
+        )
+        self._rest_resource = get_rest_resource(type(self))
+
+    def _prepare_nsx_t_client(self):
+        # The calls are sent by the client, there is no vAPI stub
+        self._connection = self._client
+        return None
+
+    async def _invoke(self, action, args=None, kwargs=None):
+        args = args or ()
+        kwargs = kwargs or {}
+        self._log_request(args, kwargs)
+        request = RestRequest(self._rest_resource, action, args, kwargs)
+        retry_policy = self.retry_policy
+        rate_limiter = self.rate_limiter
+        # Many calls share the thread, so the call is not bound to it
+        call = metrics.ApiCall(
+            self.service_name, action, self.resource_type
+        ).start()
+        try:
+            retries = 0
+            while True:
+                if rate_limiter:
+                    call.rate_limit_delay += await _acquire(rate_limiter)
+                try:
+                    result = await self._client.send(request, call)
+                    break
+                except ServiceUnavailable as error:
+                    delay = self._get_retry_delay(
+                        retry_policy, action, error, retries, call
+                    )
+                    if delay is None:
+                        raise
+                    retries += 1
+                    await asyncio.sleep(delay)
+        except Exception as error:
+            call.finish(type(error))
+            raise
+        call.finish()
+        self._log_result(action, result)
+        return result
+
+    async def update(self, *args, merge=None):
+        self._validate_allowed_method(self.allow_update, ACTION_UPDATE)
+        if merge is None:
+            return await self._invoke(ACTION_UPDATE, args)
+        ids, obj = tuple(args[:-1]), args[-1]
+        conflicts = 0
+        while True:
+            try:
+                return await self._invoke(ACTION_UPDATE, ids + (obj,))
+            except (ConcurrentChange, InvalidRequest) as error:
+                if not self._should_merge(error, conflicts):
+                    raise
+            conflicts += 1
+            obj = merge(await self._invoke(ACTION_GET, ids))
+
+    async def patch_delta(self, desired, current=None, args=None):
+        args = tuple(args) if args else (self.resource_id,)
+        self._validate_allowed_method(self.allow_patch, ACTION_PATCH)
+        conflicts = 0
+        while True:
+            if current is None:
+                current = await self.get(
+                    args, fields=list(desired) + [REVISION_FIELD]
+                )
+            delta = get_delta(desired, current)
+            if not delta:
+                return delta
+            fields = dict(delta)
+            revision = get_revision(current)
+            if revision is not None:
+                fields[REVISION_FIELD] = revision
+            try:
+                await self.patch_fields(fields, args)
+                return delta
+            except (ConcurrentChange, InvalidRequest) as error:
+                if not self._should_merge(error, conflicts):
+                    raise
+            conflicts += 1
+            current = None
+
+    async def get(self, args=None, to_dict=True, fields=None):
+        args = args if args else (self.resource_id,)
+        self._validate_allowed_method(self.allow_get, ACTION_GET)
+        result = await self._invoke(ACTION_GET, args)
+        if fields:
+            return project_fields(result, fields)
+        return result.to_dict() if to_dict else result
+
+    async def list(self,
+                   cursor=None,
+                   included_fields=None,
+                   page_size=None,
+                   sort_ascending=None,
+                   sort_by=None,
+                   filters=None,
+                   to_dict=True,
+                   fields=None):
+        self._validate_allowed_method(self.allow_list, ACTION_LIST)
+        if fields:
+            included_fields = get_included_fields(fields)
+        result = await self._list_page(
+            cursor=cursor,
+            included_fields=included_fields,
+            page_size=page_size,
+            sort_ascending=sort_ascending,
+            sort_by=sort_by,
+            filters=filters
+        )
+        if fields:
+            return [
+                project_fields(item, fields) for item in result.results or []
+            ]
+        if to_dict:
+            results = result.to_dict()
+            return results['results'] if results.get('results') else []
+        return result
+
+    async def iter_list(self,
+                        included_fields=None,
+                        page_size=None,
+                        sort_ascending=None,
+                        sort_by=None,
+                        filters=None,
+                        prefetch=False,
+                        fields=None):
+        """
+        Same as `NSXTResource.iter_list`, the next page is fetched by
+        another task when prefetch is enabled
+        """
+        self._validate_allowed_method(self.allow_list, ACTION_LIST)
+        if fields:
+            included_fields = get_included_fields(fields)
+
+        async def _fetch(cursor=None):
+            page = await self._list_page(
+                cursor=cursor,
+                included_fields=included_fields,
+                page_size=page_size,
+                sort_ascending=sort_ascending,
+                sort_by=sort_by,
+                filters=filters
+            )
+            if fields:
+                return (
+                    [
+                        project_fields(item, fields)
+                        for item in page.results or []
+                    ],
+                    page.cursor
+                )
+            page = page.to_dict()
+            return page.get('results') or [], page.get('cursor')
+
+        results, cursor = await _fetch()
+        while True:
+            has_next = results and cursor
+            fetcher = None
+            if has_next and prefetch:
+                fetcher = asyncio.ensure_future(_fetch(cursor))
+
+            try:
+                for result in results:
+                    yield result
+            except BaseException:
+                # The iteration was stopped before the next page was used
+                if fetcher:
+                    fetcher.cancel()
+                raise
+
+            if not has_next:
+                return
+            next_results, next_cursor = await (fetcher or _fetch(cursor))
+            # Same as `NSXTResource.iter_list`, a page that returns the
+            # cursor it was fetched with is the last one or the same page
+            if next_cursor == cursor:
+                for result in get_new_results(results, next_results):
+                    yield result
+                return
+            results, cursor = next_results, next_cursor
+
+
+class AsyncVirtualMachine(AsyncNSXTResource, VirtualMachine):
+    """
+    Async `VirtualMachine`, the lookup is not cached
+    """
+    async def get(self, args=None):
+        self._validate_allowed_method(self.allow_get, ACTION_GET)
+        filters = self._get_lookup_filters()
+        # Only two results are needed to know if the lookup is ambiguous
+        results = await self.list(filters=filters, page_size=2)
+        return self._get_lookup_result(filters, results)
+
+
+class AsyncVirtualNetworkInterface(AsyncNSXTResource,
+                                   VirtualNetworkInterface):
+    """
+    Async `VirtualNetworkInterface`, the lookup is not cached
+    """
+    async def lookup(self, owner_vm_id=None, lport_attachment_id=None,
+                     refresh=False):
+        filters = {
+            'owner_vm_id': owner_vm_id,
+            'lport_attachment_id': lport_attachment_id
+        }
+        return [
+            vif async for vif in self.iter_list(filters=dict(
+                (field, value) for field, value in filters.items()
+                if value is not None
+            ))
+        ]
+
+
+class AsyncSegmentPort(AsyncNSXTResource, SegmentPort):
+    """
+    Async `SegmentPort`, the index of the attachments is not cached
+    """
+    async def get_attachment_index(self, segment_id, refresh=False):
+        return index_attachments([
+            port async for port in self.iter_attachments(segment_id)
+        ])
+
+
+_async_resource_classes = {
+    VirtualMachine: AsyncVirtualMachine,
+    VirtualNetworkInterface: AsyncVirtualNetworkInterface,
+    SegmentPort: AsyncSegmentPort
+}
+
+
+def get_async_resource_class(resource_class):
+    """
+    :param resource_class: Subclass of `NSXTResource`, i.e `Segment`
+    :return: Subclass of both `AsyncNSXTResource` and the resource class
+    """
+    class_type = _async_resource_classes.get(resource_class)
+    if class_type is None:
+        class_type = _async_resource_classes[resource_class] = type(
+            'Async{0}'.format(resource_class.__name__),
+            (AsyncNSXTResource, resource_class),
+            {}
+        )
+    return class_type
@@ -13,21 +13,42 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import time
+import random
+import threading
+from email.utils import parsedate_tz, mktime_tz
+from functools import partial
+
 import requests
 
 from vmware.vapi.lib import connect
 from vmware.vapi.security import user_password
 from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
 from vmware.vapi.bindings.stub import ApiClient
-
-from com.vmware import nsx_policy_client
-from com.vmware import nsx_client
-from com.vmware.nsx_policy import infra_client
-from com.vmware.nsx import fabric_client
-from com.vmware.nsx_policy.infra.segments import dhcp_static_bindings_client
-from com.vmware.nsx_policy.infra import segments_client, tier_1s_client
-
-from nsx_t_sdk import exceptions
+from vmware.vapi.bindings.struct import VapiStruct
+
+from com.vmware.vapi.std.errors_client import (
+    Unauthenticated,
+    Unauthorized,
+    ServiceUnavailable,
+    ConcurrentChange,
+    InvalidRequest
+)
+
+from nsx_t_sdk import exceptions, metrics
+from nsx_t_sdk.inventory import get_inventory_cache
+from nsx_t_sdk.persistent_cache import get_persistent_cache
+from nsx_t_sdk.log import PREVIEW_MAX_LENGTH, is_debug_enabled, preview
+from nsx_t_sdk.pool import PooledConnection, get_client_pool
+from nsx_t_sdk.ratelimit import get_rate_limiter
+from nsx_t_sdk.registry import LazyModuleRegistry
+from nsx_t_sdk.session import (
+    SESSION_TIMEOUT,
+    SESSION_CREATE_PATH,
+    SessionToken,
+    get_session_token_cache,
+    destroy_session
+)
 
 AUTH_SESSION = 'session'
 AUTH_BASIC = 'basic'
@@ -39,12 +60,288 @@ ACTION_DELETE = 'delete'
 ACTION_GET = 'get'
 ACTION_LIST = 'list'
 
+# Actions that can be sent again without changing their result
+IDEMPOTENT_ACTIONS = (ACTION_GET, ACTION_LIST, ACTION_UPDATE, ACTION_DELETE)
+
+# NSX-T Manager return 429 when it throttles the clients & 503 while the
+# cluster is not ready, both are raised as `ServiceUnavailable`
+RETRY_MAX_RETRIES = 5
+RETRY_INITIAL_DELAY = 1
+RETRY_MAX_DELAY = 30
+
+# Number of times an update that is rejected because the resource was
+# changed since it was read is merged and sent again
+CONFLICT_MAX_RETRIES = 5
+# NSX-T Manager reject writes with outdated `_revision` with 412 & this
+# error code, which are raised as `InvalidRequest`
+REVISION_CONFLICT_ERROR_CODE = 604
+# Name of the `_revision` field of the resources in the bindings
+REVISION_FIELD = 'revision'
+# Name of the field in the REST bodies & in the dicts of `to_dict`
+REST_REVISION_FIELD = '_revision'
+
+# The generated client modules are large, so each one is only imported when
+# the first resource that use it is created
+NSX_CLIENT_MODULES = LazyModuleRegistry({
+    'nsx': 'com.vmware.nsx_client',
+    'nsx_policy': 'com.vmware.nsx_policy_client',
+    'nsx_infra': 'com.vmware.nsx_policy.infra_client',
+    'segment': 'com.vmware.nsx_policy.infra.segments_client',
+    'tier_1': 'com.vmware.nsx_policy.infra.tier_1s_client',
+    'fabric': 'com.vmware.nsx.fabric_client',
+    'dhcp_static_bindings':
+        'com.vmware.nsx_policy.infra.segments.dhcp_static_bindings_client'
+})
+
+
+def parse_retry_after(value):
+    """
+    Parse the value of Retry-After header which is either a number of
+    seconds or http date
+    :return: Number of seconds to wait or None if the value is invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(mktime_tz(date) - time.time(), 0)
+
+
+def is_revision_conflict(error):
+    """
+    :param error: The error raised by an api call
+    :return: True if the call was rejected because the resource was changed
+    since it was read
+    """
+    if isinstance(error, ConcurrentChange):
+        return True
+    if isinstance(error, InvalidRequest) and error.data is not None:
+        data = error.data.to_dict()
+        return data.get('error_code') == REVISION_CONFLICT_ERROR_CODE \
+            or data.get('httpStatus') == 'PRECONDITION_FAILED'
+    return False
+
+
+def _is_empty(value):
+    return value is None or value == [] or value == {}
+
+
+def get_revision(current):
+    """
+    :param current: Dict of the current resource, which is either read with
+    the binding field names or returned by `to_dict` or the REST api
+    :return: The revision of the resource or None if it is not set
+    """
+    revision = current.get(REVISION_FIELD)
+    if revision is None:
+        revision = current.get(REST_REVISION_FIELD)
+    return revision
+
+
+def get_delta(desired, current):
+    """
+    Compare the desired fields with the current resource. Nested values are
+    compared as a whole since PATCH replaces them, and unset fields are
+    equal to empty values
+    :param desired: Dict of the desired fields names & values
+    :param current: Dict of the current resource
+    :return: Dict of the desired fields that are different
+    """
+    delta = {}
+    for name, value in desired.items():
+        current_value = current.get(name)
+        if _is_empty(value) and _is_empty(current_value):
+            continue
+        if value != current_value:
+            delta[name] = value
+    return delta
+
+
+class RetryPolicy(object):
+    """
+    Decide if and when api calls that are rejected because NSX-T Manager is
+    busy or unavailable are sent again
+    """
+    def __init__(self,
+                 max_retries=RETRY_MAX_RETRIES,
+                 initial_delay=RETRY_INITIAL_DELAY,
+                 max_delay=RETRY_MAX_DELAY,
+                 actions=IDEMPOTENT_ACTIONS):
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.actions = actions
+
+    @classmethod
+    def from_client_config(cls, client_config):
+        def _get(name, default):
+            value = client_config.get(name)
+            return default if value is None else value
+
+        return cls(
+            max_retries=_get('max_retries', RETRY_MAX_RETRIES),
+            initial_delay=_get('retry_initial_delay', RETRY_INITIAL_DELAY),
+            max_delay=_get('retry_max_delay', RETRY_MAX_DELAY)
+        )
+
+    def should_retry(self, action, error, retries):
+        """
+        :param action: The action of the api call, i.e "get"
+        :param error: The error raised by the api call
+        :param retries: Number of times the call was already retried
+        """
+        return isinstance(error, ServiceUnavailable) \
+            and action in self.actions \
+            and retries < self.max_retries
+
+    def get_delay(self, retries, retry_after=None):
+        """
+        Return the seconds to wait before the next retry, which is the
+        Retry-After of the response if any or exponential backoff with jitter
+        and never more than the max delay
+        """
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.initial_delay * 2 ** retries, self.max_delay)
+        return random.uniform(delay / 2.0, delay)
+
+
+def new_stub_configuration(connector):
+    """
+    Build the stub configuration of the connector
+    :param connector: vAPI connector that use the rest protocol
+    :return: Instance of `StubConfiguration`
+    """
+    # Authentication, availability & conflict errors are not part of the
+    # errors of all the apis, so they must be registered in order to be
+    # raised as `Unauthenticated`, `Unauthorized`, `ServiceUnavailable` &
+    # `ConcurrentChange` instead of `UnresolvedError`
+    return StubConfigurationFactory.new_runtime_configuration(
+        connector,
+        Unauthenticated.get_binding_type(),
+        Unauthorized.get_binding_type(),
+        ServiceUnavailable.get_binding_type(),
+        ConcurrentChange.get_binding_type(),
+        response_extractor=True
+    )
+
+
+def _to_primitive(value):
+    if isinstance(value, VapiStruct):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [_to_primitive(item) for item in value]
+    return value
+
+
+def get_included_fields(fields):
+    """
+    Convert list of fields paths to the `included_fields` query param which
+    only support top level fields
+    :param fields: List of dotted fields paths, i.e ['id', 'attachment.id']
+    :return: Comma separated top level fields names
+    """
+    included_fields = []
+    for field in fields:
+        name = field.split('.')[0]
+        if name not in included_fields:
+            included_fields.append(name)
+    return ','.join(included_fields)
+
+
+def project_fields(obj, fields):
+    """
+    Build a dict that only contains the requested fields of the object
+    without converting the whole object into a dict
+    :param obj: Instance of `VapiStruct` or a dict
+    :param fields: List of dotted fields paths, i.e ['id', 'attachment.id']
+    :return: Dict with the values of the fields that are set
+    """
+    projection = {}
+    for field in fields:
+        names = field.split('.')
+        value = obj
+        for name in names:
+            if type(value) is VapiStruct:
+                # Polymorphic types, i.e dhcp static bindings, are returned
+                # as untyped structures that can only be read as dict
+                value = value.to_dict()
+            if isinstance(value, VapiStruct):
+                value = value.get_field(name)
+            elif isinstance(value, dict):
+                value = value.get(name)
+            else:
+                value = None
+            if value is None:
+                break
+        else:
+            target = projection
+            for name in names[:-1]:
+                target = target.setdefault(name, {})
+            target[names[-1]] = _to_primitive(value)
+    return projection
+
+
+def get_new_results(results, next_results):
+    """
+    Filter the results of a page that was returned with the cursor it was
+    fetched with. The server either returned its last page or ignored the
+    cursor and returned the same page again, so only the results that were
+    not in the previous page are kept
+    :param results: Results of the previous page
+    :param next_results: Results of the page fetched with the same cursor
+    :return: List of the results that were not in the previous page
+    """
+    ids = set(result['id'] for result in results if 'id' in result)
+    return [
+        result for result in next_results
+        if (result['id'] not in ids if 'id' in result
+            else result not in results)
+    ]
+
+
+class _PageFetcher(threading.Thread):
+    """
+    Fetch one page of a list api in the background
+    """
+    def __init__(self, fetch, cursor):
+        super(_PageFetcher, self).__init__()
+        self.daemon = True
+        self._fetch = fetch
+        self._cursor = cursor
+        self._page = None
+        self._error = None
+        # Keep recording the api calls of the page using the collectors of
+        # the thread that iterates over the pages
+        self._collectors = metrics.get_active_collectors()
+
+    def run(self):
+        try:
+            with metrics.active_collectors(self._collectors):
+                self._page = self._fetch(cursor=self._cursor)
+        except Exception as error:
+            self._error = error
+
+    def result(self):
+        self.join()
+        if self._error:
+            raise self._error
+        return self._page
+
 
 class NSXTResource(object):
     client_type = None
 
     resource_type = None
     service_name = None
+    # The child resource type & field name that wrap this resource when it
+    # is part of a hierarchical api request, i.e ('ChildSegment', 'Segment')
+    hierarchical_child = None
 
     allow_create = True
     allow_delete = True
@@ -61,19 +358,12 @@ class NSXTResource(object):
         if self.resource_type:
             self.resource_config['resource_type'] = self.resource_type
         self.resource_id = self.resource_config.pop('id', None)
+        self._connection = None
         self._api_client = self._prepare_nsx_t_client()
 
     @staticmethod
     def _get_nsx_client_map():
-        return {
-            'nsx': nsx_client,
-            'nsx_policy': nsx_policy_client,
-            'nsx_infra': infra_client,
-            'segment': segments_client,
-            'tier_1': tier_1s_client,
-            'fabric': fabric_client,
-            'dhcp_static_bindings': dhcp_static_bindings_client
-        }
+        return NSX_CLIENT_MODULES
 
     def _get_stub_factory_for_nsx_client(self, stub_config):
         client = self._get_nsx_client_map()[self.client_type]
@@ -107,14 +397,80 @@ class NSXTResource(object):
     def insecure(self):
         return self.client_config.get('insecure')
 
+    @property
+    def session_timeout(self):
+        return self.client_config.get('session_timeout') or SESSION_TIMEOUT
+
+    @property
+    def retry_policy(self):
+        return RetryPolicy.from_client_config(self.client_config)
+
+    @property
+    def max_conflict_retries(self):
+        value = self.client_config.get('max_conflict_retries')
+        return CONFLICT_MAX_RETRIES if value is None else value
+
+    @property
+    def rate_limiter(self):
+        # Manager limits are per host, so all resources that use the same
+        # manager share the limiter whatever credentials they use
+        return get_rate_limiter(
+            (self.host, self.port),
+            self.client_config.get('rate_limit'),
+            burst=self.client_config.get('rate_limit_burst'),
+            shared=self.client_config.get('rate_limit_shared')
+        )
+
+    @property
+    def persistent_cache(self):
+        if not self.client_config.get('persistent_cache'):
+            return None
+        return get_persistent_cache(
+            max_size=self.client_config.get('persistent_cache_max_size')
+        )
+
+    @property
+    def cache_namespace(self):
+        # The namespace of the manager & user in the persistent cache
+        return '{0}@{1}:{2}'.format(self.username, self.host, self.port)
+
+    @property
+    def inventory_cache(self):
+        # The inventory is the same for all the resources that use the same
+        # manager & credentials
+        return get_inventory_cache(
+            self.connection_key,
+            self.client_config.get('inventory_cache_ttl'),
+            store=self.persistent_cache,
+            namespace=self.cache_namespace
+        )
+
+    @property
+    def wire_trace(self):
+        return self.client_config.get('wire_trace')
+
     @property
     def url(self):
         return 'https://{0}:{1}'.format(self.host, self.port)
 
-    def _prepare_session_auth(self, session):
-        self.logger.debug('Prepare session authentication....')
+    @property
+    def connection_key(self):
+        cert = self.cert
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        return (
+            self.host,
+            self.port,
+            self.username,
+            self.auth_type,
+            cert,
+            self.insecure
+        )
+
+    def _login(self, session):
+        self.logger.debug('Creating new session with NSX-T Manager....')
         resp = session.post(
-            '{0}/{1}'.format(self.url, 'api/session/create'),
+            '{0}/{1}'.format(self.url, SESSION_CREATE_PATH),
             data={
                 'j_username': self.username,
                 'j_password': self.password
@@ -123,9 +479,24 @@ class NSXTResource(object):
         if resp.status_code != requests.codes.ok:
             resp.raise_for_status()
 
-        session.headers['Cookie'] = resp.headers.get('Set-Cookie')
-        session.headers['X-XSRF-TOKEN'] = resp.headers.get('X-XSRF-TOKEN')
+        return SessionToken(
+            resp.headers.get('Set-Cookie'),
+            resp.headers.get('X-XSRF-TOKEN'),
+            timeout=self.session_timeout
+        )
+
+    def _prepare_session_auth(self, session, stale_token=None):
+        self.logger.debug('Prepare session authentication....')
+        # The session token is shared by all resources using the same
+        # credentials so that we only login when there is no valid token
+        token = get_session_token_cache().refresh(
+            self.connection_key,
+            partial(self._login, session),
+            stale_token=stale_token
+        )
+        session.headers.update(token.headers)
         self.logger.debug('Session Cookie & X-XSRF-TOKEN are set successfully')
+        return token
 
     def _prepare_basic_auth(self, connector):
         self.logger.debug('API calls is using basic authentication')
@@ -136,51 +507,177 @@ class NSXTResource(object):
             )
         connector.set_security_context(security_context)
 
-    def _prepare_nsx_t_client(self):
+    def _prepare_connection(self):
         session = requests.session()
         session.verify = self.insecure
         session.cert = self.cert
+        session.hooks['response'].append(metrics.record_response)
+        logout = None
         # Only Relevant for auth session
         if self.auth_type == AUTH_SESSION:
             self.logger.debug('API calls is using session authentication')
             self._prepare_session_auth(session)
+            logout = partial(
+                destroy_session,
+                session,
+                self.url,
+                self.connection_key
+            )
 
         connector = connect.get_requests_connector(
             session=session,
             msg_protocol='rest',
             url=self.url
         )
-        stub_config = StubConfigurationFactory.new_runtime_configuration(
-            connector,
-            response_extractor=True
-        )
+        stub_config = new_stub_configuration(connector)
         # Only relevant for basic auth
         if self.auth_type == AUTH_BASIC:
             self._prepare_basic_auth(connector)
-        stub_factory = self._get_stub_factory_for_nsx_client(stub_config)
-        return ApiClient(stub_factory)
+        return PooledConnection(session, connector, stub_config, logout)
 
-    def _invoke(self, action, args=None, kwargs=None):
-        args = args or ()
-        kwargs = kwargs or {}
-        self.logger.debug('HTTP Request Args: {0}'.format(args))
-        self.logger.debug('HTTP Request Kwargs: {0}'.format(kwargs))
-        service_client = getattr(self._api_client, self.service_name)
-        service_action = getattr(service_client, action)
+    def _prepare_nsx_t_client(self):
+        # Connections are shared between all resources that use the same
+        # manager & credentials, so that the session, the TLS connections
+        # and the stub configuration are only created once per process
+        self._connection = get_client_pool().acquire(
+            self.connection_key,
+            self._prepare_connection,
+            user=self
+        )
+        # Building the stub factory & the service stubs introspect the
+        # generated bindings, so they are shared by all the resources of the
+        # same client type that use the connection
+        return self._connection.get_stub(
+            self.client_type,
+            lambda: ApiClient(
+                self._get_stub_factory_for_nsx_client(
+                    self._connection.stub_config
+                )
+            )
+        )
+
+    def _get_service_client(self):
+        if self._connection is None:
+            return getattr(self._api_client, self.service_name)
+        return self._connection.get_stub(
+            (self.client_type, self.service_name),
+            partial(getattr, self._api_client, self.service_name)
+        )
+
+    def _refresh_session_auth(self, force=False):
+        session = self._connection.session
+        token = get_session_token_cache().get(self.connection_key)
+        if force or token is None or token.is_expiring():
+            token = self._prepare_session_auth(
+                session,
+                stale_token=token if force else None
+            )
+        elif session.headers.get('Cookie') != token.cookie:
+            # Another resource already refreshed the token
+            session.headers.update(token.headers)
+        return token
+
+    @staticmethod
+    def _call_service_action(service_action, args, kwargs):
         if args and kwargs:
-            result = service_action(*args, **kwargs)
+            return service_action(*args, **kwargs)
         elif args:
-            result = service_action(*args)
+            return service_action(*args)
         elif kwargs:
-            result = service_action(**kwargs)
-        else:
-            result = service_action()
+            return service_action(**kwargs)
+        return service_action()
+
+    def _send(self, service_action, args, kwargs, call):
+        if self.auth_type != AUTH_SESSION:
+            return self._call_service_action(service_action, args, kwargs)
+        token = self._refresh_session_auth()
+        try:
+            result = self._call_service_action(service_action, args, kwargs)
+        except (Unauthenticated, Unauthorized):
+            # The session expired or destroyed on the manager side, login
+            # again and retry once
+            self.logger.debug('Session is rejected, login again....')
+            call.add_retry()
+            token = self._refresh_session_auth(force=True)
+            result = self._call_service_action(service_action, args, kwargs)
+        token.touch()
+        return result
 
+    @property
+    def _preview_length(self):
+        # Payloads are truncated in debug logs unless wire trace is enabled
+        return None if self.wire_trace else PREVIEW_MAX_LENGTH
+
+    def _log_request(self, args, kwargs):
+        # Payloads are only rendered when debug logs are emitted
+        if not is_debug_enabled(self.logger):
+            return
+        self.logger.debug(
+            'HTTP Request Args: {0}'.format(
+                preview(args, self._preview_length))
+        )
+        self.logger.debug(
+            'HTTP Request Kwargs: {0}'.format(
+                preview(kwargs, self._preview_length))
+        )
+
+    def _log_result(self, action, result):
+        if not is_debug_enabled(self.logger):
+            return
         self.logger.debug(
             'API Request Result: {0} '
             'for invoking action {1}'
             ' using service {2}'
-            ''.format(result, action, self.resource_type))
+            ''.format(
+                preview(result, self._preview_length),
+                action,
+                self.resource_type
+            ))
+
+    def _get_retry_delay(self, retry_policy, action, error, retries, call):
+        """
+        Return the seconds to wait before sending the call again or None
+        when the error must be raised
+        """
+        if not retry_policy.should_retry(action, error, retries):
+            return None
+        delay = retry_policy.get_delay(retries, call.retry_after)
+        self.logger.warning(
+            'NSX-T Manager is unavailable (HTTP {0}) for {1} '
+            '{2}, retrying in {3:.1f} seconds'.format(
+                call.status, action, self.resource_type, delay
+            )
+        )
+        call.add_retry(delay)
+        return delay
+
+    def _invoke(self, action, args=None, kwargs=None):
+        args = args or ()
+        kwargs = kwargs or {}
+        self._log_request(args, kwargs)
+        service_client = self._get_service_client()
+        service_action = getattr(service_client, action)
+        retry_policy = self.retry_policy
+        rate_limiter = self.rate_limiter
+        with metrics.ApiCall(self.service_name, action, self.resource_type) \
+                as call:
+            retries = 0
+            while True:
+                if rate_limiter:
+                    call.rate_limit_delay += rate_limiter.acquire()
+                try:
+                    result = self._send(service_action, args, kwargs, call)
+                    break
+                except ServiceUnavailable as error:
+                    delay = self._get_retry_delay(
+                        retry_policy, action, error, retries, call
+                    )
+                    if delay is None:
+                        raise
+                    retries += 1
+                    time.sleep(delay)
+
+        self._log_result(action, result)
         return result
 
     def _validate_allowed_method(self, allowed_action, action):
@@ -193,12 +690,102 @@ class NSXTResource(object):
     def create(self):
         return self.update(self.resource_id, self.resource_config)
 
-    def update(self, *args):
-        self._validate_allowed_method(self.allow_update, ACTION_UPDATE)
-        return self._invoke(
-            ACTION_UPDATE,
-            args,
+    def _should_merge(self, error, conflicts):
+        if not is_revision_conflict(error) \
+                or conflicts >= self.max_conflict_retries:
+            return False
+        self.logger.debug(
+            '{0} {1} was changed since it was read, merging the update '
+            'with the latest version ({2}/{3})'.format(
+                self.resource_type,
+                self.resource_id,
+                conflicts + 1,
+                self.max_conflict_retries
+            )
         )
+        return True
+
+    def update(self, *args, **kwargs):
+        """
+        Create or replace the resource. The write is conditional when the
+        object has `_revision`, so it is rejected by the manager if the
+        resource was changed since it was read
+        :param args: The ids of the resource followed by the object
+        :param merge: Callable that return the object to write based on the
+        latest version of the resource, when it is set the update is merged
+        and sent again when it is rejected because of revision conflict
+        :return: The updated resource
+        """
+        merge = kwargs.pop('merge', None)
+        self._validate_allowed_method(self.allow_update, ACTION_UPDATE)
+        if merge is None:
+            return self._invoke(
+                ACTION_UPDATE,
+                args,
+            )
+        ids, obj = tuple(args[:-1]), args[-1]
+        conflicts = 0
+        while True:
+            try:
+                return self._invoke(ACTION_UPDATE, ids + (obj,))
+            except (ConcurrentChange, InvalidRequest) as error:
+                if not self._should_merge(error, conflicts):
+                    raise
+            conflicts += 1
+            # Only the resource is read again, not the whole operation
+            obj = merge(self._invoke(ACTION_GET, ids))
+
+    def patch_fields(self, fields, args=None):
+        """
+        Send only fields of the resource, which the manager merges into the
+        latest version of the resource
+        :param fields: Dict of the fields names & values
+        :param args: The ids of the resource, default to the resource id
+        """
+        args = tuple(args) if args else (self.resource_id,)
+        obj = dict(fields)
+        if self.resource_type:
+            obj.setdefault('resource_type', self.resource_type)
+        return self.patch(*(args + (obj,)))
+
+    def patch_delta(self, desired, current=None, args=None):
+        """
+        Send only the desired fields that are different from the current
+        resource with PATCH, nothing is sent when there is no difference.
+        The write is conditional when the current resource has `_revision`,
+        so when the resource was changed since it was read, the delta is
+        computed again from the latest version of the resource
+        :param desired: Dict of the desired fields names & values
+        :param current: Dict of the current resource, the desired fields
+        & the revision are read if it is not provided. Its revision is read
+        from either `revision` or `_revision`
+        :param args: The ids of the resource, default to the resource id
+        :return: Dict of the fields that were sent
+        """
+        args = tuple(args) if args else (self.resource_id,)
+        self._validate_allowed_method(self.allow_patch, ACTION_PATCH)
+        conflicts = 0
+        while True:
+            if current is None:
+                current = self.get(
+                    args, fields=list(desired) + [REVISION_FIELD]
+                )
+            delta = get_delta(desired, current)
+            if not delta:
+                return delta
+            fields = dict(delta)
+            revision = get_revision(current)
+            if revision is not None:
+                fields[REVISION_FIELD] = revision
+            try:
+                self.patch_fields(fields, args)
+                return delta
+            except (ConcurrentChange, InvalidRequest) as error:
+                if not self._should_merge(error, conflicts):
+                    raise
+            conflicts += 1
+            # Only the fields of the resource are read again
+            current = None
 
     def patch(self, *args):
         self._validate_allowed_method(self.allow_patch, ACTION_PATCH)
@@ -211,22 +798,24 @@ class NSXTResource(object):
         self._validate_allowed_method(self.allow_delete, ACTION_DELETE)
         return self._invoke(ACTION_DELETE, args)
 
-    def get(self, args=None, to_dict=True):
+    def get(self, args=None, to_dict=True, fields=None):
         args = args if args else (self.resource_id,)
         self._validate_allowed_method(self.allow_get, ACTION_GET)
+        if fields:
+            # Get api does not support `included_fields`, so only the
+            # requested fields are converted
+            return project_fields(self._invoke(ACTION_GET, args), fields)
         if to_dict:
             return self._invoke(ACTION_GET, args).to_dict()
         return self._invoke(ACTION_GET, args)
 
-    def list(self,
-             cursor=None,
-             included_fields=None,
-             page_size=None,
-             sort_ascending=None,
-             sort_by=None,
-             filters=None,
-             to_dict=True):
-        self._validate_allowed_method(self.allow_list, ACTION_LIST)
+    def _list_page(self,
+                   cursor=None,
+                   included_fields=None,
+                   page_size=None,
+                   sort_ascending=None,
+                   sort_by=None,
+                   filters=None):
         params = {
             'cursor': cursor,
             'included_fields': included_fields,
@@ -236,7 +825,104 @@ class NSXTResource(object):
         }
         if filters:
             params.update(filters)
+        return self._invoke(ACTION_LIST, kwargs=params)
+
+    def list(self,
+             cursor=None,
+             included_fields=None,
+             page_size=None,
+             sort_ascending=None,
+             sort_by=None,
+             filters=None,
+             to_dict=True,
+             fields=None):
+        self._validate_allowed_method(self.allow_list, ACTION_LIST)
+        if fields:
+            included_fields = get_included_fields(fields)
+        result = self._list_page(
+            cursor=cursor,
+            included_fields=included_fields,
+            page_size=page_size,
+            sort_ascending=sort_ascending,
+            sort_by=sort_by,
+            filters=filters
+        )
+        if fields:
+            return [
+                project_fields(item, fields) for item in result.results or []
+            ]
         if to_dict:
-            results = self._invoke(ACTION_LIST, kwargs=params).to_dict()
+            results = result.to_dict()
             return results['results'] if results.get('results') else []
-        return self._invoke(ACTION_LIST, kwargs=params)
+        return result
+
+    def iter_list(self,
+                  included_fields=None,
+                  page_size=None,
+                  sort_ascending=None,
+                  sort_by=None,
+                  filters=None,
+                  prefetch=False,
+                  fields=None):
+        """
+        Iterate over the results of all the pages returned by the list api
+        by following the cursor of each page, so that only one page (two
+        when prefetch is enabled) is kept in memory at any time
+        :param included_fields: Comma separated list of fields to return
+        :param page_size: Maximum number of results per page
+        :param sort_ascending: Sort the results in ascending order
+        :param sort_by: Field name to sort the results by
+        :param filters: Extra query params to filter the results
+        :param prefetch: Fetch the next page in a background thread while
+        the results of the current page are consumed
+        :param fields: List of dotted fields paths to request and return
+        instead of the whole objects, i.e ['id', 'attachment.id']
+        :return: Generator of results as dicts
+        """
+        self._validate_allowed_method(self.allow_list, ACTION_LIST)
+        if fields:
+            included_fields = get_included_fields(fields)
+
+        def _fetch(cursor=None):
+            page = self._list_page(
+                cursor=cursor,
+                included_fields=included_fields,
+                page_size=page_size,
+                sort_ascending=sort_ascending,
+                sort_by=sort_by,
+                filters=filters
+            )
+            if fields:
+                return (
+                    [
+                        project_fields(item, fields)
+                        for item in page.results or []
+                    ],
+                    page.cursor
+                )
+            page = page.to_dict()
+            return page.get('results') or [], page.get('cursor')
+
+        results, cursor = _fetch()
+        while True:
+            has_next = results and cursor
+            fetcher = None
+            if has_next and prefetch:
+                fetcher = _PageFetcher(_fetch, cursor)
+                fetcher.start()
+
+            for result in results:
+                yield result
+
+            if not has_next:
+                return
+            next_results, next_cursor = \
+                fetcher.result() if fetcher else _fetch(cursor=cursor)
+            # A page that returns the cursor it was fetched with is the last
+            # one or the same page again, so only its new results are
+            # yielded before stopping
+            if next_cursor == cursor:
+                for result in get_new_results(results, next_results):
+                    yield result
+                return
+            results, cursor = next_results, next_cursor
@@ -20,3 +20,23 @@ class NSXTSDKException(Exception):
 
 class MethodNotAllowed(NSXTSDKException):
     pass
+
+
+class ConcurrentTaskError(NSXTSDKException):
+    """
+    Raised when one or more of the tasks that run concurrently failed. It
+    keeps the errors and the results of the tasks that succeeded keyed by
+    the task key
+    """
+    def __init__(self, errors, results=None):
+        self.errors = errors
+        self.results = results or {}
+        super(ConcurrentTaskError, self).__init__(
+            '{0} task(s) failed: {1}'.format(
+                len(errors),
+                ', '.join(
+                    '{0}: {1}'.format(key, error)
+                    for key, error in errors.items()
+                )
+            )
+        )
@@ -0,0 +1,122 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import threading
+from collections import OrderedDict
+
+from nsx_t_sdk import metrics
+from nsx_t_sdk._compat import queue
+from nsx_t_sdk.exceptions import NSXTSDKException, ConcurrentTaskError
+
+# Maximum number of NSX-T calls running at the same time by one executor
+EXECUTOR_MAX_WORKERS = 8
+
+
+class BoundedExecutor(object):
+    """
+    Run independent NSX-T calls concurrently using a bounded number of
+    threads. Tasks are identified by a unique key which is used to return
+    their results and errors
+    """
+    def __init__(self, max_workers=EXECUTOR_MAX_WORKERS):
+        if max_workers < 1:
+            raise NSXTSDKException('max_workers must be greater than 0')
+        self.max_workers = max_workers
+        self._tasks = OrderedDict()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Add task to run when `run` is called
+        :param key: Hashable value that identify the task
+        :param func: Callable to run
+        """
+        if key in self._tasks:
+            raise NSXTSDKException(
+                'Task {0} is already submitted'.format(key)
+            )
+        # Keep recording the api calls of the task using the collectors of
+        # the thread that submitted it
+        self._tasks[key] = (
+            func, args, kwargs, metrics.get_active_collectors()
+        )
+
+    def _run_task(self, key, results, errors, lock):
+        func, args, kwargs, collectors = self._tasks[key]
+        try:
+            with metrics.active_collectors(collectors):
+                result = func(*args, **kwargs)
+        except Exception as error:
+            with lock:
+                errors[key] = error
+        else:
+            with lock:
+                results[key] = result
+
+    def _worker(self, pending, results, errors, lock):
+        while True:
+            try:
+                key = pending.get_nowait()
+            except queue.Empty:
+                return
+            self._run_task(key, results, errors, lock)
+
+    def run(self):
+        """
+        Run all the submitted tasks and wait for them to finish
+        :return: OrderedDict of the task results in the order they were
+        submitted
+        :raise ConcurrentTaskError: When any of the tasks failed, after all
+        the other tasks are finished
+        """
+        results = {}
+        errors = {}
+        lock = threading.Lock()
+        pending = queue.Queue()
+        for key in self._tasks:
+            pending.put(key)
+
+        workers_count = min(self.max_workers, len(self._tasks))
+        if workers_count == 1:
+            # No need for threads to run one task at a time
+            self._worker(pending, results, errors, lock)
+        else:
+            workers = []
+            for _ in range(workers_count):
+                worker = threading.Thread(
+                    target=self._worker,
+                    args=(pending, results, errors, lock)
+                )
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+            for worker in workers:
+                worker.join()
+
+        keys = list(self._tasks.keys())
+        self._tasks = OrderedDict()
+        ordered_results = OrderedDict(
+            (key, results[key]) for key in keys if key in results
+        )
+        if errors:
+            raise ConcurrentTaskError(
+                OrderedDict(
+                    (key, errors[key]) for key in keys if key in errors
+                ),
+                ordered_results
+            )
+        return ordered_results
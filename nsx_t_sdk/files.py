@@ -0,0 +1,76 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import stat
+import errno
+import getpass
+import tempfile
+
+# Symlinks are not followed when the files are opened, when the platform
+# supports it
+O_NOFOLLOW = getattr(os, 'O_NOFOLLOW', 0)
+
+
+def _get_user_id():
+    return os.getuid() if hasattr(os, 'getuid') else getpass.getuser()
+
+
+def get_private_dir():
+    """
+    :return: Directory of the files that are shared by the processes of the
+    current user, which is the work dir of the agent or a directory of the
+    user under the temp directory when running outside of an agent
+    """
+    return os.environ.get('AGENT_WORK_DIR') or os.path.join(
+        tempfile.gettempdir(), 'nsx-t-{0}'.format(_get_user_id())
+    )
+
+
+def _check_owner(file_stat, path):
+    if hasattr(os, 'getuid') and file_stat.st_uid != os.getuid():
+        raise OSError(
+            errno.EPERM, 'Not owned by the current user', path
+        )
+
+
+def open_private_file(path, flags=os.O_RDWR):
+    """
+    Open the file, which is created with its directory if missing so that
+    only the current user can access them. Symlinks and files of other users
+    are refused, so that they can not be used to read or tamper with the
+    files of the current user
+    :param path: Path of the file
+    :param flags: Flags of `os.open`
+    :return: File descriptor
+    :raise OSError: When the file can not be opened or is not safe to use
+    """
+    directory = os.path.dirname(path)
+    try:
+        os.mkdir(directory, 0o700)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    directory_stat = os.lstat(directory)
+    if not stat.S_ISDIR(directory_stat.st_mode):
+        raise OSError(errno.ENOTDIR, 'Not a directory', directory)
+    _check_owner(directory_stat, directory)
+    fd = os.open(path, flags | os.O_CREAT | O_NOFOLLOW, 0o600)
+    try:
+        _check_owner(os.fstat(fd), path)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
@@ -0,0 +1,152 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import json
+from collections import OrderedDict
+
+from vmware.vapi.bindings.struct import VapiStruct
+from vmware.vapi.data.serializers.cleanjson import DataValueConverter
+
+from nsx_t_sdk.exceptions import NSXTSDKException
+from nsx_t_sdk.resources import Infra
+
+
+def _to_dynamic_struct(value):
+    """
+    Convert dict to untyped `VapiStruct` that is sent as is. The children of
+    hierarchical api are dynamic structures which cannot be built by vAPI
+    from dicts that contain lists of dicts, i.e segment subnets
+    """
+    return VapiStruct(
+        struct_value=DataValueConverter.convert_to_data_value(
+            json.dumps(value)
+        )
+    )
+
+
+class HierarchicalBatch(object):
+    """
+    Collect the configuration of many policy resources and apply all of
+    them using one Hierarchical API (H-API) transaction, which is a single
+    `PATCH /policy/api/v1/infra` request with a tree of child resources
+    """
+    def __init__(self, client_config, logger):
+        self.client_config = client_config
+        self.logger = logger
+        self._children = OrderedDict()
+
+    def __len__(self):
+        return len(self._children)
+
+    @staticmethod
+    def _get_hierarchical_child(resource):
+        if not resource.hierarchical_child:
+            raise NSXTSDKException(
+                '{0} cannot be part of hierarchical '
+                'api request'.format(resource.resource_type)
+            )
+        return resource.hierarchical_child
+
+    def _get_child(self, children, resource, config=None):
+        child_type, child_field = self._get_hierarchical_child(resource)
+        key = (child_type, resource.resource_id)
+        child = children.get(key)
+        if child is None:
+            child = {
+                'resource_type': child_type,
+                child_field: {
+                    'id': resource.resource_id,
+                    'resource_type': resource.resource_type
+                }
+            }
+            children[key] = child
+        if config:
+            child[child_field].update(config)
+            child[child_field]['id'] = resource.resource_id
+        return child
+
+    def add(self, resource, parent=None, marked_for_delete=False):
+        """
+        Add resource to the batch so that it will be created, updated or
+        deleted when the batch is applied
+        :param resource: Instance derived from "NSXTResource" class
+        :param parent: Instance derived from "NSXTResource" class that own
+        the resource, i.e the segment of a dhcp static binding. The parent
+        does not have to be part of the batch
+        :param marked_for_delete: Delete the resource instead of create it
+        """
+        if not resource.resource_id:
+            raise NSXTSDKException(
+                '{0} id is required in order to add it to '
+                'hierarchical api request'.format(resource.resource_type)
+            )
+        children = self._children
+        if parent:
+            parent_child = self._get_child(children, parent)
+            _, parent_field = parent.hierarchical_child
+            # Children of the parent are kept as dict while building the
+            # batch and converted to list by `to_dict`
+            children = parent_child[parent_field].setdefault(
+                'children', OrderedDict()
+            )
+        child = self._get_child(children, resource, resource.resource_config)
+        if marked_for_delete:
+            child['marked_for_delete'] = True
+
+    def delete(self, resource, parent=None):
+        self.add(resource, parent=parent, marked_for_delete=True)
+
+    @classmethod
+    def _children_to_list(cls, children):
+        results = []
+        for child in children.values():
+            child = dict(child)
+            for field, value in child.items():
+                if isinstance(value, dict) and \
+                        isinstance(value.get('children'), OrderedDict):
+                    value = dict(value)
+                    value['children'] = \
+                        cls._children_to_list(value['children'])
+                    child[field] = value
+            results.append(child)
+        return results
+
+    def to_dict(self):
+        return {
+            'resource_type': Infra.resource_type,
+            'children': self._children_to_list(self._children)
+        }
+
+    def apply(self):
+        """
+        Send all the resources collected in the batch in one request
+        """
+        if not self._children:
+            self.logger.debug('Hierarchical api request is empty')
+            return
+        infra = Infra(
+            client_config=self.client_config,
+            resource_config={},
+            logger=self.logger
+        )
+        self.logger.debug(
+            'Applying {0} resources using hierarchical '
+            'api request'.format(len(self._children))
+        )
+        infra_config = self.to_dict()
+        infra_config['children'] = [
+            _to_dynamic_struct(child) for child in infra_config['children']
+        ]
+        return infra.patch(infra_config)
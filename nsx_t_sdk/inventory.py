@@ -0,0 +1,336 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+import json
+import time
+import threading
+
+# Maximum page size of the NSX-T list apis, so that the inventory is
+# listed with as few requests as possible
+INVENTORY_PAGE_SIZE = 1000
+# Field updated by the manager each time an inventory object is synced
+# from the compute managers
+SYNC_TIME_FIELD = '_last_sync_time'
+# Key of the snapshot of the whole collection in the persistent cache
+SNAPSHOT_KEY = 'snapshot'
+
+
+class InventoryIndex(object):
+    """
+    Thread safe snapshot of one inventory collection of the manager, i.e
+    the fabric virtual machines, that index the objects by the value of
+    some of their fields, so that lookups by these fields are served from
+    memory instead of listing the collection
+    """
+    def __init__(self, id_field, fields, ttl, store=None, namespace=None):
+        """
+        :param id_field: Name of the field that identify the objects
+        :param fields: Names of the fields the objects can be looked up by
+        :param ttl: Seconds the snapshot is used before it is listed again
+        :param store: Instance of `PersistentCache` that share the snapshot
+        and the listed objects with the other processes
+        :param namespace: Namespace of the collection in the store
+        """
+        self.id_field = id_field
+        self.fields = tuple(fields)
+        self.ttl = ttl
+        self.store = store
+        self.namespace = namespace
+        self.synced_at = None
+        self._records = {}
+        self._indexes = dict((field, {}) for field in self.fields)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def expired(self):
+        return self.synced_at is None \
+            or time.time() - self.synced_at >= self.ttl
+
+    def _add(self, record):
+        record_id = record.get(self.id_field)
+        self._remove(record_id)
+        self._records[record_id] = record
+        for field in self.fields:
+            value = record.get(field)
+            if value is not None:
+                self._indexes[field].setdefault(value, []).append(record_id)
+
+    def _remove(self, record_id):
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return
+        for field in self.fields:
+            index = self._indexes[field]
+            value = record.get(field)
+            record_ids = index.get(value)
+            if record_ids and record_id in record_ids:
+                record_ids.remove(record_id)
+                if not record_ids:
+                    del index[value]
+
+    def _find(self, filters):
+        field, value = next(iter(filters.items()))
+        records = (
+            self._records[record_id]
+            for record_id in self._indexes[field].get(value, ())
+        )
+        return [
+            record for record in records
+            if all(record.get(key) == value for key, value in filters.items())
+        ]
+
+    def find(self, **filters):
+        """
+        :param filters: Values of the indexed fields the objects must have
+        :return: List of copies of the matching objects, so that callers can
+        change them
+        """
+        filters = _get_filters(filters)
+        with self._lock:
+            return copy.deepcopy(self._find(filters))
+
+    def sync(self, records, synced_at=None):
+        """
+        Replace the snapshot with all the objects of the collection. Objects
+        whose sync time did not change since the last snapshot are kept as
+        they are, so only the new & changed objects are indexed again
+        :param records: Iterable of all the objects as dicts
+        :param synced_at: Time the objects were listed, default to now
+        :return: Tuple of the number of indexed and removed objects
+        """
+        records = list(records)
+        with self._lock:
+            seen = set()
+            indexed = 0
+            for record in records:
+                record_id = record.get(self.id_field)
+                seen.add(record_id)
+                current = self._records.get(record_id)
+                sync_time = record.get(SYNC_TIME_FIELD)
+                if current is not None and sync_time is not None \
+                        and current.get(SYNC_TIME_FIELD) == sync_time:
+                    continue
+                self._add(record)
+                indexed += 1
+            removed = [
+                record_id for record_id in self._records
+                if record_id not in seen
+            ]
+            for record_id in removed:
+                self._remove(record_id)
+            self.synced_at = synced_at or time.time()
+        return indexed, len(removed)
+
+    def replace(self, filters, records):
+        """
+        Replace the objects that match the filters with the results of a
+        list call that used the same filters
+        """
+        filters = _get_filters(filters)
+        with self._lock:
+            for record in self._find(filters):
+                self._remove(record.get(self.id_field))
+            for record in records:
+                self._add(record)
+
+    def _load(self, resource):
+        """
+        Take the snapshot from the store or list the whole collection when
+        the store has no snapshot that is still valid
+        :return: True if the collection was listed
+        """
+        snapshot = None
+        if self.store:
+            snapshot = self.store.get(self.namespace, SNAPSHOT_KEY)
+        if snapshot:
+            self.sync(snapshot['records'], snapshot['synced_at'])
+            return False
+        snapshot = {
+            'synced_at': time.time(),
+            'records': list(
+                resource.iter_list(page_size=INVENTORY_PAGE_SIZE)
+            )
+        }
+        if self.store:
+            self.store.set(self.namespace, SNAPSHOT_KEY, snapshot, self.ttl)
+        self.sync(snapshot['records'], snapshot['synced_at'])
+        return True
+
+    def _list(self, resource, filters, refresh):
+        key = json.dumps(filters, sort_keys=True)
+        records = None
+        if self.store and not refresh:
+            records = self.store.get(self.namespace, key)
+        if records is None:
+            records = list(resource.iter_list(filters=filters))
+            # Missing objects are not stored, so that the other processes
+            # list them again until they are added
+            if self.store and records:
+                self.store.set(self.namespace, key, records, self.ttl)
+        return records
+
+    def lookup(self, resource, refresh=False, **filters):
+        """
+        Find the objects that match the filters. The whole collection is
+        listed when the snapshot expired. Otherwise only the objects that
+        match the filters are listed, when none of them is in the snapshot
+        because they were added after it was taken or when `refresh` is set.
+        Snapshots and listed objects are taken from the store if it has
+        them, except the listed objects when `refresh` is set
+        :param resource: Instance of the `NSXTResource` of the collection
+        that is used to list it
+        :param refresh: Get the matching objects from the manager even if
+        they are in the snapshot
+        :param filters: Values of the indexed fields the objects must have
+        :return: List of copies of the matching objects
+        """
+        filters = _get_filters(filters)
+        listed = self.expired and self._load(resource)
+        if listed or not refresh:
+            records = self.find(**filters)
+            if records or listed:
+                return records
+        records = self._list(resource, filters, refresh)
+        self.replace(filters, records)
+        return copy.deepcopy(records)
+
+
+def _get_filters(filters):
+    filters = dict(
+        (field, value) for field, value in filters.items()
+        if value is not None
+    )
+    if not filters:
+        raise ValueError('At least one field value is required')
+    return filters
+
+
+def index_attachments(ports):
+    """
+    :param ports: Iterable of segment ports as dicts, with at least the
+    `id` & `attachment.id` fields
+    :return: Dict of the attached ports keyed by the id of their attachment
+    """
+    return dict(
+        (port['attachment']['id'], port) for port in ports
+        if port.get('attachment') and port['attachment'].get('id')
+    )
+
+
+class AttachmentIndex(object):
+    """
+    Thread safe index of the ports of each segment by the id of their
+    attachment, i.e the `lport_attachment_id` of vifs, so that the ports of
+    a segment are listed once for all the vifs that are matched with them
+    """
+    def __init__(self, ttl, store=None, namespace=None):
+        self.ttl = ttl
+        self.store = store
+        self.namespace = namespace
+        # Segment id mapped to tuple of the time its ports were listed and
+        # their index
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def _list(self, resource, segment_id, refresh):
+        ports = None
+        if self.store and not refresh:
+            ports = self.store.get(self.namespace, segment_id)
+        if ports is None:
+            ports = list(resource.iter_attachments(segment_id))
+            # Segments without ports are not stored, so that the other
+            # processes list them again until ports are attached
+            if self.store and ports:
+                self.store.set(self.namespace, segment_id, ports, self.ttl)
+        return ports
+
+    def get(self, resource, segment_id, refresh=False):
+        """
+        :param resource: Instance of `SegmentPort` that is used to list the
+        ports of the segment
+        :param segment_id: Id of the segment
+        :param refresh: List the ports even if they are already indexed
+        :return: Dict of the attached ports keyed by the id of their
+        attachment
+        """
+        with self._lock:
+            synced_at, index = self._segments.get(segment_id, (None, None))
+        if refresh or synced_at is None \
+                or time.time() - synced_at >= self.ttl:
+            synced_at = time.time()
+            index = index_attachments(
+                self._list(resource, segment_id, refresh)
+            )
+            with self._lock:
+                self._segments[segment_id] = (synced_at, index)
+        # The index is shared, so callers get their own copy of it
+        return dict(index)
+
+
+class InventoryCache(object):
+    """
+    Indexed snapshots of the fabric inventory and of the segment ports of
+    one manager
+    """
+    def __init__(self, ttl, store=None, namespace=None):
+        self.ttl = ttl
+        self.store = store
+        self.virtual_machines = InventoryIndex(
+            'external_id', ('display_name', 'external_id'), ttl,
+            store, '{0}/fabric/virtual-machines'.format(namespace)
+        )
+        self.vifs = InventoryIndex(
+            'external_id', ('owner_vm_id', 'lport_attachment_id'), ttl,
+            store, '{0}/fabric/vifs'.format(namespace)
+        )
+        self.segment_ports = AttachmentIndex(
+            ttl, store, '{0}/segment-ports'.format(namespace)
+        )
+
+
+_inventory_caches = {}
+_inventory_caches_lock = threading.Lock()
+
+
+def get_inventory_cache(key, ttl, store=None, namespace=None):
+    """
+    Return the inventory cache of the manager, which is shared by all the
+    resources of the process
+    :param key: Tuple that identify the manager & the credentials
+    :param ttl: Seconds the snapshots are used before they are listed
+    again, the inventory is not cached if it is not set
+    :param store: Instance of `PersistentCache` that share the inventory
+    with the other processes
+    :param namespace: Namespace of the manager in the store
+    :return: Instance of `InventoryCache` or None
+    """
+    if not ttl:
+        return None
+    with _inventory_caches_lock:
+        cache = _inventory_caches.get(key)
+        if cache is None or cache.ttl != ttl or cache.store is not store:
+            cache = _inventory_caches[key] = InventoryCache(
+                ttl, store, namespace
+            )
+        return cache
+
+
+def clear_inventory_caches():
+    with _inventory_caches_lock:
+        _inventory_caches.clear()
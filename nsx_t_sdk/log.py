@@ -0,0 +1,82 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import logging
+
+from vmware.vapi.bindings.struct import VapiStruct
+
+# Maximum number of characters of payloads that are logged unless wire trace
+# is enabled
+PREVIEW_MAX_LENGTH = 1024
+
+
+def is_debug_enabled(logger):
+    """
+    Check if debug messages of the logger are emitted, so that they are only
+    formatted when needed. Loggers that cannot tell are assumed to emit them
+    """
+    is_enabled_for = getattr(logger, 'isEnabledFor', None)
+    if is_enabled_for is None:
+        return True
+    return is_enabled_for(logging.DEBUG)
+
+
+def _truncate(text, max_length):
+    if len(text) <= max_length:
+        return text
+    return '{0}... ({1} more characters)'.format(
+        text[:max_length], len(text) - max_length
+    )
+
+
+def _preview_items(items, max_length):
+    opening, closing = ('(', ')') if isinstance(items, tuple) else ('[', ']')
+    parts = []
+    length = 0
+    for index, item in enumerate(items):
+        if length >= max_length:
+            parts.append('... {0} more items'.format(len(items) - index))
+            break
+        # Only the items that fit are rendered, so large lists are never
+        # converted to string as a whole
+        text = preview(item, max_length - length)
+        parts.append(text)
+        length += len(text) + 2
+    return '{0}{1}{2}'.format(opening, ', '.join(parts), closing)
+
+
+def preview(value, max_length=PREVIEW_MAX_LENGTH):
+    """
+    Render value for debug logs
+    :param value: Object to render, i.e request args or api result
+    :param max_length: Maximum number of characters to render, the whole
+    value is rendered if it is None
+    :return: String representation of the value
+    """
+    if max_length is None:
+        return str(value)
+    results = getattr(value, 'results', None) \
+        if isinstance(value, VapiStruct) else None
+    if isinstance(results, list):
+        # Results of list apis
+        return '{0}(result_count={1}, cursor={2}, results={3})'.format(
+            type(value).__name__,
+            getattr(value, 'result_count', None),
+            getattr(value, 'cursor', None),
+            _preview_items(results, max_length)
+        )
+    if isinstance(value, (list, tuple)):
+        return _preview_items(value, max_length)
+    return _truncate(str(value), max_length)
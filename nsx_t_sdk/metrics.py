@@ -0,0 +1,320 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import json
+import time
+import threading
+from collections import namedtuple, Counter, OrderedDict
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets
+HISTOGRAM_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+CallMetric = namedtuple('CallMetric', [
+    'service_name',
+    'action',
+    'resource_type',
+    'duration',
+    'retries',
+    'status',
+    'response_size',
+    'error',
+    'retry_delay',
+    'rate_limit_delay'
+])
+
+_local = threading.local()
+_hooks = []
+_hooks_lock = threading.Lock()
+
+
+class Histogram(object):
+    """
+    Latency histogram with fixed buckets, so that the memory it uses does
+    not depend on the number of recorded values
+    """
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        # The last bucket count the values greater than the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Estimate the percentile as the upper bound of the bucket it falls in
+        :param percent: Number between 0 and 100
+        :return: Latency in seconds or None when there are no values
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': round(self.total, 6),
+            'avg': round(self.total / self.count, 6) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class MetricsCollector(object):
+    """
+    Thread safe aggregator of `CallMetric` records grouped by resource type
+    and action
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+
+    def __len__(self):
+        return len(self._stats)
+
+    def record(self, metric):
+        key = '{0}.{1}'.format(metric.resource_type, metric.action)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'service_name': metric.service_name,
+                    'histogram': Histogram(),
+                    'errors': Counter(),
+                    'statuses': Counter(),
+                    'retries': 0,
+                    'retry_delay': 0.0,
+                    'rate_limit_delay': 0.0,
+                    'response_size': 0
+                }
+            stats['histogram'].add(metric.duration)
+            stats['retries'] += metric.retries
+            stats['retry_delay'] += metric.retry_delay
+            stats['rate_limit_delay'] += metric.rate_limit_delay
+            stats['response_size'] += metric.response_size or 0
+            if metric.status is not None:
+                stats['statuses'][str(metric.status)] += 1
+            if metric.error:
+                stats['errors'][metric.error] += 1
+
+    def summary(self):
+        """
+        :return: Dict of the aggregated metrics keyed by "ResourceType.action"
+        """
+        with self._lock:
+            summary = OrderedDict()
+            for key, stats in self._stats.items():
+                item = stats['histogram'].to_dict()
+                item.update({
+                    'service_name': stats['service_name'],
+                    'retries': stats['retries'],
+                    'retry_delay': round(stats['retry_delay'], 6),
+                    'rate_limit_delay': round(stats['rate_limit_delay'], 6),
+                    'response_size': stats['response_size'],
+                    'statuses': dict(stats['statuses']),
+                    'errors': dict(stats['errors']),
+                })
+                summary[key] = item
+            return summary
+
+    def reset(self):
+        with self._lock:
+            self._stats = OrderedDict()
+
+
+_collector = MetricsCollector()
+
+
+def get_metrics_collector():
+    """
+    :return: The process wide collector which records all the api calls
+    """
+    return _collector
+
+
+def add_hook(hook):
+    """
+    Register callable that is called with `CallMetric` after each api call
+    """
+    with _hooks_lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+
+
+def remove_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def get_active_collectors():
+    return getattr(_local, 'collectors', ())
+
+
+@contextmanager
+def active_collectors(collectors):
+    """
+    Set the scoped collectors of the current thread, i.e to keep recording
+    the calls that are made by worker threads on behalf of an operation
+    """
+    previous = get_active_collectors()
+    _local.collectors = tuple(collectors)
+    try:
+        yield
+    finally:
+        _local.collectors = previous
+
+
+@contextmanager
+def collect(collector=None):
+    """
+    Record the api calls made by the current thread using the collector in
+    addition to the process wide collector
+    :param collector: Instance of `MetricsCollector`, new one is created
+    if not provided
+    :return: The collector
+    """
+    collector = collector or MetricsCollector()
+    with active_collectors(get_active_collectors() + (collector,)):
+        yield collector
+
+
+def _notify(metric):
+    _collector.record(metric)
+    for collector in get_active_collectors():
+        collector.record(metric)
+    for hook in list(_hooks):
+        try:
+            hook(metric)
+        except Exception:
+            # Instrumentation must never break the api calls
+            pass
+
+
+class ApiCall(object):
+    """
+    Measure one api call, including its retries, and report it to the
+    collectors & hooks when it is done
+    """
+    def __init__(self, service_name, action, resource_type):
+        self.service_name = service_name
+        self.action = action
+        self.resource_type = resource_type
+        self.retries = 0
+        self.retry_delay = 0.0
+        # Seconds waited for the client side rate limiter
+        self.rate_limit_delay = 0.0
+        self.status = None
+        self.response_size = None
+        # Value of the Retry-After header of the last response if any
+        self.retry_after = None
+        self._started_at = None
+        self._previous = None
+
+    def add_retry(self, delay=0):
+        """
+        :param delay: Seconds waited before sending the call again
+        """
+        self.retries += 1
+        self.retry_delay += delay
+
+    def start(self):
+        self._started_at = time.time()
+        return self
+
+    def finish(self, error_type=None):
+        """
+        Report the call to the collectors & hooks
+        :param error_type: The class of the error raised by the call if any
+        """
+        _notify(CallMetric(
+            service_name=self.service_name,
+            action=self.action,
+            resource_type=self.resource_type,
+            duration=time.time() - self._started_at,
+            retries=self.retries,
+            status=self.status,
+            response_size=self.response_size,
+            error=error_type.__name__ if error_type else None,
+            retry_delay=self.retry_delay,
+            rate_limit_delay=self.rate_limit_delay
+        ))
+
+    def __enter__(self):
+        # The call is bound to the thread so that `record_response` can
+        # find it, calls that share one thread, i.e asyncio tasks, must use
+        # `start` & `finish` instead
+        self._previous = getattr(_local, 'call', None)
+        _local.call = self
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.call = self._previous
+        self.finish(exc_type)
+        return False
+
+
+def record_response(response, *args, **kwargs):
+    """
+    Requests response hook that attach the http status, the size and the
+    Retry-After header of the response to the api call that is running in
+    the current thread
+    """
+    call = getattr(_local, 'call', None)
+    if call is not None:
+        call.status = response.status_code
+        call.retry_after = response.headers.get('Retry-After')
+        size = response.headers.get('Content-Length')
+        call.response_size = \
+            int(size) if size and size.isdigit() else len(response.content)
+
+
+def export_to_file(path, summary, **extra):
+    """
+    Append the summary as one json line to the file
+    :param path: Path of the file
+    :param summary: Dict returned by `MetricsCollector.summary`
+    :param extra: Extra fields to add to the line, i.e the operation name
+    """
+    record = dict(extra)
+    record['timestamp'] = time.time()
+    record['metrics'] = summary
+    with open(path, 'a') as metrics_file:
+        metrics_file.write(json.dumps(record) + '\n')
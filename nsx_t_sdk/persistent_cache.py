@@ -0,0 +1,225 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from nsx_t_sdk.files import get_private_dir, open_private_file
+
+# Name of the cache file under the agent work dir
+PERSISTENT_CACHE_FILE = 'nsx-t-cache.sqlite'
+# Default maximum size in MB of the values kept in the cache
+PERSISTENT_CACHE_MAX_SIZE = 64
+# Seconds to wait for another process that is writing to the cache
+PERSISTENT_CACHE_TIMEOUT = 10
+# The access time of an entry is only updated when it is older than this,
+# so that most reads do not need to write to the cache
+ACCESS_TIME_RESOLUTION = 1
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries ('
+    'namespace TEXT NOT NULL, '
+    'key TEXT NOT NULL, '
+    'value TEXT NOT NULL, '
+    'size INTEGER NOT NULL, '
+    'expires_at REAL NOT NULL, '
+    'accessed_at REAL NOT NULL, '
+    'PRIMARY KEY (namespace, key))',
+    'CREATE INDEX IF NOT EXISTS entries_accessed_at '
+    'ON entries (accessed_at)',
+)
+
+
+class PersistentCache(object):
+    """
+    Cache of json values stored in a local SQLite file, so that the values
+    read by one operation process can be used by the other processes of
+    the agent. The values are grouped by namespace, i.e per manager, expire
+    after their ttl and the least recently used ones are evicted when the
+    size of the values exceeds the maximum size. The file uses write ahead
+    logging, so readers do not block each other nor the writer.
+
+    The cache must never break the api calls, so the errors of the file are
+    ignored and reported as cache misses.
+    """
+    def __init__(self, path, max_size=PERSISTENT_CACHE_MAX_SIZE):
+        """
+        :param path: Path of the cache file
+        :param max_size: Maximum size in MB of the values kept in the cache
+        """
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+
+    @property
+    def max_size_bytes(self):
+        return int(self.max_size * 1024 * 1024)
+
+    def _connect(self):
+        # Connections cannot be shared by threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # The file is created before SQLite opens it, so that it is only
+            # readable by the current user and a file of another user is
+            # never used
+            os.close(open_private_file(self.path))
+            connection = sqlite3.connect(
+                self.path, timeout=PERSISTENT_CACHE_TIMEOUT
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key):
+        """
+        :return: The value stored for the key or None if there is no value
+        or if it expired
+        """
+        now = time.time()
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT value, expires_at, accessed_at FROM entries '
+                'WHERE namespace = ? AND key = ?', (namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            if now - row[2] >= ACCESS_TIME_RESOLUTION:
+                with connection:
+                    connection.execute(
+                        'UPDATE entries SET accessed_at = ? '
+                        'WHERE namespace = ? AND key = ?',
+                        (now, namespace, key)
+                    )
+            return json.loads(row[0])
+        except (sqlite3.Error, OSError, ValueError):
+            return None
+
+    def set(self, namespace, key, value, ttl):
+        """
+        Store the value for the key and evict the expired values and the
+        least recently used ones if the cache is full
+        :param value: Value that can be serialized to json
+        :param ttl: Seconds the value can be used
+        :return: True if the value was stored
+        """
+        now = time.time()
+        value = json.dumps(value)
+        if len(value) > self.max_size_bytes:
+            return False
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries '
+                    '(namespace, key, value, size, expires_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (namespace, key, value, len(value), now + ttl, now)
+                )
+                self._evict(connection, now)
+            return True
+        except (sqlite3.Error, OSError):
+            return False
+
+    def _evict(self, connection, now):
+        connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        size = connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()[0]
+        excess = size - self.max_size_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for namespace, key, size in connection.execute(
+                'SELECT namespace, key, size FROM entries '
+                'ORDER BY accessed_at'):
+            if excess <= 0:
+                break
+            evicted.append((namespace, key))
+            excess -= size
+        connection.executemany(
+            'DELETE FROM entries WHERE namespace = ? AND key = ?', evicted
+        )
+
+    def delete(self, namespace, key):
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    'DELETE FROM entries WHERE namespace = ? AND key = ?',
+                    (namespace, key)
+                )
+        except (sqlite3.Error, OSError):
+            pass
+
+    def clear(self, namespace=None):
+        """
+        Remove all the values of the namespace or of the whole cache
+        """
+        try:
+            connection = self._connect()
+            with connection:
+                if namespace is None:
+                    connection.execute('DELETE FROM entries')
+                else:
+                    connection.execute(
+                        'DELETE FROM entries WHERE namespace = ?',
+                        (namespace,)
+                    )
+        except (sqlite3.Error, OSError):
+            pass
+
+
+def get_persistent_cache_path():
+    """
+    :return: Path of the cache file under the work dir of the agent, or
+    under the directory of the user in the temp directory when running
+    outside of an agent
+    """
+    return os.path.join(get_private_dir(), PERSISTENT_CACHE_FILE)
+
+
+_persistent_caches = {}
+_persistent_caches_lock = threading.Lock()
+
+
+def get_persistent_cache(path=None, max_size=None):
+    """
+    Return the persistent cache of the file, which is shared by all the
+    resources of the process
+    :param path: Path of the cache file, default to the file under the
+    agent work dir
+    :param max_size: Maximum size in MB of the values kept in the cache
+    :return: Instance of `PersistentCache`
+    """
+    path = path or get_persistent_cache_path()
+    max_size = max_size or PERSISTENT_CACHE_MAX_SIZE
+    with _persistent_caches_lock:
+        cache = _persistent_caches.get(path)
+        if cache is None:
+            cache = _persistent_caches[path] = PersistentCache(path, max_size)
+        cache.max_size = max_size
+        return cache
+
+
+def clear_persistent_caches():
+    with _persistent_caches_lock:
+        _persistent_caches.clear()
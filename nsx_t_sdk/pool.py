@@ -0,0 +1,207 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import weakref
+import threading
+from collections import OrderedDict
+
+# Maximum number of connections kept alive by the pool at the same time
+POOL_MAX_SIZE = 16
+# Number of seconds a connection can stay unused before it is evicted
+POOL_IDLE_TIMEOUT = 600
+
+
+class PooledConnection(object):
+    """
+    Hold everything that is needed to talk to one NSX-T manager using one
+    set of credentials, so that it can be shared by many resources
+    """
+    def __init__(self, session, connector, stub_config, logout=None):
+        self.session = session
+        self.connector = connector
+        self.stub_config = stub_config
+        self.logout = logout
+        self.last_used = time.time()
+        self._stubs = {}
+        self._stubs_lock = threading.Lock()
+        # Weak references of the objects that use the connection, which are
+        # dropped once the objects are garbage collected
+        self._users = set()
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def add_user(self, user):
+        self._users.add(weakref.ref(user, self._users.discard))
+
+    @property
+    def in_use(self):
+        return bool(self._users)
+
+    def get_stub(self, key, factory):
+        """
+        Return the stub stored for the key and build it using the factory if
+        it does not exist yet, so that the stub factories & service stubs
+        are only built once per connection
+        :param key: Hashable value that identify the stub, i.e the client
+        type or the client type & service name
+        :param factory: Callable that return new stub
+        :return: The stub
+        """
+        stub = self._stubs.get(key)
+        if stub is None:
+            with self._stubs_lock:
+                stub = self._stubs.get(key)
+                if stub is None:
+                    stub = factory()
+                    self._stubs[key] = stub
+        return stub
+
+    def close(self):
+        try:
+            if self.logout:
+                self.logout()
+        finally:
+            self.session.close()
+
+
+class ClientPool(object):
+    """
+    Thread safe pool of `PooledConnection` objects keyed by the connection
+    parameters of the `client_config`. The connections that are still used
+    are never evicted, so the pool can exceed its maximum size while they
+    are in use
+    """
+    def __init__(self, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._connections = OrderedDict()
+        # Locks of the keys whose connection is being created
+        self._key_locks = {}
+
+    def __len__(self):
+        return len(self._connections)
+
+    def __contains__(self, key):
+        return key in self._connections
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            # Closing the connection is best effort only, the manager will
+            # drop it anyway once it is idle
+            pass
+
+    def _evict_idle(self):
+        now = time.time()
+        for key in list(self._connections.keys()):
+            connection = self._connections[key]
+            if now - connection.last_used > self.idle_timeout \
+                    and not connection.in_use:
+                del self._connections[key]
+                self._close(connection)
+
+    def _evict_overflow(self):
+        excess = len(self._connections) - self.max_size
+        # The most recently used connection is the one being acquired
+        for key in list(self._connections.keys())[:-1]:
+            if excess <= 0:
+                break
+            connection = self._connections[key]
+            if not connection.in_use:
+                del self._connections[key]
+                self._close(connection)
+                excess -= 1
+
+    def _checkout(self, key, connection, user):
+        # Re-insert the connection so that the most recently used
+        # connections are always at the end of the dict
+        self._connections[key] = connection
+        connection.touch()
+        if user is not None:
+            connection.add_user(user)
+
+    def _get(self, key, user):
+        with self._lock:
+            self._evict_idle()
+            connection = self._connections.pop(key, None)
+            if connection is not None:
+                self._checkout(key, connection, user)
+            return connection
+
+    def acquire(self, key, factory, user=None):
+        """
+        Return the connection stored for the key and create it using the
+        factory if it does not exist yet
+        :param key: Hashable value that identify the connection
+        :param factory: Callable that return new `PooledConnection`
+        :param user: Object that use the connection, which is not evicted
+        until the object is garbage collected
+        :return: Instance of `PooledConnection`
+        """
+        connection = self._get(key, user)
+        if connection is not None:
+            return connection
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            # The factory can login to the manager, so only the threads that
+            # need the same connection wait for it to be created
+            with key_lock:
+                connection = self._get(key, user)
+                if connection is None:
+                    connection = self._add(key, factory(), user)
+        finally:
+            # The lock of the key is only kept while its connection is
+            # created, so that the pool does not keep a lock for each key
+            # it ever used
+            with self._lock:
+                if self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+        return connection
+
+    def _add(self, key, connection, user):
+        with self._lock:
+            existing = self._connections.pop(key, None)
+            if existing is not None:
+                # Another thread created the connection meanwhile, which
+                # can happen when the creation of the first one failed
+                self._close(connection)
+                connection = existing
+            self._checkout(key, connection, user)
+            self._evict_overflow()
+            return connection
+
+    def evict(self, key):
+        with self._lock:
+            connection = self._connections.pop(key, None)
+            if connection:
+                self._close(connection)
+
+    def clear(self):
+        with self._lock:
+            while self._connections:
+                _, connection = self._connections.popitem()
+                self._close(connection)
+
+
+_client_pool = ClientPool()
+
+
+def get_client_pool():
+    return _client_pool
@@ -0,0 +1,181 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import re
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # File locks are not available on windows, so the requests are only
+    # limited per process
+    fcntl = None
+
+from nsx_t_sdk.files import get_private_dir, open_private_file
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket that allow `rate` requests per second on
+    average and bursts of up to `burst` requests
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def _consume(self, tokens, updated_at, now):
+        """
+        Refill the bucket based on the time passed since it was updated and
+        take one token if possible
+        :return: Tuple of the tokens left, the update time and the seconds to
+        wait before a token is available, which is 0 if the token was taken
+        """
+        tokens = min(
+            self.burst, tokens + max(now - updated_at, 0) * self.rate
+        )
+        # Tolerate rounding errors of the refill, otherwise the waits for
+        # the missing fraction of token can get too short to refill it
+        if tokens >= 1 - 1e-9:
+            return max(tokens - 1, 0), now, 0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def try_acquire(self):
+        """
+        Take a token if one is available without waiting
+        :return: The seconds to wait before a token is available, which is 0
+        if the token was taken
+        """
+        with self._lock:
+            self._tokens, self._updated_at, wait = self._consume(
+                self._tokens, self._updated_at, time.time()
+            )
+        return wait
+
+    def acquire(self):
+        """
+        Wait until a token is available and take it
+        :return: The number of seconds waited
+        """
+        waited = 0
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket that keep its state in a local file, which is locked while
+    it is updated, so that it is shared by all the processes that use it.
+    The requests are only limited per process when the file can not be
+    safely opened
+    """
+    def __init__(self, rate, burst=None, path=None):
+        super(SharedTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+    def try_acquire(self):
+        # The file lock does not prevent threads of the same process that
+        # share the bucket from updating it at the same time
+        with self._lock:
+            try:
+                fd = open_private_file(self.path)
+            except OSError:
+                self._tokens, self._updated_at, wait = self._consume(
+                    self._tokens, self._updated_at, time.time()
+                )
+                return wait
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                now = time.time()
+                try:
+                    tokens, updated_at = [
+                        float(value)
+                        for value in os.read(fd, 64).decode('utf-8').split()
+                    ]
+                except ValueError:
+                    # New or corrupted file
+                    tokens, updated_at = self.burst, now
+                tokens, updated_at, wait = self._consume(
+                    tokens, updated_at, now
+                )
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                state = '{0!r} {1!r}'.format(tokens, updated_at)
+                os.write(fd, state.encode('utf-8'))
+            finally:
+                # Closing the file release the lock
+                os.close(fd)
+        return wait
+
+
+def get_shared_bucket_path(key):
+    """
+    :param key: Tuple of the manager host & port
+    :return: Path of the file of the shared bucket of the manager
+    """
+    name = re.sub(
+        r'[^A-Za-z0-9.-]', '_', '_'.join(str(part) for part in key)
+    )
+    return os.path.join(
+        get_private_dir(), 'nsx-t-rate-limit-{0}'.format(name)
+    )
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key, rate, burst=None, shared=False):
+    """
+    Return the rate limiter of the manager, which is shared by all the
+    resources of the process
+    :param key: Tuple of the manager host & port
+    :param rate: Maximum number of requests per second, the requests are
+    not limited if it is not set
+    :param burst: Maximum number of requests sent at once, default to rate
+    :param shared: Share the limit with the other processes of the host
+    :return: Instance of `TokenBucket` or None
+    """
+    if not rate:
+        return None
+    shared = shared and fcntl is not None
+    class_type = SharedTokenBucket if shared else TokenBucket
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(key)
+        if rate_limiter is None \
+                or type(rate_limiter) is not class_type \
+                or rate_limiter.rate != float(rate) \
+                or rate_limiter.burst != float(burst or rate):
+            if shared:
+                rate_limiter = SharedTokenBucket(
+                    rate, burst, get_shared_bucket_path(key)
+                )
+            else:
+                rate_limiter = TokenBucket(rate, burst)
+            _rate_limiters[key] = rate_limiter
+        return rate_limiter
+
+
+def clear_rate_limiters():
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
@@ -0,0 +1,54 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import importlib
+
+from nsx_t_sdk._compat import Mapping
+
+
+class LazyModuleRegistry(Mapping):
+    """
+    Read only mapping of names to modules that are only imported the first
+    time they are looked up, so that processes only pay the import cost of
+    the modules they actually use
+    """
+    def __init__(self, modules):
+        """
+        :param modules: Dict of names to dotted modules paths
+        """
+        self._paths = dict(modules)
+        self._modules = {}
+
+    def __getitem__(self, name):
+        module = self._modules.get(name)
+        if module is None:
+            # The import lock already prevents importing the same module
+            # twice when it is looked up by many threads
+            module = importlib.import_module(self._paths[name])
+            self._modules[name] = module
+        return module
+
+    def __contains__(self, name):
+        # Default implementation looks up the name which import the module
+        return name in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def is_loaded(self, name):
+        return name in self._modules
@@ -13,12 +13,15 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from itertools import islice
+
 from nsx_t_sdk.common import (
     NSXTResource,
     ACTION_GET,
     ACTION_LIST
 )
 from nsx_t_sdk.exceptions import NSXTSDKException
+from nsx_t_sdk.inventory import INVENTORY_PAGE_SIZE, index_attachments
 
 
 class State(NSXTResource):
@@ -33,10 +36,24 @@ class State(NSXTResource):
     allow_patch = False
 
 
+class Infra(NSXTResource):
+    client_type = 'nsx_policy'
+    resource_type = 'Infra'
+    service_name = 'Infra'
+
+    allow_create = False
+    allow_delete = False
+    allow_get = False
+    allow_list = False
+    allow_update = False
+    allow_patch = True
+
+
 class Segment(NSXTResource):
     client_type = 'nsx_infra'
     resource_type = 'Segment'
     service_name = 'Segments'
+    hierarchical_child = ('ChildSegment', 'Segment')
 
 
 class SegmentPort(NSXTResource):
@@ -44,6 +61,9 @@ class SegmentPort(NSXTResource):
     resource_type = 'Port'
     service_name = 'Ports'
 
+    # Fields needed to match ports with the network interfaces of VMs
+    attachment_fields = ('id', 'attachment.id')
+
     allow_create = False
     allow_delete = True
     allow_get = True
@@ -51,6 +71,36 @@ class SegmentPort(NSXTResource):
     allow_update = False
     allow_patch = False
 
+    def iter_attachments(self, segment_id):
+        """
+        Iterate over the ports of the segment with only the fields needed
+        to match them with the network interfaces of VMs
+        """
+        return self.iter_list(
+            filters={'segment_id': segment_id},
+            page_size=INVENTORY_PAGE_SIZE,
+            prefetch=True,
+            fields=self.attachment_fields
+        )
+
+    def get_attachment_index(self, segment_id, refresh=False):
+        """
+        Index the ports of the segment by the id of their attachment, which
+        is the `lport_attachment_id` of the network interfaces of VMs. The
+        index is reused by the next lookups when the inventory cache is
+        enabled
+        :param segment_id: Id of the segment
+        :param refresh: List the ports even if the index is cached
+        :return: Dict of the attached ports keyed by the id of their
+        attachment
+        """
+        inventory_cache = self.inventory_cache
+        if inventory_cache:
+            return inventory_cache.segment_ports.get(
+                self, segment_id, refresh
+            )
+        return index_attachments(self.iter_attachments(segment_id))
+
 
 class SegmentState(State):
     client_type = 'segment'
@@ -60,6 +110,13 @@ class SegmentState(State):
 class DhcpStaticBindingConfigs(NSXTResource):
     client_type = 'segment'
     service_name = 'DhcpStaticBindingConfigs'
+    hierarchical_child = (
+        'ChildDhcpStaticBindingConfig',
+        'DhcpStaticBindingConfig'
+    )
+
+    # Fields needed to lookup the bindings of a segment
+    id_fields = ('id', 'resource_type')
 
 
 class DhcpStaticBindingState(State):
@@ -79,12 +136,14 @@ class DhcpServerConfig(NSXTResource):
     client_type = 'nsx_infra'
     resource_type = 'DhcpServerConfig'
     service_name = 'DhcpServerConfigs'
+    hierarchical_child = ('ChildDhcpServerConfig', 'DhcpServerConfig')
 
 
 class Tier1(NSXTResource):
     client_type = 'nsx_infra'
     resource_type = 'Tier1'
     service_name = 'Tier1s'
+    hierarchical_child = ('ChildTier1', 'Tier1')
 
 
 class Tier1state(State):
@@ -105,8 +164,7 @@ class VirtualMachine(NSXTResource):
     allow_update = False
     allow_patch = False
 
-    def get(self, args=None, to_dict=True):
-        self._validate_allowed_method(self.allow_get, ACTION_GET)
+    def _get_lookup_filters(self):
         display_name = self.resource_config.get('vm_name')
         external_id = self.resource_config.get('vm_id')
         if not any([display_name, external_id]):
@@ -115,20 +173,16 @@ class VirtualMachine(NSXTResource):
                 '`vm_name or vm_id` must '
                 'be provided to lookup the vm resource'
             )
-        results = self.list(
-            filters={
-                'display_name': display_name, 'external_id': external_id
-            },
-            to_dict=to_dict
-        )
+        return {'display_name': display_name, 'external_id': external_id}
+
+    def _get_lookup_result(self, filters, results):
         error_message = ''
+        name = filters['display_name'] or filters['external_id']
         if not results:
-            error_message = 'No virtual machine {0} found'.format(
-                display_name or external_id
-            )
+            error_message = 'No virtual machine {0} found'.format(name)
         elif len(results) > 1:
             error_message = 'More than one virtual machine {0} found'.format(
-                display_name or external_id
+                name
             )
 
         if error_message:
@@ -137,6 +191,17 @@ class VirtualMachine(NSXTResource):
         self.resource_id = results[0]['external_id']
         return results[0]
 
+    def get(self, args=None):
+        self._validate_allowed_method(self.allow_get, ACTION_GET)
+        filters = self._get_lookup_filters()
+        inventory_cache = self.inventory_cache
+        if inventory_cache:
+            results = inventory_cache.virtual_machines.lookup(self, **filters)
+        else:
+            # Only two results are needed to know if the lookup is ambiguous
+            results = list(islice(self.iter_list(filters=filters), 2))
+        return self._get_lookup_result(filters, results)
+
 
 class VirtualNetworkInterface(NSXTResource):
     client_type = 'fabric'
@@ -170,3 +235,25 @@ class VirtualNetworkInterface(NSXTResource):
             to_dict=to_dict
         )
         return results
+
+    def lookup(self, owner_vm_id=None, lport_attachment_id=None,
+               refresh=False):
+        """
+        List the vifs of a virtual machine or the vif of a logical port
+        attachment, from the inventory cache when it is enabled
+        :param owner_vm_id: External id of the virtual machine
+        :param lport_attachment_id: Id of the logical port attachment
+        :param refresh: Get the vifs from the manager even if they are cached
+        :return: List of vifs as dicts
+        """
+        filters = {
+            'owner_vm_id': owner_vm_id,
+            'lport_attachment_id': lport_attachment_id
+        }
+        inventory_cache = self.inventory_cache
+        if inventory_cache:
+            return inventory_cache.vifs.lookup(self, refresh, **filters)
+        return list(self.iter_list(filters=dict(
+            (field, value) for field, value in filters.items()
+            if value is not None
+        )))
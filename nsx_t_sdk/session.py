@@ -0,0 +1,118 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+import threading
+
+# Default idle timeout of NSX-T Manager sessions in seconds
+SESSION_TIMEOUT = 1800
+# Number of seconds before the session expire to re-login
+SESSION_REFRESH_MARGIN = 60
+
+SESSION_CREATE_PATH = 'api/session/create'
+SESSION_DESTROY_PATH = 'api/session/destroy'
+
+
+class SessionToken(object):
+    """
+    Authentication headers returned by the NSX-T Manager for one session
+    """
+    def __init__(self, cookie, xsrf_token, timeout=SESSION_TIMEOUT):
+        self.cookie = cookie
+        self.xsrf_token = xsrf_token
+        self.timeout = timeout
+        self.last_used = time.time()
+
+    @property
+    def headers(self):
+        return {
+            'Cookie': self.cookie,
+            'X-XSRF-TOKEN': self.xsrf_token
+        }
+
+    @property
+    def expires_at(self):
+        # NSX-T sessions expire after being idle for the timeout period
+        return self.last_used + self.timeout
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def is_expiring(self, margin=SESSION_REFRESH_MARGIN):
+        return time.time() + margin >= self.expires_at
+
+
+class SessionTokenCache(object):
+    """
+    Thread safe cache of `SessionToken` shared by all resources that use the
+    same manager & credentials
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tokens = {}
+
+    def __contains__(self, key):
+        return key in self._tokens
+
+    def get(self, key):
+        return self._tokens.get(key)
+
+    def refresh(self, key, login, stale_token=None):
+        """
+        Return a valid token for the key. A new token is only requested
+        using `login` when there is no token, when it is about to expire or
+        when it is the same one that the caller found to be rejected
+        :param key: Hashable value that identify the credentials
+        :param login: Callable that return new `SessionToken`
+        :param stale_token: Token rejected by the manager
+        :return: Instance of `SessionToken`
+        """
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None or token is stale_token or token.is_expiring():
+                token = login()
+                self._tokens[key] = token
+            return token
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._tokens.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+_session_token_cache = SessionTokenCache()
+
+
+def get_session_token_cache():
+    return _session_token_cache
+
+
+def destroy_session(session, url, key):
+    """
+    Logout the session cached for the key from the NSX-T Manager so that it
+    does not wait until the idle timeout to release it
+    :param session: Instance of `requests.Session` used by the token
+    :param url: Base url of the NSX-T Manager
+    :param key: Hashable value that identify the credentials
+    """
+    token = get_session_token_cache().invalidate(key)
+    if token:
+        session.post(
+            '{0}/{1}'.format(url, SESSION_DESTROY_PATH),
+            headers=token.headers
+        )
@@ -0,0 +1,547 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Local stand-in for the NSX-T Policy & Manager apis used by the plugin, so
+that the SDK can be exercised over real HTTPS connections by tests and
+benchmarks. Resources are kept in memory and the server supports
+configurable latency, pagination, realization delay and error injection
+"""
+
+import os
+import re
+import ssl
+import json
+import time
+import uuid
+import base64
+import threading
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
+
+from nsx_t_sdk._compat import (
+    HTTPServer,
+    BaseHTTPRequestHandler,
+    ThreadingMixIn,
+    urlparse,
+    parse_qs
+)
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), 'resources')
+CERT_FILE = os.path.join(RESOURCES_DIR, 'mock_server.crt')
+KEY_FILE = os.path.join(RESOURCES_DIR, 'mock_server.key')
+
+POLICY_PREFIX = '/policy/api/v1'
+FABRIC_PREFIX = '/api/v1/fabric/'
+SESSION_CREATE_PATH = '/api/session/create'
+SESSION_DESTROY_PATH = '/api/session/destroy'
+SESSION_COOKIE = 'JSESSIONID'
+
+STATE_IN_PROGRESS = 'in_progress'
+STATE_SUCCESS = 'success'
+
+# Requests use these bundles instead of the `verify` option of the session
+CA_BUNDLE_VARIABLES = ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE')
+
+# Query params that are not used to filter list results
+LIST_PARAMS = (
+    'cursor',
+    'included_fields',
+    'page_size',
+    'sort_ascending',
+    'sort_by',
+)
+
+# Field name of child resources of hierarchical api mapped to the
+# collection that store them
+HIERARCHICAL_COLLECTIONS = {
+    'Segment': 'segments',
+    'Tier1': 'tier-1s',
+    'DhcpServerConfig': 'dhcp-server-configs',
+    'DhcpStaticBindingConfig': 'dhcp-static-binding-configs',
+}
+
+
+class MockResponse(Exception):
+    """
+    Raised by handlers in order to return a response right away
+    """
+    def __init__(self, status, body=None, headers=None):
+        super(MockResponse, self).__init__(status)
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+
+class InjectedError(object):
+    def __init__(self, method, path, status, count, headers, body):
+        self.method = method
+        self.path = re.compile(path)
+        self.status = status
+        self.count = count
+        self.headers = headers or {}
+        self.body = body
+
+    def matches(self, method, path):
+        if self.count == 0:
+            return False
+        if self.method and self.method != method:
+            return False
+        return bool(self.path.search(path))
+
+
+def _error_body(status, message):
+    return {
+        'httpStatus': str(status),
+        'error_code': status,
+        'module_name': 'mock-nsx-t',
+        'error_message': message
+    }
+
+
+def _revision_conflict_body():
+    return {
+        'httpStatus': 'PRECONDITION_FAILED',
+        'error_code': 604,
+        'module_name': 'common-services',
+        'error_message': 'The object was modified by somebody else'
+    }
+
+
+def _project(obj, included_fields):
+    if not included_fields:
+        return obj
+    fields = set(included_fields.split(','))
+    return dict(
+        (key, value) for key, value in obj.items() if key in fields
+    )
+
+
+@contextmanager
+def without_ca_bundle():
+    """
+    Unset the CA bundle environment variables so that the self signed
+    certificate of the server is accepted by the client
+    """
+    saved = dict(
+        (name, os.environ.pop(name))
+        for name in CA_BUNDLE_VARIABLES if name in os.environ
+    )
+    try:
+        yield
+    finally:
+        os.environ.update(saved)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    # Keep the connections alive in order to behave like the manager
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(body.decode('utf-8'))
+        return parse_qs(body.decode('utf-8'))
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode('utf-8') \
+            if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self):
+        mock_server = self.server.mock_server
+        parsed_url = urlparse(self.path)
+        params = dict(
+            (key, values[-1])
+            for key, values in parse_qs(parsed_url.query).items()
+        )
+        try:
+            body = self._read_body()
+            status, result, headers = mock_server.handle(
+                self.command,
+                parsed_url.path,
+                params,
+                body,
+                self.headers
+            )
+        except MockResponse as response:
+            status, result, headers = \
+                response.status, response.body, response.headers
+        except Exception as error:
+            status, result, headers = 500, _error_body(500, str(error)), None
+        self._send(status, result, headers)
+
+    do_GET = _handle
+    do_PUT = _handle
+    do_POST = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
+
+
+class MockNSXTServer(object):
+    """
+    In memory NSX-T Manager serving the policy infra resources, their
+    realization states, the fabric inventory and the session api
+    :param latency: Seconds to wait before handling each request
+    :param page_size: Default number of results of list apis
+    :param realization_delay: Seconds before resources are realized
+    :param require_auth: Reject requests without valid credentials
+    """
+    def __init__(self,
+                 host='127.0.0.1',
+                 port=0,
+                 latency=0,
+                 page_size=1000,
+                 realization_delay=0,
+                 username='admin',
+                 password='admin',
+                 require_auth=True):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.page_size = page_size
+        self.realization_delay = realization_delay
+        self.username = username
+        self.password = password
+        self.require_auth = require_auth
+        self.requests = Counter()
+        self._lock = threading.RLock()
+        self._collections = {}
+        self._realized_at = {}
+        self._sessions = set()
+        self._errors = []
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._httpd = _ThreadingHTTPServer((self.host, self.port),
+                                           _MockRequestHandler)
+        self._httpd.mock_server = self
+        context = ssl.SSLContext(
+            getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23)
+        )
+        context.load_cert_chain(CERT_FILE, KEY_FILE)
+        self._httpd.socket = context.wrap_socket(
+            self._httpd.socket, server_side=True
+        )
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def client_config(self, auth_type='basic', **kwargs):
+        config = {
+            'host': self.host,
+            'port': self.port,
+            'username': self.username,
+            'password': self.password,
+            'auth_type': auth_type,
+            # `insecure` is used as the `verify` option of the requests
+            # session and the certificate of the server is self signed
+            'insecure': False,
+        }
+        config.update(kwargs)
+        return config
+
+    def inject_error(self,
+                     status,
+                     path='',
+                     method=None,
+                     count=1,
+                     headers=None,
+                     body=None):
+        """
+        Return an error for the next requests matching the method & path
+        :param status: HTTP status code of the error
+        :param path: Regex that is searched in the path of the request
+        :param method: HTTP method, default to all methods
+        :param count: Number of requests to fail, -1 to fail all of them
+        :param headers: Extra response headers, i.e Retry-After
+        :param body: Response body, default to NSX-T error body
+        """
+        with self._lock:
+            self._errors.append(
+                InjectedError(method, path, status, count, headers, body)
+            )
+
+    def reset(self):
+        """
+        Remove all resources, sessions, injected errors and counters
+        """
+        with self._lock:
+            self.requests.clear()
+            self._collections.clear()
+            self._realized_at.clear()
+            self._sessions.clear()
+            self._errors = []
+
+    def clear_errors(self):
+        with self._lock:
+            self._errors = []
+
+    def expire_sessions(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def add_resource(self, collection, resource):
+        """
+        Store resource in collection without going through the api, i.e
+        ('/api/v1/fabric/virtual-machines', {...})
+        """
+        with self._lock:
+            self._collections.setdefault(
+                collection, OrderedDict()
+            )[resource['id']] = resource
+
+    def get_resource(self, path):
+        collection, _, resource_id = path.rpartition('/')
+        with self._lock:
+            return self._collections.get(collection, {}).get(resource_id)
+
+    def list_resources(self, collection):
+        with self._lock:
+            return list(self._collections.get(collection, {}).values())
+
+    def handle(self, method, path, params, body, headers):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests[method] += 1
+            for error in self._errors:
+                if error.matches(method, path):
+                    error.count -= 1
+                    raise MockResponse(
+                        error.status,
+                        error.body or _error_body(
+                            error.status, 'Injected error'),
+                        error.headers
+                    )
+
+        if path == SESSION_CREATE_PATH:
+            return self._create_session(body)
+        self._authenticate(headers)
+        if path == SESSION_DESTROY_PATH:
+            return self._destroy_session(headers)
+        if path.startswith(POLICY_PREFIX):
+            return self._handle_policy(
+                method, path[len(POLICY_PREFIX):], params, body
+            )
+        if path.startswith(FABRIC_PREFIX) and method == 'GET':
+            return self._list(path, params)
+        raise MockResponse(404, _error_body(404, 'Unknown api'))
+
+    def _create_session(self, body):
+        body = body or {}
+        if body.get('j_username') != [self.username] or \
+                body.get('j_password') != [self.password]:
+            raise MockResponse(403, _error_body(403, 'Bad credentials'))
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions.add(session_id)
+        return 200, None, {
+            'Set-Cookie': '{0}={1}; Path=/; Secure; HttpOnly'.format(
+                SESSION_COOKIE, session_id),
+            'X-XSRF-TOKEN': uuid.uuid4().hex
+        }
+
+    @staticmethod
+    def _get_session_id(headers):
+        cookie = headers.get('Cookie') or ''
+        match = re.search(r'{0}=([^;\s]+)'.format(SESSION_COOKIE), cookie)
+        return match.group(1) if match else None
+
+    def _destroy_session(self, headers):
+        with self._lock:
+            self._sessions.discard(self._get_session_id(headers))
+        return 200, None, None
+
+    def _authenticate(self, headers):
+        if not self.require_auth:
+            return
+        authorization = headers.get('Authorization') or ''
+        if authorization.startswith('Basic '):
+            credentials = base64.b64decode(
+                authorization[len('Basic '):].encode('utf-8')
+            ).decode('utf-8')
+            if credentials == '{0}:{1}'.format(self.username,
+                                               self.password):
+                return
+        with self._lock:
+            if self._get_session_id(headers) in self._sessions:
+                return
+        raise MockResponse(401, _error_body(401, 'Not authenticated'))
+
+    def _handle_policy(self, method, path, params, body):
+        if path == '/infra' and method == 'PATCH':
+            with self._lock:
+                for child in (body or {}).get('children') or []:
+                    self._apply_child('/infra', child)
+            return 200, None, None
+
+        if path.endswith('/state') and method == 'GET':
+            return self._get_state(path[:-len('/state')])
+
+        parts = path.strip('/').split('/')
+        # Collections paths have even number of parts, i.e /infra/segments
+        if len(parts) % 2 == 0:
+            if method == 'GET':
+                return self._list(path, params)
+            raise MockResponse(405, _error_body(405, 'Not allowed'))
+
+        if method == 'GET':
+            resource = self.get_resource(path)
+            if resource is None:
+                raise MockResponse(404, _error_body(404, 'Not found'))
+            return 200, resource, None
+        elif method in ('PUT', 'PATCH'):
+            with self._lock:
+                resource = self._store(path, body or {}, method == 'PATCH')
+            return 200, resource if method == 'PUT' else None, None
+        elif method == 'DELETE':
+            with self._lock:
+                self._delete(path)
+            return 200, None, None
+        raise MockResponse(405, _error_body(405, 'Not allowed'))
+
+    def _store(self, path, config, merge=False):
+        collection, _, resource_id = path.rpartition('/')
+        resources = self._collections.setdefault(collection, OrderedDict())
+        resource = resources.get(resource_id)
+        # Writes with outdated revision are rejected like the manager does
+        revision = config.get('_revision')
+        if resource is not None and revision is not None \
+                and revision != resource['_revision']:
+            raise MockResponse(412, _revision_conflict_body())
+        if resource is not None and merge:
+            resource = dict(resource)
+            resource.update(config)
+        else:
+            resource = dict(config)
+        resource.pop('children', None)
+        resource.update({
+            'id': resource_id,
+            'path': path,
+            'parent_path': collection.rpartition('/')[0],
+            'relative_path': resource_id,
+            'marked_for_delete': False,
+            '_revision': (resources[resource_id]['_revision'] + 1
+                          if resource_id in resources else 0),
+        })
+        resource.setdefault('display_name', resource_id)
+        if collection.endswith('/segments'):
+            resource.setdefault('unique_id', str(uuid.uuid4()))
+        resources[resource_id] = resource
+        self._realized_at[path] = time.time() + self.realization_delay
+        return resource
+
+    def _delete(self, path):
+        collection, _, resource_id = path.rpartition('/')
+        self._collections.get(collection, {}).pop(resource_id, None)
+        self._realized_at.pop(path, None)
+        # Remove the children of the resource as well
+        prefix = path + '/'
+        for child_collection in list(self._collections.keys()):
+            if child_collection.startswith(prefix):
+                del self._collections[child_collection]
+
+    def _apply_child(self, parent_path, child):
+        for field, collection in HIERARCHICAL_COLLECTIONS.items():
+            config = child.get(field)
+            if config is not None:
+                break
+        else:
+            raise MockResponse(
+                400,
+                _error_body(400, 'Unknown child {0}'.format(
+                    child.get('resource_type')))
+            )
+        path = '{0}/{1}/{2}'.format(parent_path, collection, config['id'])
+        if child.get('marked_for_delete'):
+            self._delete(path)
+            return
+        self._store(path, config, merge=True)
+        for nested_child in config.get('children') or []:
+            self._apply_child(path, nested_child)
+
+    def _get_state(self, path):
+        # The state api of static bindings uses different collection name
+        path = path.replace(
+            '/dhcp-static-bindings/', '/dhcp-static-binding-configs/'
+        )
+        if self.get_resource(path) is None:
+            raise MockResponse(404, _error_body(404, 'Not found'))
+        realized_at = self._realized_at.get(path, 0)
+        state = STATE_SUCCESS \
+            if time.time() >= realized_at else STATE_IN_PROGRESS
+        if '/tier-1s/' in path:
+            return 200, {'tier1_state': {'state': state}}, None
+        return 200, {'state': state}, None
+
+    def _list(self, collection, params):
+        offset = int(params.get('cursor') or 0)
+        page_size = int(params.get('page_size') or self.page_size)
+        filters = dict(
+            (key, value) for key, value in params.items()
+            if key not in LIST_PARAMS
+        )
+        resources = [
+            resource for resource in self.list_resources(collection)
+            if all(
+                str(resource.get(key)) == value
+                for key, value in filters.items()
+            )
+        ]
+        page = resources[offset:offset + page_size]
+        result = {
+            'results': [
+                _project(resource, params.get('included_fields'))
+                for resource in page
+            ],
+            'result_count': len(resources)
+        }
+        if offset + page_size < len(resources):
+            result['cursor'] = str(offset + page_size)
+        return 200, result, None
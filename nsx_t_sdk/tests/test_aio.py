@@ -0,0 +1,395 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import warnings
+
+# Third parties imports
+import mock
+from com.vmware.vapi.std.errors_client import NotFound, ServiceUnavailable
+
+# Local imports
+from nsx_t_sdk import metrics
+from nsx_t_sdk.exceptions import MethodNotAllowed, NSXTSDKException
+from nsx_t_sdk.ratelimit import clear_rate_limiters
+from nsx_t_sdk.resources import (
+    DhcpV4StaticBindingConfig,
+    Segment,
+    SegmentPort,
+    SegmentState,
+    Tier1,
+    VirtualMachine,
+    VirtualNetworkInterface
+)
+from nsx_t_sdk.tests.mock_server import MockNSXTServer, without_ca_bundle
+
+try:
+    import asyncio
+    from nsx_t_sdk import aio
+except (ImportError, SyntaxError):
+    # The async client is python 3 only
+    aio = None
+
+
+@unittest.skipIf(aio is None or aio.aiohttp is None,
+                 'The async client requires python 3 & aiohttp')
+class AsyncNSXTClientTestCase(unittest.TestCase):
+    """
+    Run the async resources against the local mock server over HTTPS
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(AsyncNSXTClientTestCase, cls).setUpClass()
+        cls._environ = without_ca_bundle()
+        cls._environ.__enter__()
+        cls.server = MockNSXTServer(page_size=2)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls._environ.__exit__(None, None, None)
+        super(AsyncNSXTClientTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        super(AsyncNSXTClientTestCase, self).setUp()
+        self.server.reset()
+        self.server.latency = 0
+        self.logger = mock.MagicMock()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(self.loop.close)
+        self.addCleanup(asyncio.set_event_loop, None)
+        # The certificate of the server is self signed
+        warnings.simplefilter('ignore')
+        self.addCleanup(warnings.resetwarnings)
+
+    def _client(self, auth_type='basic', max_concurrency=4, **client_config):
+        client = aio.AsyncNSXTClient(
+            self.server.client_config(auth_type=auth_type, **client_config),
+            self.logger,
+            max_concurrency=max_concurrency
+        )
+        self._run(client.open())
+        self.addCleanup(self._run, client.close())
+        return client
+
+    def _run(self, *coroutines):
+        if len(coroutines) == 1:
+            return self.loop.run_until_complete(coroutines[0])
+        return self.loop.run_until_complete(
+            asyncio.gather(*coroutines)
+        )
+
+    def _result(self, value):
+        future = self.loop.create_future()
+        future.set_result(value)
+        return future
+
+    def _iterate(self, async_iterator):
+        results = []
+        while True:
+            try:
+                results.append(self._run(async_iterator.__anext__()))
+            except StopAsyncIteration:  # noqa: F821 python 3 only
+                return results
+
+    def test_async_resource_class(self):
+        client = self._client()
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        self.assertIsInstance(segment, aio.AsyncNSXTResource)
+        self.assertIsInstance(segment, Segment)
+        self.assertIs(type(client.resource(Segment)), type(segment))
+        self.assertEqual(segment.resource_id, 'segment-1')
+        self.assertEqual(segment.resource_config['resource_type'], 'Segment')
+        self.assertIsInstance(
+            client.resource(VirtualMachine), aio.AsyncVirtualMachine
+        )
+
+    def test_rest_request(self):
+        port = aio.get_rest_resource(SegmentPort)
+        request = aio.RestRequest(port, 'get', ('segment 1', 'port-1'), {})
+        self.assertEqual(request.method, 'GET')
+        self.assertEqual(
+            request.path,
+            '/policy/api/v1/infra/segments/segment%201/ports/port-1'
+        )
+        request = aio.RestRequest(port, 'list', (), {
+            'segment_id': 'segment-1',
+            'cursor': None,
+            'sort_ascending': True,
+            'page_size': 10
+        })
+        self.assertEqual(
+            request.path, '/policy/api/v1/infra/segments/segment-1/ports'
+        )
+        self.assertEqual(
+            request.params, {'sort_ascending': 'true', 'page_size': '10'}
+        )
+        request = aio.RestRequest(
+            aio.get_rest_resource(DhcpV4StaticBindingConfig),
+            'patch',
+            ('segment-1', 'binding-1', {'ip_address': '10.0.0.2'}),
+            {}
+        )
+        self.assertEqual(request.method, 'PATCH')
+        self.assertEqual(
+            request.path,
+            '/policy/api/v1/infra/segments/segment-1'
+            '/dhcp-static-binding-configs/binding-1'
+        )
+        self.assertEqual(request.body, '{"ip_address":"10.0.0.2"}')
+        with self.assertRaises(NSXTSDKException):
+            aio.get_rest_resource(SegmentState)
+
+    def test_create_get_and_delete_segment(self):
+        client = self._client()
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        created = self._run(segment.create())
+        self.assertEqual(created.id, 'segment-1')
+        self.assertEqual(created.path, '/infra/segments/segment-1')
+        self.assertEqual(
+            self._run(segment.get())['display_name'], 'segment-1'
+        )
+        self.assertEqual(
+            self._run(segment.get(fields=['id', 'path'])),
+            {'id': 'segment-1', 'path': '/infra/segments/segment-1'}
+        )
+        self._run(segment.delete('segment-1'))
+        with self.assertRaises(NotFound):
+            self._run(segment.get())
+
+    def test_update_merge_concurrent_changes(self):
+        client = self._client()
+        tier1 = client.resource(Tier1, {'id': 'tier1-1'})
+        self._run(tier1.create())
+        outdated = self._run(tier1.get(to_dict=False))
+        self._run(tier1.patch_fields({'description': 'updated'}))
+
+        def set_paths(obj):
+            obj.dhcp_config_paths = ['/infra/dhcp-1']
+            return obj
+
+        self._run(
+            tier1.update('tier1-1', set_paths(outdated), merge=set_paths)
+        )
+        resource = self.server.get_resource('/infra/tier-1s/tier1-1')
+        self.assertEqual(resource['description'], 'updated')
+        self.assertEqual(resource['dhcp_config_paths'], ['/infra/dhcp-1'])
+
+    def test_patch_delta_merge_concurrent_changes(self):
+        client = self._client()
+        tier1 = client.resource(Tier1, {'id': 'tier1-1'})
+        self._run(tier1.create())
+        # When both patches read the same revision, one of them is computed
+        # again from the latest version
+        self._run(
+            tier1.patch_delta({'description': 'updated'}),
+            tier1.patch_delta({'dhcp_config_paths': ['/infra/dhcp-1']})
+        )
+        resource = self.server.get_resource('/infra/tier-1s/tier1-1')
+        self.assertEqual(resource['description'], 'updated')
+        self.assertEqual(resource['dhcp_config_paths'], ['/infra/dhcp-1'])
+
+    def test_list_and_iter_list(self):
+        client = self._client()
+        # Created one at a time so that they are listed in order
+        for i in range(5):
+            self._run(
+                client.resource(
+                    Segment, {'id': 'segment-{0}'.format(i)}
+                ).create()
+            )
+        segment = client.resource(Segment)
+        self.assertEqual(len(self._run(segment.list())), 2)
+        for prefetch in (False, True):
+            requests_before = self.server.requests['GET']
+            ids = [
+                item['id'] for item in self._iterate(
+                    segment.iter_list(fields=['id'], prefetch=prefetch)
+                )
+            ]
+            self.assertEqual(
+                ids, ['segment-{0}'.format(i) for i in range(5)]
+            )
+            # 5 segments with page size of 2
+            self.assertEqual(self.server.requests['GET'] - requests_before, 3)
+
+    def test_list_with_filters(self):
+        for index in range(3):
+            self.server.add_resource('/api/v1/fabric/vifs', {
+                'id': 'vif-{0}'.format(index),
+                'owner_vm_id': 'vm-{0}'.format(index % 2),
+                'resource_type': 'VirtualNetworkInterface'
+            })
+        vif = self._client().resource(VirtualNetworkInterface)
+        results = self._run(vif.list(filters={'owner_vm_id': 'vm-0'}))
+        self.assertEqual(
+            [result['id'] for result in results], ['vif-0', 'vif-2']
+        )
+
+    def test_iter_list_stop_on_repeated_cursor(self):
+        segment = self._client().resource(Segment)
+        page = mock.Mock(results=[{'id': 'segment-1'}], cursor='0001')
+        with mock.patch.object(segment, '_list_page',
+                               side_effect=lambda **_: self._result(page)):
+            self.assertEqual(
+                self._iterate(segment.iter_list(fields=['id'])),
+                [{'id': 'segment-1'}]
+            )
+
+    def test_iter_list_last_page_with_repeated_cursor(self):
+        segment = self._client().resource(Segment)
+        pages = iter([
+            mock.Mock(results=[{'id': 'segment-1'}], cursor='0001'),
+            mock.Mock(results=[{'id': 'segment-2'}], cursor='0001')
+        ])
+        with mock.patch.object(segment, '_list_page',
+                               side_effect=lambda **_: self._result(
+                                   next(pages))):
+            self.assertEqual(
+                self._iterate(segment.iter_list(fields=['id'])),
+                [{'id': 'segment-1'}, {'id': 'segment-2'}]
+            )
+
+    def test_virtual_machine_lookups(self):
+        self.server.add_resource('/api/v1/fabric/virtual-machines', {
+            'id': 'vm-1',
+            'display_name': 'vm',
+            'external_id': 'vm-1',
+            'resource_type': 'VirtualMachine'
+        })
+        self.server.add_resource('/api/v1/fabric/vifs', {
+            'id': 'vif-1',
+            'owner_vm_id': 'vm-1',
+            'lport_attachment_id': 'attachment-1',
+            'resource_type': 'VirtualNetworkInterface'
+        })
+        self.server.add_resource('/infra/segments/segment-1/ports', {
+            'id': 'port-1',
+            'attachment': {'id': 'attachment-1'},
+            'resource_type': 'Port'
+        })
+        client = self._client()
+        vm = client.resource(VirtualMachine, {'vm_name': 'vm'})
+        self.assertEqual(self._run(vm.get())['external_id'], 'vm-1')
+        self.assertEqual(vm.resource_id, 'vm-1')
+        with self.assertRaises(NSXTSDKException):
+            self._run(
+                client.resource(VirtualMachine, {'vm_name': 'other'}).get()
+            )
+        vifs = self._run(
+            client.resource(VirtualNetworkInterface).lookup(
+                owner_vm_id='vm-1')
+        )
+        self.assertEqual([vif['id'] for vif in vifs], ['vif-1'])
+        ports = self._run(
+            client.resource(SegmentPort).get_attachment_index('segment-1')
+        )
+        self.assertEqual(list(ports), ['attachment-1'])
+
+    def test_not_allowed_method(self):
+        port = self._client().resource(SegmentPort)
+        with self.assertRaises(MethodNotAllowed):
+            self._run(port.update('segment-1', 'port-1', {}))
+
+    def test_concurrency_is_bounded(self):
+        client = self._client(max_concurrency=2)
+        self._run(client.resource(Segment, {'id': 'segment-1'}).create())
+        self.server.latency = 0.05
+        start = time.time()
+        results = self._run(*[
+            client.resource(Segment, {'id': 'segment-1'}).get()
+            for _ in range(8)
+        ])
+        # 8 calls with 2 of them at a time
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        self.assertEqual(len(results), 8)
+
+    def test_session_auth(self):
+        client = self._client(auth_type='session')
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        self._run(*[segment.create() for _ in range(4)])
+        # Only one login for all the calls
+        self.assertEqual(self.server.requests['POST'], 1)
+        self.server.expire_sessions()
+        self.assertEqual(self._run(segment.get())['id'], 'segment-1')
+        self.assertEqual(self.server.requests['POST'], 2)
+
+    def test_retry_and_metrics(self):
+        # The delay requested by the manager is capped by the max delay
+        client = self._client(max_retries=2, retry_max_delay=0.01)
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        self.server.inject_error(429, path='/segments/', method='PUT',
+                                 count=2, headers={'Retry-After': '3'})
+        with metrics.collect() as collector:
+            self._run(segment.create())
+            self.server.inject_error(503, path='/segments/', method='GET',
+                                     count=3)
+            with self.assertRaises(ServiceUnavailable):
+                self._run(segment.get())
+        summary = collector.summary()
+        self.assertEqual(summary['Segment.update']['retries'], 2)
+        self.assertEqual(summary['Segment.update']['retry_delay'], 0.02)
+        self.assertEqual(summary['Segment.update']['statuses'], {'200': 1})
+        self.assertGreater(summary['Segment.update']['response_size'], 0)
+        self.assertEqual(summary['Segment.get']['retries'], 2)
+        self.assertEqual(
+            summary['Segment.get']['errors'], {'ServiceUnavailable': 1}
+        )
+
+    def test_rate_limit(self):
+        self.addCleanup(clear_rate_limiters)
+        client = self._client(rate_limit=50, rate_limit_burst=1)
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        self._run(segment.create())
+        with metrics.collect() as collector:
+            self._run(*[segment.get() for _ in range(5)])
+        self.assertGreater(
+            collector.summary()['Segment.get']['rate_limit_delay'], 0
+        )
+
+    def test_shared_rate_limit(self):
+        self.addCleanup(clear_rate_limiters)
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        client = self._client(
+            rate_limit=50, rate_limit_burst=1, rate_limit_shared=True
+        )
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        self._run(segment.create())
+        with mock.patch.dict(os.environ, {'AGENT_WORK_DIR': tmp_dir}), \
+                mock.patch.object(self.loop, 'run_in_executor',
+                                  wraps=self.loop.run_in_executor) \
+                as executor_mock:
+            clear_rate_limiters()
+            with metrics.collect() as collector:
+                self._run(*[segment.get() for _ in range(5)])
+        # The file lock of the shared bucket is not taken in the event loop
+        self.assertGreaterEqual(executor_mock.call_count, 5)
+        self.assertGreater(
+            collector.summary()['Segment.get']['rate_limit_delay'], 0
+        )
+
+    def test_closed_client(self):
+        client = aio.AsyncNSXTClient(self.server.client_config(), self.logger)
+        segment = client.resource(Segment, {'id': 'segment-1'})
+        with self.assertRaises(NSXTSDKException):
+            self._run(segment.get())
@@ -0,0 +1,96 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import threading
+import unittest
+
+# Local imports
+from nsx_t_sdk.executor import BoundedExecutor
+from nsx_t_sdk.exceptions import NSXTSDKException, ConcurrentTaskError
+
+
+class BoundedExecutorTestCase(unittest.TestCase):
+
+    def test_run_return_results_in_submit_order(self):
+        executor = BoundedExecutor(max_workers=2)
+        for index in range(5):
+            executor.submit(index, lambda value: value * 2, index)
+        results = executor.run()
+        self.assertEqual(list(results.keys()), [0, 1, 2, 3, 4])
+        self.assertEqual(list(results.values()), [0, 2, 4, 6, 8])
+        self.assertEqual(len(executor), 0)
+
+    def test_run_tasks_concurrently(self):
+        barrier = threading.Event()
+        started = []
+
+        def _task(name):
+            started.append(name)
+            if len(started) == 2:
+                barrier.set()
+            # Each task wait for the other one to start which only
+            # happen when they run at the same time
+            return barrier.wait(5)
+
+        executor = BoundedExecutor(max_workers=2)
+        executor.submit('v4', _task, 'v4')
+        executor.submit('v6', _task, 'v6')
+        results = executor.run()
+        self.assertTrue(results['v4'])
+        self.assertTrue(results['v6'])
+
+    def test_run_bounded_workers(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def _task():
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            threading.Event().wait(0.01)
+            with lock:
+                running[0] -= 1
+
+        executor = BoundedExecutor(max_workers=3)
+        for index in range(10):
+            executor.submit(index, _task)
+        executor.run()
+        self.assertTrue(max_running[0] <= 3)
+
+    def test_run_aggregate_errors(self):
+        def _fail(message):
+            raise ValueError(message)
+
+        executor = BoundedExecutor()
+        executor.submit('v4', _fail, 'foo')
+        executor.submit('ok', lambda: 'bar')
+        executor.submit('v6', _fail, 'baz')
+        with self.assertRaises(ConcurrentTaskError) as error:
+            executor.run()
+        self.assertEqual(list(error.exception.errors.keys()), ['v4', 'v6'])
+        self.assertEqual(error.exception.results, {'ok': 'bar'})
+        self.assertIn('foo', str(error.exception))
+        self.assertIn('baz', str(error.exception))
+
+    def test_submit_duplicate_task(self):
+        executor = BoundedExecutor()
+        executor.submit('v4', lambda: None)
+        with self.assertRaises(NSXTSDKException):
+            executor.submit('v4', lambda: None)
+
+    def test_run_without_tasks(self):
+        self.assertEqual(BoundedExecutor().run(), {})
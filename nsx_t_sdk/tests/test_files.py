@@ -0,0 +1,78 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.files import get_private_dir, open_private_file
+
+
+class PrivateFilesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(PrivateFilesTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_get_private_dir(self):
+        with mock.patch.dict(os.environ, {'AGENT_WORK_DIR': '/opt/work'}):
+            self.assertEqual(get_private_dir(), '/opt/work')
+        with mock.patch.dict(os.environ, {'AGENT_WORK_DIR': ''}), \
+                mock.patch('nsx_t_sdk.files.tempfile.gettempdir',
+                           return_value='/tmp'), \
+                mock.patch('nsx_t_sdk.files.os.getuid', return_value=1000):
+            self.assertEqual(get_private_dir(), '/tmp/nsx-t-1000')
+
+    def test_open_private_file(self):
+        path = os.path.join(self.tmp_dir, 'nsx-t', 'foo')
+        os.close(open_private_file(path))
+        self.assertEqual(
+            stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode), 0o700
+        )
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        # Existing files are opened again
+        fd = open_private_file(path)
+        os.write(fd, b'foo')
+        os.close(fd)
+        with open(path) as private_file:
+            self.assertEqual(private_file.read(), 'foo')
+
+    def test_open_private_file_symlink(self):
+        target = os.path.join(self.tmp_dir, 'target')
+        open(target, 'w').close()
+        path = os.path.join(self.tmp_dir, 'foo')
+        os.symlink(target, path)
+        with self.assertRaises(OSError):
+            open_private_file(path)
+        directory = os.path.join(self.tmp_dir, 'nsx-t')
+        os.symlink(self.tmp_dir, directory)
+        with self.assertRaises(OSError):
+            open_private_file(os.path.join(directory, 'bar'))
+
+    def test_open_private_file_of_other_user(self):
+        path = os.path.join(self.tmp_dir, 'foo')
+        open(path, 'w').close()
+        with mock.patch('nsx_t_sdk.files.os.getuid',
+                        return_value=os.getuid() + 1):
+            with self.assertRaises(OSError):
+                open_private_file(path)
@@ -0,0 +1,141 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.hierarchical import HierarchicalBatch
+from nsx_t_sdk.resources import (
+    Infra,
+    Segment,
+    SegmentPort,
+    Tier1,
+    DhcpV4StaticBindingConfig
+)
+from nsx_t_sdk.exceptions import MethodNotAllowed, NSXTSDKException
+from nsx_t_sdk.common import ACTION_PATCH
+
+
+@mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+class HierarchicalBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        super(HierarchicalBatchTestCase, self).setUp()
+        self.client_config = {
+            'username': 'foo',
+            'password': 'bar',
+            'host': 'foo-host',
+            'port': '80',
+            'insecure': False,
+            'auth_type': 'basic'
+        }
+        self.logger = mock.MagicMock()
+        self.batch = HierarchicalBatch(self.client_config, self.logger)
+
+    def _resource(self, class_type, resource_config):
+        return class_type(self.client_config, resource_config, self.logger)
+
+    def test_infra_allowed_actions(self, _):
+        infra = self._resource(Infra, {})
+        self.assertEqual(infra.client_type, 'nsx_policy')
+        self.assertEqual(infra.service_name, 'Infra')
+        self.assertTrue(infra.allow_patch)
+        with self.assertRaises(MethodNotAllowed):
+            infra.update({})
+
+    def test_add_resources(self, _):
+        self.batch.add(self._resource(Tier1, {'id': 'tier1'}))
+        self.batch.add(self._resource(Segment, {
+            'id': 'segment', 'display_name': 'Segment'
+        }))
+        self.assertEqual(len(self.batch), 2)
+        self.assertEqual(self.batch.to_dict(), {
+            'resource_type': 'Infra',
+            'children': [
+                {
+                    'resource_type': 'ChildTier1',
+                    'Tier1': {'id': 'tier1', 'resource_type': 'Tier1'}
+                },
+                {
+                    'resource_type': 'ChildSegment',
+                    'Segment': {
+                        'id': 'segment',
+                        'display_name': 'Segment',
+                        'resource_type': 'Segment'
+                    }
+                }
+            ]
+        })
+
+    def test_add_resource_with_parent(self, _):
+        segment = self._resource(Segment, {'id': 'segment'})
+        binding = self._resource(DhcpV4StaticBindingConfig, {
+            'id': 'binding', 'ip_address': '192.168.1.2'
+        })
+        self.batch.add(binding, parent=segment)
+        self.batch.add(segment)
+        self.assertEqual(len(self.batch), 1)
+        self.assertEqual(self.batch.to_dict()['children'], [
+            {
+                'resource_type': 'ChildSegment',
+                'Segment': {
+                    'id': 'segment',
+                    'resource_type': 'Segment',
+                    'children': [
+                        {
+                            'resource_type': 'ChildDhcpStaticBindingConfig',
+                            'DhcpStaticBindingConfig': {
+                                'id': 'binding',
+                                'ip_address': '192.168.1.2',
+                                'resource_type': 'DhcpV4StaticBindingConfig'
+                            }
+                        }
+                    ]
+                }
+            }
+        ])
+
+    def test_delete_resource(self, _):
+        self.batch.delete(self._resource(Tier1, {'id': 'tier1'}))
+        self.assertTrue(
+            self.batch.to_dict()['children'][0]['marked_for_delete']
+        )
+
+    def test_add_invalid_resource(self, _):
+        with self.assertRaises(NSXTSDKException):
+            self.batch.add(self._resource(SegmentPort, {'id': 'port'}))
+        with self.assertRaises(NSXTSDKException):
+            self.batch.add(self._resource(Segment, {}))
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_apply(self, invoke_mock, _):
+        self.batch.add(self._resource(Tier1, {'id': 'tier1'}))
+        self.batch.apply()
+        self.assertEqual(invoke_mock.call_count, 1)
+        action, args = invoke_mock.call_args[0]
+        self.assertEqual(action, ACTION_PATCH)
+        infra_config = args[0]
+        infra_config['children'] = [
+            child.to_dict() for child in infra_config['children']
+        ]
+        self.assertEqual(infra_config, self.batch.to_dict())
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_apply_empty_batch(self, invoke_mock, _):
+        self.batch.apply()
+        self.assertFalse(invoke_mock.called)
@@ -0,0 +1,303 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+
+# Standard Imports
+import os
+import shutil
+import tempfile
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.common import NSXTResource
+from nsx_t_sdk.inventory import (
+    AttachmentIndex,
+    InventoryIndex,
+    index_attachments,
+    get_inventory_cache,
+    clear_inventory_caches
+)
+from nsx_t_sdk.persistent_cache import PersistentCache
+
+
+def _vif(vif_id, owner_vm_id, sync_time=1, **fields):
+    vif = {
+        'external_id': vif_id,
+        'owner_vm_id': owner_vm_id,
+        '_last_sync_time': sync_time
+    }
+    vif.update(fields)
+    return vif
+
+
+class InventoryIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(InventoryIndexTestCase, self).setUp()
+        self.index = InventoryIndex(
+            'external_id', ('owner_vm_id', 'lport_attachment_id'), ttl=60
+        )
+
+    def test_find(self):
+        self.index.sync([
+            _vif('vif-1', 'vm-1', lport_attachment_id='port-1'),
+            _vif('vif-2', 'vm-1'),
+            _vif('vif-3', 'vm-2'),
+        ])
+        self.assertEqual(
+            [vif['external_id']
+             for vif in self.index.find(owner_vm_id='vm-1')],
+            ['vif-1', 'vif-2']
+        )
+        self.assertEqual(
+            self.index.find(owner_vm_id='vm-1', lport_attachment_id='port-1'),
+            [_vif('vif-1', 'vm-1', lport_attachment_id='port-1')]
+        )
+        self.assertEqual(self.index.find(owner_vm_id='vm-3'), [])
+        with self.assertRaises(ValueError):
+            self.index.find(owner_vm_id=None)
+        # The cached objects cannot be changed by the callers
+        self.index.find(owner_vm_id='vm-2')[0]['owner_vm_id'] = 'foo'
+        self.assertEqual(len(self.index.find(owner_vm_id='vm-2')), 1)
+
+    def test_sync_only_index_changed_objects(self):
+        self.assertTrue(self.index.expired)
+        self.assertEqual(
+            self.index.sync([_vif('vif-1', 'vm-1'), _vif('vif-2', 'vm-1')]),
+            (2, 0)
+        )
+        self.assertFalse(self.index.expired)
+        self.assertEqual(
+            self.index.sync([
+                _vif('vif-1', 'vm-1'),
+                _vif('vif-3', 'vm-2'),
+                _vif('vif-4', 'vm-2', sync_time=2)
+            ]),
+            (2, 1)
+        )
+        self.assertEqual(
+            self.index.sync([_vif('vif-3', 'vm-2'),
+                             _vif('vif-4', 'vm-1', sync_time=3)]),
+            (1, 1)
+        )
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(
+            [vif['external_id']
+             for vif in self.index.find(owner_vm_id='vm-1')],
+            ['vif-4']
+        )
+
+    @mock.patch('nsx_t_sdk.inventory.time.time', return_value=100)
+    def test_lookup(self, time_mock):
+        resource = mock.MagicMock()
+        resource.iter_list.return_value = [_vif('vif-1', 'vm-1')]
+        self.assertEqual(
+            self.index.lookup(resource, owner_vm_id='vm-1'),
+            [_vif('vif-1', 'vm-1')]
+        )
+        resource.iter_list.assert_called_once_with(page_size=1000)
+        self.index.lookup(resource, owner_vm_id='vm-1')
+        self.assertEqual(resource.iter_list.call_count, 1)
+
+        # Missing objects are listed with the filters
+        resource.iter_list.return_value = [_vif('vif-2', 'vm-2')]
+        self.assertEqual(
+            self.index.lookup(resource, owner_vm_id='vm-2'),
+            [_vif('vif-2', 'vm-2')]
+        )
+        resource.iter_list.assert_called_with(filters={'owner_vm_id': 'vm-2'})
+
+        # Removed objects are dropped when the objects are listed again
+        resource.iter_list.return_value = []
+        self.assertEqual(
+            self.index.lookup(resource, refresh=True, owner_vm_id='vm-1'), []
+        )
+        self.assertEqual(self.index.find(owner_vm_id='vm-1'), [])
+        self.assertEqual(resource.iter_list.call_count, 3)
+
+        time_mock.return_value += 60
+        self.assertTrue(self.index.expired)
+        self.index.lookup(resource, owner_vm_id='vm-2')
+        resource.iter_list.assert_called_with(page_size=1000)
+        self.assertEqual(len(self.index), 0)
+
+
+def _port(port_id, attachment_id=None):
+    port = {'id': port_id}
+    if attachment_id:
+        port['attachment'] = {'id': attachment_id}
+    return port
+
+
+class AttachmentIndexTestCase(unittest.TestCase):
+
+    def test_index_attachments(self):
+        self.assertEqual(
+            index_attachments([
+                _port('port-1', 'attachment-1'),
+                _port('port-2'),
+                _port('port-3', 'attachment-3')
+            ]),
+            {
+                'attachment-1': _port('port-1', 'attachment-1'),
+                'attachment-3': _port('port-3', 'attachment-3')
+            }
+        )
+
+    @mock.patch('nsx_t_sdk.inventory.time.time', return_value=100)
+    def test_get(self, time_mock):
+        index = AttachmentIndex(ttl=60)
+        resource = mock.MagicMock()
+        resource.iter_attachments.return_value = [
+            _port('port-1', 'attachment-1')
+        ]
+        for _ in range(2):
+            self.assertEqual(list(index.get(resource, 'segment-1')),
+                             ['attachment-1'])
+        resource.iter_attachments.assert_called_once_with('segment-1')
+        # The shared index cannot be changed by the callers
+        index.get(resource, 'segment-1').clear()
+        self.assertEqual(len(index.get(resource, 'segment-1')), 1)
+
+        resource.iter_attachments.return_value = [
+            _port('port-1', 'attachment-1'), _port('port-2', 'attachment-2')
+        ]
+        self.assertEqual(len(index.get(resource, 'segment-2')), 2)
+        self.assertEqual(len(index.get(resource, 'segment-1')), 1)
+        self.assertEqual(
+            len(index.get(resource, 'segment-1', refresh=True)), 2
+        )
+        self.assertEqual(resource.iter_attachments.call_count, 3)
+        time_mock.return_value += 60
+        index.get(resource, 'segment-2')
+        self.assertEqual(resource.iter_attachments.call_count, 4)
+
+    def test_get_from_store(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        store = PersistentCache(os.path.join(tmp_dir, 'cache.sqlite'))
+        resource = mock.MagicMock()
+        resource.iter_attachments.return_value = []
+        # Each index stand for another operation process
+        for _ in range(2):
+            self.assertEqual(
+                AttachmentIndex(60, store, 'ports').get(resource, 'segment-1'),
+                {}
+            )
+        resource.iter_attachments.return_value = [
+            _port('port-1', 'attachment-1')
+        ]
+        for _ in range(2):
+            self.assertEqual(
+                len(AttachmentIndex(60, store, 'ports').get(resource,
+                                                            'segment-1')),
+                1
+            )
+        self.assertEqual(resource.iter_attachments.call_count, 3)
+        AttachmentIndex(60, store, 'ports').get(
+            resource, 'segment-1', refresh=True
+        )
+        self.assertEqual(resource.iter_attachments.call_count, 4)
+
+
+class InventoryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(InventoryCacheTestCase, self).setUp()
+        clear_inventory_caches()
+        self.addCleanup(clear_inventory_caches)
+
+    def test_get_inventory_cache(self):
+        self.assertIsNone(get_inventory_cache(('foo', 443), None))
+        cache = get_inventory_cache(('foo', 443), 60)
+        self.assertIs(get_inventory_cache(('foo', 443), 60), cache)
+        self.assertIsNot(get_inventory_cache(('bar', 443), 60), cache)
+        updated = get_inventory_cache(('foo', 443), 30)
+        self.assertIsNot(updated, cache)
+        self.assertEqual(updated.vifs.ttl, 30)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_resource_inventory_cache(self, _):
+        def _resource(**client_config):
+            client_config.update(host='foo', port=443, auth_type='basic')
+            return NSXTResource(client_config, {}, mock.MagicMock())
+        self.assertIsNone(_resource().inventory_cache)
+        cache = _resource(inventory_cache_ttl=60).inventory_cache
+        self.assertIs(_resource(inventory_cache_ttl=60).inventory_cache, cache)
+        self.assertIsNot(
+            _resource(inventory_cache_ttl=60, username='bar').inventory_cache,
+            cache
+        )
+
+
+class PersistentInventoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(PersistentInventoryTestCase, self).setUp()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.store = PersistentCache(os.path.join(tmp_dir, 'cache.sqlite'))
+        self.resource = mock.MagicMock()
+
+    def _index(self):
+        # Each index stand for another operation process
+        return InventoryIndex(
+            'external_id', ('owner_vm_id',), ttl=60,
+            store=self.store, namespace='manager-1/vifs'
+        )
+
+    def test_snapshot_is_shared(self):
+        self.resource.iter_list.return_value = [_vif('vif-1', 'vm-1')]
+        first = self._index()
+        self.assertEqual(len(first.lookup(self.resource, owner_vm_id='vm-1')),
+                         1)
+        second = self._index()
+        self.assertEqual(
+            second.lookup(self.resource, owner_vm_id='vm-1'),
+            [_vif('vif-1', 'vm-1')]
+        )
+        self.assertEqual(second.synced_at, first.synced_at)
+        self.resource.iter_list.assert_called_once_with(page_size=1000)
+
+    def test_listed_objects_are_shared(self):
+        self.resource.iter_list.return_value = []
+        self._index().lookup(self.resource, owner_vm_id='vm-1')
+        self.resource.iter_list.return_value = [_vif('vif-1', 'vm-1')]
+        # The object missing from the shared snapshot is listed once
+        for _ in range(2):
+            self.assertEqual(
+                len(self._index().lookup(self.resource, owner_vm_id='vm-1')),
+                1
+            )
+        self.assertEqual(self.resource.iter_list.call_count, 2)
+        self.resource.iter_list.assert_called_with(
+            filters={'owner_vm_id': 'vm-1'}
+        )
+        # Refreshed objects are not taken from the store
+        self._index().lookup(self.resource, refresh=True, owner_vm_id='vm-1')
+        self.assertEqual(self.resource.iter_list.call_count, 3)
+
+    def test_missing_objects_are_not_stored(self):
+        self.resource.iter_list.return_value = [_vif('vif-1', 'vm-1')]
+        self._index().lookup(self.resource, owner_vm_id='vm-1')
+        self.resource.iter_list.return_value = []
+        for _ in range(2):
+            self.assertEqual(
+                self._index().lookup(self.resource, owner_vm_id='vm-2'), []
+            )
+        self.assertEqual(self.resource.iter_list.call_count, 3)
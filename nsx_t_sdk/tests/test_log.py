@@ -0,0 +1,114 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import logging
+import unittest
+
+# Third parties imports
+import mock
+from com.vmware.nsx_policy.model_client import Segment, SegmentListResult
+
+# Local imports
+from nsx_t_sdk.common import NSXTResource
+from nsx_t_sdk.log import is_debug_enabled, preview
+
+
+class PreviewTestCase(unittest.TestCase):
+
+    def _list_result(self, count):
+        return SegmentListResult(
+            results=[Segment(id='segment-{0}'.format(index))
+                     for index in range(count)],
+            result_count=count,
+            cursor='cursor'
+        )
+
+    def test_preview_short_value(self):
+        self.assertEqual(preview('foo'), 'foo')
+        self.assertEqual(preview(('foo', 'bar')), '(foo, bar)')
+        self.assertEqual(preview(['foo']), '[foo]')
+
+    def test_preview_truncate_value(self):
+        self.assertEqual(
+            preview('a' * 20, max_length=5), 'aaaaa... (15 more characters)'
+        )
+
+    def test_preview_list_result(self):
+        text = preview(self._list_result(1000), max_length=200)
+        self.assertTrue(text.startswith(
+            'SegmentListResult(result_count=1000, cursor=cursor, results=['
+        ))
+        self.assertIn('more items', text)
+        self.assertLess(len(text), 500)
+
+    def test_preview_nested_list_result(self):
+        text = preview(('foo', self._list_result(1000)), max_length=200)
+        self.assertLess(len(text), 500)
+
+    def test_preview_whole_value(self):
+        result = self._list_result(100)
+        self.assertEqual(preview(result, max_length=None), str(result))
+
+    def test_is_debug_enabled(self):
+        logger = logging.getLogger('nsx_t_sdk.tests.log')
+        logger.setLevel(logging.INFO)
+        self.assertFalse(is_debug_enabled(logger))
+        logger.setLevel(logging.DEBUG)
+        self.assertTrue(is_debug_enabled(logger))
+        self.assertTrue(is_debug_enabled(object()))
+
+
+@mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+class InvokeLogTestCase(unittest.TestCase):
+
+    def _resource(self, logger, **client_config):
+        client_config['auth_type'] = 'basic'
+        resource = NSXTResource(
+            client_config=client_config,
+            resource_config={'id': 'foo'},
+            logger=logger
+        )
+        resource.resource_type = 'Segment'
+        resource.service_name = 'segments'
+        resource._api_client = mock.MagicMock()
+        return resource
+
+    def test_invoke_without_debug(self, _):
+        logger = mock.Mock()
+        logger.isEnabledFor.return_value = False
+        resource = self._resource(logger)
+        result = mock.MagicMock()
+        resource._api_client.segments.list.return_value = result
+        resource._invoke('list')
+        self.assertFalse(logger.debug.called)
+        self.assertFalse(result.__str__.called)
+
+    def test_invoke_truncate_result(self, _):
+        logger = mock.Mock()
+        resource = self._resource(logger)
+        resource._api_client.segments.get.return_value = 'a' * 5000
+        resource._invoke('get', ('foo',))
+        message = logger.debug.call_args[0][0]
+        self.assertIn('... (3976 more characters)', message)
+
+    def test_invoke_with_wire_trace(self, _):
+        logger = mock.Mock()
+        resource = self._resource(logger, wire_trace=True)
+        resource._api_client.segments.get.return_value = 'a' * 5000
+        resource._invoke('get', ('foo',))
+        message = logger.debug.call_args[0][0]
+        self.assertIn('a' * 5000, message)
+        self.assertNotIn('more characters', message)
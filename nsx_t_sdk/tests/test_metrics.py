@@ -0,0 +1,193 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# Third parties imports
+import mock
+from com.vmware.vapi.std.errors_client import NotFound, Unauthenticated
+
+# Local imports
+from nsx_t_sdk import metrics
+from nsx_t_sdk.common import NSXTResource, _PageFetcher
+from nsx_t_sdk.executor import BoundedExecutor
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_percentiles(self):
+        histogram = metrics.Histogram()
+        for value in [0.001] * 90 + [0.2] * 9 + [3]:
+            histogram.add(value)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.min, 0.001)
+        self.assertEqual(histogram.max, 3)
+        # Percentiles are the upper bounds of the buckets capped by the max
+        self.assertEqual(histogram.percentile(50), 0.005)
+        self.assertEqual(histogram.percentile(99), 0.25)
+        self.assertEqual(histogram.percentile(100), 3)
+
+    def test_value_greater_than_buckets(self):
+        histogram = metrics.Histogram(buckets=(1, 2))
+        histogram.add(10)
+        self.assertEqual(histogram.counts, [0, 0, 1])
+        self.assertEqual(histogram.percentile(50), 10)
+
+    def test_empty(self):
+        summary = metrics.Histogram().to_dict()
+        self.assertEqual(summary['count'], 0)
+        self.assertIsNone(summary['p99'])
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(MetricsTestCase, self).setUp()
+        metrics.get_metrics_collector().reset()
+        self.addCleanup(metrics.get_metrics_collector().reset)
+
+    def _call(self, action='get', error=None, status=200, size=10):
+        with metrics.ApiCall('segments', action, 'Segment'):
+            metrics.record_response(mock.Mock(
+                status_code=status,
+                headers={'Content-Length': str(size)}
+            ))
+            if error:
+                raise error
+
+    def test_record_calls(self):
+        self._call()
+        self._call(status=201, size=20)
+        with self.assertRaises(NotFound):
+            self._call(error=NotFound(), status=404, size=0)
+        summary = metrics.get_metrics_collector().summary()
+        self.assertEqual(list(summary.keys()), ['Segment.get'])
+        self.assertEqual(summary['Segment.get']['count'], 3)
+        self.assertEqual(summary['Segment.get']['response_size'], 30)
+        self.assertEqual(
+            summary['Segment.get']['statuses'],
+            {'200': 1, '201': 1, '404': 1}
+        )
+        self.assertEqual(summary['Segment.get']['errors'], {'NotFound': 1})
+
+    def test_response_without_call_is_ignored(self):
+        metrics.record_response(mock.Mock(status_code=200, headers={}))
+        self.assertEqual(len(metrics.get_metrics_collector()), 0)
+
+    def test_collect_scope(self):
+        self._call(action='list')
+        with metrics.collect() as collector:
+            self._call()
+            with metrics.collect() as inner_collector:
+                self._call(action='update')
+        self._call(action='delete')
+        self.assertEqual(
+            list(collector.summary().keys()),
+            ['Segment.get', 'Segment.update']
+        )
+        self.assertEqual(
+            list(inner_collector.summary().keys()), ['Segment.update']
+        )
+        self.assertEqual(len(metrics.get_metrics_collector()), 4)
+
+    def test_collect_scope_in_executor(self):
+        executor = BoundedExecutor(max_workers=2)
+        with metrics.collect() as collector:
+            for index in range(4):
+                executor.submit(index, self._call)
+            executor.run()
+        self.assertEqual(collector.summary()['Segment.get']['count'], 4)
+
+    def test_collect_scope_in_page_fetcher(self):
+        def _fetch(cursor=None):
+            self._call(action='list')
+            return [], None
+
+        with metrics.collect() as collector:
+            fetcher = _PageFetcher(_fetch, '0001')
+            fetcher.start()
+            fetcher.result()
+        self.assertEqual(collector.summary()['Segment.list']['count'], 1)
+
+    def test_hooks(self):
+        records = []
+        failing_hook = mock.Mock(side_effect=Exception('hook error'))
+        metrics.add_hook(failing_hook)
+        metrics.add_hook(records.append)
+        self.addCleanup(metrics.remove_hook, failing_hook)
+        self.addCleanup(metrics.remove_hook, records.append)
+        self._call()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].resource_type, 'Segment')
+        self.assertEqual(records[0].status, 200)
+        self.assertEqual(records[0].response_size, 10)
+        self.assertIsNone(records[0].error)
+
+    def test_export_to_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'metrics.json')
+        self._call()
+        summary = metrics.get_metrics_collector().summary()
+        metrics.export_to_file(path, summary, operation='create')
+        metrics.export_to_file(path, summary, operation='start')
+        with open(path) as metrics_file:
+            lines = [json.loads(line) for line in metrics_file]
+        self.assertEqual(
+            [line['operation'] for line in lines], ['create', 'start']
+        )
+        self.assertEqual(lines[0]['metrics']['Segment.get']['count'], 1)
+
+
+@mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+class InvokeMetricsTestCase(unittest.TestCase):
+
+    def _resource(self, auth_type='basic'):
+        resource = NSXTResource(
+            client_config={'auth_type': auth_type},
+            resource_config={'id': 'foo'},
+            logger=mock.MagicMock()
+        )
+        resource.resource_type = 'Segment'
+        resource.service_name = 'segments'
+        resource._api_client = mock.MagicMock()
+        return resource
+
+    def test_invoke_retries(self, _):
+        resource = self._resource(auth_type='session')
+        resource._api_client.segments.get.side_effect = \
+            [Unauthenticated(), {'id': 'foo'}]
+        with mock.patch.object(resource, '_refresh_session_auth'):
+            with metrics.collect() as collector:
+                resource._invoke('get', ('foo',))
+        summary = collector.summary()['Segment.get']
+        self.assertEqual(summary['count'], 1)
+        self.assertEqual(summary['retries'], 1)
+        self.assertEqual(summary['service_name'], 'segments')
+
+    def test_invoke_error(self, _):
+        resource = self._resource()
+        resource._api_client.segments.get.side_effect = NotFound()
+        with metrics.collect() as collector:
+            with self.assertRaises(NotFound):
+                resource._invoke('get', ('foo',))
+        self.assertEqual(
+            collector.summary()['Segment.get']['errors'], {'NotFound': 1}
+        )
@@ -0,0 +1,434 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import unittest
+import warnings
+
+# Third parties imports
+import mock
+from com.vmware.vapi.std.errors_client import (
+    ConcurrentChange,
+    InvalidRequest,
+    NotFound,
+    ServiceUnavailable
+)
+
+# Local imports
+from nsx_t_sdk import metrics
+from nsx_t_sdk.common import is_revision_conflict
+from nsx_t_sdk.hierarchical import HierarchicalBatch
+from nsx_t_sdk.inventory import clear_inventory_caches
+from nsx_t_sdk.pool import get_client_pool
+from nsx_t_sdk.session import get_session_token_cache
+from nsx_t_sdk.resources import (
+    Segment,
+    SegmentPort,
+    SegmentState,
+    Tier1,
+    Tier1state,
+    DhcpV4StaticBindingConfig,
+    DhcpStaticBindingState,
+    VirtualMachine,
+    VirtualNetworkInterface
+)
+from nsx_t_sdk.tests.mock_server import MockNSXTServer, without_ca_bundle
+
+
+class MockNSXTServerTestCase(unittest.TestCase):
+    """
+    Run the SDK against the local mock server over HTTPS
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(MockNSXTServerTestCase, cls).setUpClass()
+        cls._environ = without_ca_bundle()
+        cls._environ.__enter__()
+        cls.server = MockNSXTServer(page_size=2)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls._environ.__exit__(None, None, None)
+        super(MockNSXTServerTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        super(MockNSXTServerTestCase, self).setUp()
+        self.server.reset()
+        self.server.realization_delay = 0
+        self.logger = mock.MagicMock()
+        get_session_token_cache().clear()
+        get_client_pool().clear()
+        self.addCleanup(get_client_pool().clear)
+        self.addCleanup(get_session_token_cache().clear)
+        # The certificate of the server is self signed
+        warnings.simplefilter('ignore')
+        self.addCleanup(warnings.resetwarnings)
+
+    def _segment(self, segment_id, auth_type='basic', **client_config):
+        return Segment(
+            client_config=self.server.client_config(
+                auth_type=auth_type, **client_config
+            ),
+            resource_config={'id': segment_id},
+            logger=self.logger
+        )
+
+    def test_create_and_get_segment(self):
+        segment = self._segment('segment-1')
+        created = segment.create()
+        self.assertEqual(created.id, 'segment-1')
+        self.assertEqual(created.path, '/infra/segments/segment-1')
+        self.assertIsNotNone(created.unique_id)
+        self.assertEqual(segment.get()['display_name'], 'segment-1')
+        segment.delete('segment-1')
+        with self.assertRaises(NotFound):
+            segment.get()
+
+    def test_iter_list_follow_pages(self):
+        for index in range(5):
+            self._segment('segment-{0}'.format(index)).create()
+        segment = self._segment('segment-0')
+        requests_before = self.server.requests['GET']
+        ids = [item['id'] for item in segment.iter_list(fields=['id'])]
+        self.assertEqual(ids, ['segment-{0}'.format(i) for i in range(5)])
+        # 5 segments with page size of 2
+        self.assertEqual(self.server.requests['GET'] - requests_before, 3)
+
+    def test_realization_state(self):
+        self.server.realization_delay = 60
+        client_config = self.server.client_config()
+        Tier1(client_config, {'id': 'tier1-1'}, self.logger).create()
+        tier1_state = Tier1state(client_config, {'id': 'tier1-1'}, self.logger)
+        self.assertEqual(
+            tier1_state.get()['tier1_state']['state'], 'in_progress'
+        )
+        self.server.realization_delay = 0
+        self._segment('segment-1').create()
+        segment_state = SegmentState(
+            client_config, {'id': 'segment-1'}, self.logger
+        )
+        self.assertEqual(segment_state.get()['state'], 'success')
+
+    def test_static_binding_state(self):
+        client_config = self.server.client_config()
+        self._segment('segment-1').create()
+        binding = DhcpV4StaticBindingConfig(
+            client_config,
+            {'id': 'binding-1', 'ip_address': '10.0.0.2'},
+            self.logger
+        )
+        binding.update('segment-1', 'binding-1', binding.resource_config)
+        state = DhcpStaticBindingState(client_config, {}, self.logger)
+        self.assertEqual(
+            state.get(args=('segment-1', 'binding-1'))['state'], 'success'
+        )
+
+    def test_session_login_again_when_expired(self):
+        segment = self._segment('segment-1', auth_type='session')
+        segment.create()
+        self.assertEqual(self.server.requests['POST'], 1)
+        self.server.expire_sessions()
+        self.assertEqual(segment.get()['id'], 'segment-1')
+        self.assertEqual(self.server.requests['POST'], 2)
+
+    def test_injected_error(self):
+        segment = self._segment('segment-1', max_retries=0)
+        self.server.inject_error(503, path='/segments/', method='PUT',
+                                 headers={'Retry-After': '1'})
+        with self.assertRaises(ServiceUnavailable):
+            segment.create()
+        # The error is injected only once
+        segment.create()
+
+    @mock.patch('nsx_t_sdk.common.time.sleep')
+    def test_throttled_requests_are_retried(self, sleep_mock):
+        segment = self._segment('segment-1', max_retries=2)
+        self.server.inject_error(429, path='/segments/', method='PUT',
+                                 count=2, headers={'Retry-After': '3'})
+        segment.create()
+        self.assertEqual(self.server.requests['PUT'], 3)
+        self.assertEqual(sleep_mock.call_args_list, [mock.call(3)] * 2)
+
+        self.server.inject_error(503, path='/segments/', method='GET',
+                                 count=3)
+        with self.assertRaises(ServiceUnavailable):
+            segment.get()
+        self.assertEqual(sleep_mock.call_count, 4)
+
+    @mock.patch('nsx_t_sdk.common.time.sleep')
+    def test_call_metrics(self, _):
+        segment = self._segment('segment-1')
+        self.server.inject_error(503, path='/segments/', method='PUT',
+                                 headers={'Retry-After': '2'})
+        with metrics.collect() as collector:
+            segment.create()
+            segment.get()
+            with self.assertRaises(NotFound):
+                self._segment('segment-2').get()
+        summary = collector.summary()
+        self.assertEqual(summary['Segment.update']['count'], 1)
+        self.assertEqual(summary['Segment.update']['retries'], 1)
+        self.assertEqual(summary['Segment.update']['retry_delay'], 2)
+        self.assertEqual(summary['Segment.update']['statuses'], {'200': 1})
+        self.assertEqual(
+            summary['Segment.get']['statuses'], {'200': 1, '404': 1}
+        )
+        self.assertEqual(summary['Segment.get']['errors'], {'NotFound': 1})
+        self.assertGreater(summary['Segment.get']['response_size'], 0)
+
+    def test_update_with_outdated_revision(self):
+        tier1 = Tier1(self.server.client_config(), {'id': 'tier1-1'},
+                      self.logger)
+        tier1.create()
+        outdated = tier1.get(to_dict=False)
+        tier1.update('tier1-1', tier1.get(to_dict=False))
+        with self.assertRaises(InvalidRequest) as error:
+            tier1.update('tier1-1', outdated)
+        self.assertTrue(is_revision_conflict(error.exception))
+
+        self.server.inject_error(409, path='/tier-1s/', method='PUT')
+        with self.assertRaises(ConcurrentChange):
+            tier1.update('tier1-1', tier1.get(to_dict=False))
+
+    def test_update_merge_concurrent_changes(self):
+        client_config = self.server.client_config()
+        tier1 = Tier1(client_config, {'id': 'tier1-1'}, self.logger)
+        tier1.create()
+        outdated = tier1.get(to_dict=False)
+        # Another deployment change the gateway meanwhile
+        Tier1(client_config, {'id': 'tier1-1'}, self.logger).patch_fields(
+            {'description': 'updated'}
+        )
+
+        def set_paths(obj):
+            obj.dhcp_config_paths = ['/infra/dhcp-1']
+            return obj
+
+        self.server.requests.clear()
+        tier1.update('tier1-1', set_paths(outdated), merge=set_paths)
+        self.assertEqual(self.server.requests['PUT'], 2)
+        self.assertEqual(self.server.requests['GET'], 1)
+        resource = self.server.get_resource('/infra/tier-1s/tier1-1')
+        self.assertEqual(resource['description'], 'updated')
+        self.assertEqual(resource['dhcp_config_paths'], ['/infra/dhcp-1'])
+
+    def test_update_conflicts_are_bounded(self):
+        tier1 = Tier1(
+            self.server.client_config(max_conflict_retries=2),
+            {'id': 'tier1-1'},
+            self.logger
+        )
+        tier1.create()
+        self.server.inject_error(412, path='/tier-1s/', method='PUT',
+                                 count=-1, body={
+                                     'httpStatus': 'PRECONDITION_FAILED',
+                                     'error_code': 604
+                                 })
+        self.server.requests.clear()
+        with self.assertRaises(InvalidRequest):
+            tier1.update(
+                'tier1-1', tier1.get(to_dict=False), merge=lambda obj: obj
+            )
+        self.assertEqual(self.server.requests['PUT'], 3)
+
+    def test_patch_fields(self):
+        tier1 = Tier1(self.server.client_config(), {'id': 'tier1-1'},
+                      self.logger)
+        tier1.create()
+        tier1.patch_fields({'description': 'updated'})
+        self.server.requests.clear()
+        tier1.patch_fields({'dhcp_config_paths': ['/infra/dhcp-1']})
+        self.assertEqual(dict(self.server.requests), {'PATCH': 1})
+        resource = self.server.get_resource('/infra/tier-1s/tier1-1')
+        self.assertEqual(resource['description'], 'updated')
+        self.assertEqual(resource['dhcp_config_paths'], ['/infra/dhcp-1'])
+
+    def test_patch_delta(self):
+        tier1 = Tier1(self.server.client_config(), {'id': 'tier1-1'},
+                      self.logger)
+        tier1.create()
+        self.server.requests.clear()
+        desired = {'dhcp_config_paths': ['/infra/dhcp-1']}
+        self.assertEqual(tier1.patch_delta(desired), desired)
+        self.assertEqual(dict(self.server.requests), {'GET': 1, 'PATCH': 1})
+        self.assertEqual(
+            self.server.get_resource(
+                '/infra/tier-1s/tier1-1')['dhcp_config_paths'],
+            ['/infra/dhcp-1']
+        )
+        # Nothing is sent when the resource is up to date
+        self.server.requests.clear()
+        self.assertEqual(tier1.patch_delta(desired), {})
+        self.assertEqual(dict(self.server.requests), {'GET': 1})
+
+    def test_patch_delta_merge_concurrent_changes(self):
+        client_config = self.server.client_config()
+        tier1 = Tier1(client_config, {'id': 'tier1-1'}, self.logger)
+        tier1.create()
+        outdated = tier1.get(fields=['dhcp_config_paths', 'revision'])
+        # Another deployment change the gateway meanwhile
+        Tier1(client_config, {'id': 'tier1-1'}, self.logger).patch_fields(
+            {'description': 'updated'}
+        )
+        self.server.requests.clear()
+        desired = {'dhcp_config_paths': ['/infra/dhcp-1']}
+        self.assertEqual(tier1.patch_delta(desired, current=outdated),
+                         desired)
+        # The outdated delta is rejected, then computed again
+        self.assertEqual(
+            dict(self.server.requests), {'GET': 1, 'PATCH': 2}
+        )
+        resource = self.server.get_resource('/infra/tier-1s/tier1-1')
+        self.assertEqual(resource['description'], 'updated')
+        self.assertEqual(resource['dhcp_config_paths'], ['/infra/dhcp-1'])
+        # Nothing is sent when the latest version is already up to date
+        self.assertEqual(tier1.patch_delta(desired, current=outdated), {})
+
+    def test_patch_delta_with_outdated_struct_dict(self):
+        client_config = self.server.client_config()
+        tier1 = Tier1(client_config, {'id': 'tier1-1'}, self.logger)
+        tier1.create()
+        # The dict of the whole resource has `_revision`
+        outdated = tier1.get()
+        Tier1(client_config, {'id': 'tier1-1'}, self.logger).patch_fields(
+            {'description': 'updated'}
+        )
+        self.server.requests.clear()
+        desired = {'dhcp_config_paths': ['/infra/dhcp-1']}
+        self.assertEqual(tier1.patch_delta(desired, current=outdated),
+                         desired)
+        # The write is conditional, so the outdated revision is rejected
+        self.assertEqual(
+            dict(self.server.requests), {'GET': 1, 'PATCH': 2}
+        )
+
+    def test_hierarchical_batch(self):
+        client_config = self.server.client_config()
+        segment = self._segment('segment-1')
+        binding = DhcpV4StaticBindingConfig(
+            client_config, {'id': 'binding-1'}, self.logger
+        )
+        batch = HierarchicalBatch(client_config, self.logger)
+        batch.add(segment)
+        batch.add(binding, parent=segment)
+        batch.apply()
+        self.assertIsNotNone(
+            self.server.get_resource(
+                '/infra/segments/segment-1/'
+                'dhcp-static-binding-configs/binding-1'
+            )
+        )
+        batch = HierarchicalBatch(client_config, self.logger)
+        batch.delete(segment)
+        batch.apply()
+        with self.assertRaises(NotFound):
+            segment.get()
+
+    def test_list_fabric_inventory_with_filters(self):
+        for index in range(3):
+            self.server.add_resource('/api/v1/fabric/vifs', {
+                'id': 'vif-{0}'.format(index),
+                'owner_vm_id': 'vm-{0}'.format(index % 2),
+                'resource_type': 'VirtualNetworkInterface'
+            })
+        vif = VirtualNetworkInterface(
+            self.server.client_config(), {}, self.logger
+        )
+        results = vif.list(filters={'owner_vm_id': 'vm-0'})
+        self.assertEqual(
+            [result['id'] for result in results], ['vif-0', 'vif-2']
+        )
+
+    def test_inventory_cache(self):
+        self.addCleanup(clear_inventory_caches)
+        for index in range(3):
+            self.server.add_resource('/api/v1/fabric/virtual-machines', {
+                'id': 'vm-{0}'.format(index),
+                'external_id': 'vm-{0}'.format(index),
+                'display_name': 'vm-name-{0}'.format(index),
+                'resource_type': 'VirtualMachine'
+            })
+            self.server.add_resource('/api/v1/fabric/vifs', {
+                'id': 'vif-{0}'.format(index),
+                'external_id': 'vif-{0}'.format(index),
+                'owner_vm_id': 'vm-{0}'.format(index),
+                'resource_type': 'VirtualNetworkInterface'
+            })
+        client_config = self.server.client_config(inventory_cache_ttl=60)
+        for index in range(3):
+            virtual_machine = VirtualMachine(
+                client_config,
+                {'vm_name': 'vm-name-{0}'.format(index)},
+                self.logger
+            )
+            self.assertEqual(
+                virtual_machine.get()['external_id'],
+                'vm-{0}'.format(index)
+            )
+            self.assertEqual(virtual_machine.resource_id,
+                             'vm-{0}'.format(index))
+            vif = VirtualNetworkInterface(client_config, {}, self.logger)
+            vifs = vif.lookup(owner_vm_id=virtual_machine.resource_id)
+            self.assertEqual(
+                [item['external_id'] for item in vifs],
+                ['vif-{0}'.format(index)]
+            )
+        # One snapshot of each collection for all the lookups
+        self.assertEqual(self.server.requests['GET'], 2)
+        # Objects added after the snapshot are listed with filters
+        self.server.add_resource('/api/v1/fabric/vifs', {
+            'id': 'vif-3',
+            'external_id': 'vif-3',
+            'owner_vm_id': 'vm-3',
+            'resource_type': 'VirtualNetworkInterface'
+        })
+        self.assertEqual(len(vif.lookup(owner_vm_id='vm-3')), 1)
+        self.assertEqual(len(vif.lookup(owner_vm_id='vm-3')), 1)
+        self.assertEqual(self.server.requests['GET'], 3)
+        self.assertEqual(
+            len(vif.lookup(owner_vm_id='vm-3', refresh=True)), 1
+        )
+        self.assertEqual(self.server.requests['GET'], 4)
+
+    def test_segment_port_attachment_index(self):
+        self.addCleanup(clear_inventory_caches)
+        for index in range(5):
+            port = {'id': 'port-{0}'.format(index), 'resource_type': 'Port'}
+            if index % 2:
+                port['attachment'] = {'id': 'attachment-{0}'.format(index)}
+            self.server.add_resource('/infra/segments/segment-1/ports', port)
+        for client_config in (self.server.client_config(),
+                              self.server.client_config(
+                                  inventory_cache_ttl=60)):
+            requests_before = self.server.requests['GET']
+            for _ in range(2):
+                ports = SegmentPort(
+                    client_config, {}, self.logger
+                ).get_attachment_index('segment-1')
+                self.assertEqual(ports, {
+                    'attachment-1': {
+                        'id': 'port-1', 'attachment': {'id': 'attachment-1'}
+                    },
+                    'attachment-3': {
+                        'id': 'port-3', 'attachment': {'id': 'attachment-3'}
+                    }
+                })
+            requests = self.server.requests['GET'] - requests_before
+            # The index is reused when the inventory is cached
+            self.assertEqual(
+                requests, 1 if client_config.get('inventory_cache_ttl') else 2
+            )
@@ -19,15 +19,44 @@ import unittest
 # Third parties imports
 import requests
 import mock
+from com.vmware.vapi.std.errors_client import (
+    NotFound,
+    ServiceUnavailable,
+    Unauthenticated,
+    Unauthorized
+)
+from vmware.vapi.bindings.converter import TypeConverter
+from vmware.vapi.bindings.struct import VapiStruct
+from vmware.vapi.bindings.type import DynamicStructType
+from com.vmware.nsx_policy.model_client import (
+    DhcpV4StaticBindingConfig,
+    PortAttachment,
+    SegmentPort as vmSegmentPort,
+    Tier1 as vmTier1
+)
 
 # Local imports
-from nsx_t_sdk.common import NSXTResource
+from nsx_t_sdk.common import (
+    NSXTResource,
+    RetryPolicy,
+    get_delta,
+    get_included_fields,
+    get_new_results,
+    parse_retry_after,
+    project_fields
+)
+from nsx_t_sdk.pool import get_client_pool
+from nsx_t_sdk.resources import Segment, Tier1
+from nsx_t_sdk.session import SessionToken, get_session_token_cache
 
 
 class MockSessionResponse(object):
     def __init__(self, status_code):
         self.status_code = status_code
-        self.headers = {}
+        self.headers = {
+            'Set-Cookie': 'JSESSIONID=foo',
+            'X-XSRF-TOKEN': 'foo-token'
+        }
 
     def raise_for_status(self):
         raise requests.HTTPError('HTTP Error')
@@ -45,7 +74,19 @@ class NSXTSDKTestCase(unittest.TestCase):
             'auth_type': 'basic'
         }
         self.logger = mock.MagicMock()
+        # Make sure each test start with fresh connections & sessions
+        get_session_token_cache().clear()
+        get_client_pool().clear()
+        self.addCleanup(get_client_pool().clear)
+        self.addCleanup(get_session_token_cache().clear)
+
 
+class NSXTClientTestsMixin(object):
+    """
+    Tests of the client of the resources, which are kept out of
+    `NSXTSDKTestCase` so that the test cases of the resources do not run
+    them again
+    """
     @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
     def test_nsx_t_client_config(self, _):
         client = NSXTResource(
@@ -99,6 +140,7 @@ class NSXTSDKTestCase(unittest.TestCase):
     @mock.patch('nsx_t_sdk.common.NSXTResource._get_nsx_client_map')
     @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_basic_auth')
     def test_nsx_t_client_with_basic_auth(self, prepare_basic_auth_mock, _):
+        get_client_pool().clear()
         _ = NSXTResource(
             self.client_config, {
                 'id': 'resource_id',
@@ -154,3 +196,376 @@ class NSXTSDKTestCase(unittest.TestCase):
             },
             self.logger
         )
+
+
+class NSXTResourceTestCase(NSXTClientTestsMixin, NSXTSDKTestCase):
+    @mock.patch('nsx_t_sdk.common.NSXTResource._get_nsx_client_map')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_basic_auth')
+    def test_nsx_t_client_connection_is_shared(
+            self, prepare_basic_auth_mock, _):
+        get_client_pool().clear()
+        first = NSXTResource(self.client_config, {}, self.logger)
+        second = NSXTResource(self.client_config, {}, self.logger)
+        self.assertIs(first._connection, second._connection)
+        self.assertEqual(prepare_basic_auth_mock.call_count, 1)
+
+    def test_nsx_t_client_stubs_are_shared(self):
+        first = Segment(self.client_config, {'id': 'first'}, self.logger)
+        second = Segment(self.client_config, {'id': 'second'}, self.logger)
+        tier1 = Tier1(self.client_config, {'id': 'tier1'}, self.logger)
+        # Same client type share the stub factory but not the service
+        self.assertIs(first._api_client, second._api_client)
+        self.assertIs(first._api_client, tier1._api_client)
+        self.assertIs(
+            first._get_service_client(), second._get_service_client()
+        )
+        self.assertIsNot(
+            first._get_service_client(), tier1._get_service_client()
+        )
+        self.assertIs(
+            first._get_service_client(),
+            first._connection.get_stub(('nsx_infra', 'Segments'), None)
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._get_nsx_client_map')
+    def test_nsx_t_client_connection_per_credentials(self, _):
+        first = NSXTResource(self.client_config, {}, self.logger)
+        client_config = dict(self.client_config, username='other')
+        second = NSXTResource(client_config, {}, self.logger)
+        self.assertIsNot(first._connection, second._connection)
+        self.assertEqual(len(get_client_pool()), 2)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._get_nsx_client_map')
+    def test_nsx_t_client_resolves_authentication_errors(self, _):
+        client = NSXTResource(self.client_config, {}, self.logger)
+        resolver = client._connection.stub_config.resolver
+        for error_type in (Unauthenticated, Unauthorized):
+            binding_type = error_type.get_binding_type()
+            self.assertIs(
+                resolver.resolve(binding_type.definition.name).binding_class,
+                error_type
+            )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource'
+                '._get_stub_factory_for_nsx_client')
+    @mock.patch('nsx_t_sdk.common.requests.Session.post')
+    def test_session_token_is_shared(self, post_mock, _):
+        post_mock.return_value = MockSessionResponse(status_code=200)
+        self.client_config['auth_type'] = 'session'
+        first = NSXTResource(self.client_config, {}, self.logger)
+        get_client_pool().evict(first.connection_key)
+        NSXTResource(self.client_config, {}, self.logger)
+        # Evicting the connection destroy the session, so we expect login,
+        # logout & login again
+        self.assertEqual(post_mock.call_count, 3)
+        self.assertTrue(
+            post_mock.call_args_list[1][0][0].endswith('api/session/destroy')
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource'
+                '._get_stub_factory_for_nsx_client')
+    @mock.patch('nsx_t_sdk.common.requests.Session.post')
+    def test_session_token_login_once(self, post_mock, _):
+        post_mock.return_value = MockSessionResponse(status_code=200)
+        self.client_config['auth_type'] = 'session'
+        first = NSXTResource(self.client_config, {}, self.logger)
+        second = NSXTResource(self.client_config, {}, self.logger)
+        self.assertEqual(post_mock.call_count, 1)
+        self.assertEqual(
+            first._connection.session.headers['X-XSRF-TOKEN'], 'foo-token'
+        )
+        self.assertIs(first._connection, second._connection)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource'
+                '._get_stub_factory_for_nsx_client')
+    @mock.patch('nsx_t_sdk.common.requests.Session.post')
+    def test_session_token_relogin_when_rejected(self, post_mock, _):
+        post_mock.return_value = MockSessionResponse(status_code=200)
+        self.client_config['auth_type'] = 'session'
+        client = NSXTResource(self.client_config, {}, self.logger)
+        client.service_name = 'Foo'
+        service_action = client._api_client.Foo.get
+        service_action.side_effect = [Unauthenticated(), 'foo']
+        self.assertEqual(client._invoke('get', ('foo_id',)), 'foo')
+        self.assertEqual(post_mock.call_count, 2)
+        self.assertEqual(service_action.call_count, 2)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource'
+                '._get_stub_factory_for_nsx_client')
+    @mock.patch('nsx_t_sdk.common.requests.Session.post')
+    def test_session_token_refresh_before_expiry(self, post_mock, _):
+        post_mock.return_value = MockSessionResponse(status_code=200)
+        self.client_config['auth_type'] = 'session'
+        client = NSXTResource(self.client_config, {}, self.logger)
+        client.service_name = 'Foo'
+        get_session_token_cache().get(client.connection_key).last_used = 0
+        client._invoke('get', ('foo_id',))
+        self.assertEqual(post_mock.call_count, 2)
+        token = get_session_token_cache().get(client.connection_key)
+        self.assertFalse(token.is_expiring())
+        self.assertIsInstance(token, SessionToken)
+
+    @staticmethod
+    def _list_result(results, cursor=None):
+        list_result = mock.MagicMock()
+        list_result.to_dict.return_value = {
+            'results': results,
+            'cursor': cursor,
+            'result_count': len(results)
+        }
+        return list_result
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_follow_cursor(self, _, invoke_mock):
+        invoke_mock.side_effect = [
+            self._list_result([{'id': 'foo_1'}, {'id': 'foo_2'}], '0002'),
+            self._list_result([{'id': 'foo_3'}], '0003'),
+            self._list_result([{'id': 'foo_4'}]),
+        ]
+        client = NSXTResource(self.client_config, {}, self.logger)
+        results = client.iter_list(page_size=2, filters={'foo': 'bar'})
+        self.assertEqual(
+            [result['id'] for result in results],
+            ['foo_1', 'foo_2', 'foo_3', 'foo_4']
+        )
+        self.assertEqual(invoke_mock.call_count, 3)
+        _, kwargs = invoke_mock.call_args
+        self.assertEqual(kwargs['kwargs']['cursor'], '0003')
+        self.assertEqual(kwargs['kwargs']['page_size'], 2)
+        self.assertEqual(kwargs['kwargs']['foo'], 'bar')
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_is_lazy(self, _, invoke_mock):
+        invoke_mock.side_effect = [
+            self._list_result([{'id': 'foo_1'}], '0002'),
+            self._list_result([{'id': 'foo_2'}]),
+        ]
+        client = NSXTResource(self.client_config, {}, self.logger)
+        results = client.iter_list()
+        self.assertEqual(next(results), {'id': 'foo_1'})
+        self.assertEqual(invoke_mock.call_count, 1)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_with_prefetch(self, _, invoke_mock):
+        invoke_mock.side_effect = [
+            self._list_result([{'id': 'foo_1'}], '0002'),
+            self._list_result([{'id': 'foo_2'}]),
+        ]
+        client = NSXTResource(self.client_config, {}, self.logger)
+        self.assertEqual(
+            list(client.iter_list(prefetch=True)),
+            [{'id': 'foo_1'}, {'id': 'foo_2'}]
+        )
+        self.assertEqual(invoke_mock.call_count, 2)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_stop_on_repeated_cursor(self, _, invoke_mock):
+        invoke_mock.return_value = self._list_result([{'id': 'foo'}], '0001')
+        client = NSXTResource(self.client_config, {}, self.logger)
+        self.assertEqual(list(client.iter_list()), [{'id': 'foo'}])
+        self.assertEqual(invoke_mock.call_count, 2)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_last_page_with_repeated_cursor(self, _, invoke_mock):
+        invoke_mock.side_effect = [
+            self._list_result([{'id': 'foo_1'}], '0001'),
+            self._list_result([{'id': 'foo_2'}, {'id': 'foo_3'}], '0001')
+        ]
+        client = NSXTResource(self.client_config, {}, self.logger)
+        self.assertEqual(
+            list(client.iter_list()),
+            [{'id': 'foo_1'}, {'id': 'foo_2'}, {'id': 'foo_3'}]
+        )
+        self.assertEqual(invoke_mock.call_count, 2)
+
+    def test_get_new_results(self):
+        self.assertEqual(
+            get_new_results(
+                [{'id': 'foo'}, {'id': 'bar'}],
+                [{'id': 'bar'}, {'id': 'baz'}]
+            ),
+            [{'id': 'baz'}]
+        )
+        # Results without id are compared as a whole
+        self.assertEqual(
+            get_new_results(
+                [{'attachment': {'id': 'foo'}}],
+                [{'attachment': {'id': 'foo'}}, {'attachment': {'id': 'bar'}}]
+            ),
+            [{'attachment': {'id': 'bar'}}]
+        )
+
+    def test_get_included_fields(self):
+        self.assertEqual(
+            get_included_fields(['id', 'attachment.id', 'attachment.type']),
+            'id,attachment'
+        )
+
+    def test_get_delta(self):
+        current = {
+            'id': 'tier1_id',
+            'dhcp_config_paths': ['/infra/dhcp-1'],
+            'tags': [{'scope': 'foo', 'tag': 'bar'}]
+        }
+        self.assertEqual(
+            get_delta({'dhcp_config_paths': ['/infra/dhcp-1']}, current), {}
+        )
+        self.assertEqual(
+            get_delta({'dhcp_config_paths': [], 'id': 'tier1_id'}, current),
+            {'dhcp_config_paths': []}
+        )
+        self.assertEqual(
+            get_delta({'tags': [{'scope': 'foo', 'tag': 'baz'}]}, current),
+            {'tags': [{'scope': 'foo', 'tag': 'baz'}]}
+        )
+        # Unset fields are equal to empty values
+        self.assertEqual(
+            get_delta({'dhcp_config_paths': [], 'description': None}, {}), {}
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource.patch_fields')
+    @mock.patch('nsx_t_sdk.common.NSXTResource.get')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_patch_delta(self, _, get_mock, patch_fields_mock):
+        client = Tier1(self.client_config, {'id': 'tier1_id'}, self.logger)
+        get_mock.return_value = {'dhcp_config_paths': ['/infra/dhcp-1']}
+        self.assertEqual(client.patch_delta({'dhcp_config_paths': []}),
+                         {'dhcp_config_paths': []})
+        get_mock.assert_called_once_with(
+            ('tier1_id',), fields=['dhcp_config_paths', 'revision']
+        )
+        patch_fields_mock.assert_called_once_with(
+            {'dhcp_config_paths': []}, ('tier1_id',)
+        )
+        # The current resource is not read again when it is provided
+        self.assertEqual(
+            client.patch_delta({'dhcp_config_paths': []}, current={}), {}
+        )
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertEqual(patch_fields_mock.call_count, 1)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource.patch_fields')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_patch_delta_with_struct_dict(self, _, patch_fields_mock):
+        client = Tier1(self.client_config, {'id': 'tier1_id'}, self.logger)
+        # The dicts of `to_dict` & of the REST api use `_revision`
+        current = vmTier1(id='tier1_id', revision=3).to_dict()
+        self.assertEqual(current['_revision'], 3)
+        client.patch_delta(
+            {'dhcp_config_paths': ['/infra/dhcp-1']}, current=current
+        )
+        patch_fields_mock.assert_called_once_with(
+            {'dhcp_config_paths': ['/infra/dhcp-1'], 'revision': 3},
+            ('tier1_id',)
+        )
+
+    def test_project_fields(self):
+        port = vmSegmentPort(
+            id='port_id',
+            display_name='port_name',
+            attachment=PortAttachment(id='attachment_id', type='VIF'),
+            revision=2
+        )
+        self.assertEqual(
+            project_fields(port, ['id', 'attachment.id', '_revision']),
+            {'id': 'port_id', 'attachment': {'id': 'attachment_id'},
+             '_revision': 2}
+        )
+        self.assertEqual(
+            project_fields(vmSegmentPort(id='port_id'), ['attachment.id']),
+            {}
+        )
+        self.assertEqual(
+            project_fields({'attachment': {'id': 'foo'}}, ['attachment.id']),
+            {'attachment': {'id': 'foo'}}
+        )
+
+    def test_project_fields_untyped_struct(self):
+        binding = DhcpV4StaticBindingConfig(
+            id='binding_id',
+            ip_address='10.0.0.2',
+            resource_type='DhcpV4StaticBindingConfig'
+        )
+        untyped = TypeConverter.convert_to_python(
+            binding.get_struct_value(),
+            DynamicStructType('vmware.vapi.dynamic_struct', {}, VapiStruct)
+        )
+        self.assertEqual(
+            project_fields(untyped, ['id', 'ip_address']),
+            {'id': 'binding_id', 'ip_address': '10.0.0.2'}
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_iter_list_with_fields(self, _, invoke_mock):
+        invoke_mock.return_value = mock.MagicMock(
+            results=[
+                vmSegmentPort(
+                    id='port_id',
+                    attachment=PortAttachment(id='attachment_id')
+                )
+            ],
+            cursor=None
+        )
+        client = NSXTResource(self.client_config, {}, self.logger)
+        self.assertEqual(
+            list(client.iter_list(fields=['attachment.id'])),
+            [{'attachment': {'id': 'attachment_id'}}]
+        )
+        _, kwargs = invoke_mock.call_args
+        self.assertEqual(kwargs['kwargs']['included_fields'], 'attachment')
+        self.assertFalse(invoke_mock.return_value.to_dict.called)
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_get_with_fields(self, _, invoke_mock):
+        invoke_mock.return_value = vmSegmentPort(
+            id='port_id', display_name='port_name'
+        )
+        client = NSXTResource(self.client_config, {'id': 'port_id'},
+                              self.logger)
+        self.assertEqual(client.get(fields=['id']), {'id': 'port_id'})
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('5'), 5)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('invalid'))
+        self.assertEqual(
+            parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0
+        )
+
+    def test_should_retry(self):
+        policy = RetryPolicy(max_retries=2)
+        self.assertTrue(policy.should_retry('get', ServiceUnavailable(), 1))
+        self.assertFalse(policy.should_retry('get', ServiceUnavailable(), 2))
+        self.assertFalse(policy.should_retry('get', NotFound(), 0))
+        # Patch of hierarchical api is not retried
+        self.assertFalse(
+            policy.should_retry('patch', ServiceUnavailable(), 0)
+        )
+
+    def test_get_delay(self):
+        policy = RetryPolicy(initial_delay=1, max_delay=10)
+        self.assertEqual(policy.get_delay(0, retry_after='4'), 4)
+        self.assertEqual(policy.get_delay(0, retry_after='60'), 10)
+        for retries, delay in ((0, 1), (2, 4), (10, 10)):
+            self.assertTrue(
+                delay / 2.0 <= policy.get_delay(retries) <= delay
+            )
+
+    def test_from_client_config(self):
+        policy = RetryPolicy.from_client_config({
+            'max_retries': 0,
+            'retry_max_delay': 5
+        })
+        self.assertEqual(policy.max_retries, 0)
+        self.assertEqual(policy.max_delay, 5)
+        self.assertEqual(policy.initial_delay, 1)
@@ -0,0 +1,162 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+
+# Standard Imports
+import os
+import stat
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.persistent_cache import (
+    PersistentCache,
+    get_persistent_cache,
+    get_persistent_cache_path,
+    clear_persistent_caches
+)
+
+
+class PersistentCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(PersistentCacheTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'cache', 'cache.sqlite')
+        self.cache = PersistentCache(self.path)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('manager-1', 'foo'))
+        self.assertTrue(self.cache.set('manager-1', 'foo', {'bar': [1]}, 60))
+        self.assertEqual(self.cache.get('manager-1', 'foo'), {'bar': [1]})
+        self.assertIsNone(self.cache.get('manager-2', 'foo'))
+        # Another process that use the same file
+        self.assertEqual(
+            PersistentCache(self.path).get('manager-1', 'foo'), {'bar': [1]}
+        )
+        self.cache.delete('manager-1', 'foo')
+        self.assertIsNone(self.cache.get('manager-1', 'foo'))
+
+    @mock.patch('nsx_t_sdk.persistent_cache.time.time', return_value=100)
+    def test_ttl(self, time_mock):
+        self.cache.set('manager-1', 'foo', 'bar', 10)
+        time_mock.return_value = 109
+        self.assertEqual(self.cache.get('manager-1', 'foo'), 'bar')
+        time_mock.return_value = 110
+        self.assertIsNone(self.cache.get('manager-1', 'foo'))
+
+    def test_clear(self):
+        self.cache.set('manager-1', 'foo', 'bar', 60)
+        self.cache.set('manager-2', 'foo', 'bar', 60)
+        self.cache.clear('manager-1')
+        self.assertIsNone(self.cache.get('manager-1', 'foo'))
+        self.assertEqual(self.cache.get('manager-2', 'foo'), 'bar')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('manager-2', 'foo'))
+
+    @mock.patch('nsx_t_sdk.persistent_cache.time.time', return_value=100)
+    def test_evict_least_recently_used(self, time_mock):
+        # Room for 3 values of 1KB
+        cache = PersistentCache(self.path, max_size=3.5 / 1024)
+        value = 'x' * 1022
+        for key in ('a', 'b', 'c'):
+            time_mock.return_value += 1
+            self.assertTrue(cache.set('manager-1', key, value, 60))
+        time_mock.return_value += 1
+        cache.get('manager-1', 'a')
+        time_mock.return_value += 1
+        cache.set('manager-1', 'd', value, 60)
+        self.assertIsNone(cache.get('manager-1', 'b'))
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(cache.get('manager-1', key), value)
+        # Values larger than the cache are not stored
+        self.assertFalse(cache.set('manager-1', 'e', value * 4, 60))
+
+    def test_concurrent_readers_and_writers(self):
+        self.cache.set('manager-1', 'foo', 0, 60)
+        errors = []
+
+        def _run(index):
+            # Each thread stand for another process with its own connection
+            cache = PersistentCache(self.path)
+            for value in range(20):
+                if not cache.set('manager-1', str(index), value, 60):
+                    errors.append(index)
+                if cache.get('manager-1', 'foo') != 0:
+                    errors.append(index)
+        threads = [
+            threading.Thread(target=_run, args=(index,)) for index in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        for index in range(8):
+            self.assertEqual(self.cache.get('manager-1', str(index)), 19)
+
+    def test_errors_are_cache_misses(self):
+        with open(os.path.join(self.tmp_dir, 'file'), 'w'):
+            pass
+        # The parent directory of the cache file is a file
+        cache = PersistentCache(
+            os.path.join(self.tmp_dir, 'file', 'cache.sqlite')
+        )
+        self.assertFalse(cache.set('manager-1', 'foo', 'bar', 60))
+        self.assertIsNone(cache.get('manager-1', 'foo'))
+
+    def test_private_file(self):
+        self.assertTrue(self.cache.set('manager-1', 'foo', 'bar', 60))
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_file_of_other_user_is_not_used(self):
+        self.assertTrue(self.cache.set('manager-1', 'foo', 'bar', 60))
+        with mock.patch('nsx_t_sdk.files.os.getuid',
+                        return_value=os.getuid() + 1):
+            cache = PersistentCache(self.path)
+            self.assertIsNone(cache.get('manager-1', 'foo'))
+            self.assertFalse(cache.set('manager-1', 'foo', 'baz', 60))
+        self.assertEqual(self.cache.get('manager-1', 'foo'), 'bar')
+
+    def test_get_persistent_cache(self):
+        clear_persistent_caches()
+        self.addCleanup(clear_persistent_caches)
+        with mock.patch.dict(os.environ, {'AGENT_WORK_DIR': self.tmp_dir}):
+            self.assertEqual(
+                get_persistent_cache_path(),
+                os.path.join(self.tmp_dir, 'nsx-t-cache.sqlite')
+            )
+            cache = get_persistent_cache()
+        self.assertEqual(
+            cache.path, os.path.join(self.tmp_dir, 'nsx-t-cache.sqlite')
+        )
+        self.assertEqual(cache.max_size, 64)
+        self.assertIs(get_persistent_cache(cache.path, 32), cache)
+        self.assertEqual(cache.max_size, 32)
+
+    @mock.patch('nsx_t_sdk.files.os.getuid', return_value=1000)
+    @mock.patch('nsx_t_sdk.files.tempfile.gettempdir', return_value='/tmp')
+    def test_get_persistent_cache_path_outside_agent(self, *_):
+        with mock.patch.dict(os.environ, {'AGENT_WORK_DIR': ''}):
+            self.assertEqual(
+                get_persistent_cache_path(),
+                '/tmp/nsx-t-1000/nsx-t-cache.sqlite'
+            )
@@ -0,0 +1,172 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import gc
+import threading
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.pool import ClientPool, PooledConnection
+
+
+class ClientPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ClientPoolTestCase, self).setUp()
+        self.pool = ClientPool(max_size=2, idle_timeout=60)
+
+    @staticmethod
+    def _connection_factory():
+        return PooledConnection(
+            mock.MagicMock(), mock.MagicMock(), mock.MagicMock()
+        )
+
+    def test_acquire_reuse_connection(self):
+        factory = mock.MagicMock(side_effect=self._connection_factory)
+        first = self.pool.acquire('foo', factory)
+        second = self.pool.acquire('foo', factory)
+        self.assertIs(first, second)
+        self.assertEqual(factory.call_count, 1)
+
+    def test_acquire_evict_least_recently_used(self):
+        foo = self.pool.acquire('foo', self._connection_factory)
+        self.pool.acquire('bar', self._connection_factory)
+        self.pool.acquire('foo', self._connection_factory)
+        self.pool.acquire('baz', self._connection_factory)
+        self.assertIn('foo', self.pool)
+        self.assertIn('baz', self.pool)
+        self.assertNotIn('bar', self.pool)
+        self.assertFalse(foo.session.close.called)
+
+    @mock.patch('nsx_t_sdk.pool.time.time')
+    def test_acquire_evict_idle_connection(self, time_mock):
+        time_mock.return_value = 100
+        foo = self.pool.acquire('foo', self._connection_factory)
+        foo.last_used = 100
+        time_mock.return_value = 200
+        self.pool.acquire('bar', self._connection_factory)
+        self.assertNotIn('foo', self.pool)
+        self.assertTrue(foo.session.close.called)
+
+    def test_acquire_does_not_evict_used_connection(self):
+        class User(object):
+            pass
+        user = User()
+        foo = self.pool.acquire('foo', self._connection_factory, user=user)
+        self.pool.acquire('bar', self._connection_factory)
+        self.pool.acquire('baz', self._connection_factory)
+        self.assertIn('foo', self.pool)
+        self.assertNotIn('bar', self.pool)
+        self.pool.acquire('qux', self._connection_factory)
+        self.assertIn('foo', self.pool)
+        self.assertNotIn('baz', self.pool)
+        self.assertFalse(foo.session.close.called)
+        # The connection is evicted once its user is garbage collected
+        del user
+        gc.collect()
+        self.assertFalse(foo.in_use)
+        self.pool.acquire('bar', self._connection_factory)
+        self.assertNotIn('foo', self.pool)
+        self.assertTrue(foo.session.close.called)
+
+    @mock.patch('nsx_t_sdk.pool.time.time')
+    def test_acquire_does_not_evict_used_idle_connection(self, time_mock):
+        time_mock.return_value = 100
+        user = mock.MagicMock()
+        foo = self.pool.acquire('foo', self._connection_factory, user=user)
+        time_mock.return_value = 200
+        self.pool.acquire('bar', self._connection_factory)
+        self.assertIn('foo', self.pool)
+        self.assertFalse(foo.session.close.called)
+
+    def test_acquire_create_connection_outside_of_lock(self):
+        creating = threading.Event()
+        created = threading.Event()
+        factory_calls = []
+
+        def _slow_factory():
+            factory_calls.append(1)
+            creating.set()
+            created.wait(5)
+            return self._connection_factory()
+
+        connections = []
+        threads = [
+            threading.Thread(
+                target=lambda: connections.append(
+                    self.pool.acquire('foo', _slow_factory)
+                )
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        creating.wait(5)
+        # Other connections can be acquired while the first one is created
+        self.pool.acquire('bar', self._connection_factory)
+        self.assertIn('bar', self.pool)
+        created.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(factory_calls), 1)
+        self.assertIs(connections[0], connections[1])
+        self.assertEqual(self.pool._key_locks, {})
+
+    def test_acquire_does_not_keep_key_locks(self):
+        for key in range(5):
+            self.pool.acquire(key, self._connection_factory)
+        with self.assertRaises(ValueError):
+            self.pool.acquire('foo', mock.MagicMock(side_effect=ValueError))
+        self.assertEqual(self.pool._key_locks, {})
+        self.pool.clear()
+        self.assertEqual(self.pool._key_locks, {})
+
+    def test_acquire_keep_connection_created_meanwhile(self):
+        foo = self._connection_factory()
+
+        def _factory():
+            # Another thread created the connection without the key lock
+            self.pool._connections['foo'] = foo
+            return self._connection_factory()
+        self.assertIs(self.pool.acquire('foo', _factory), foo)
+        self.assertEqual(len(self.pool), 1)
+        self.assertFalse(foo.session.close.called)
+
+    def test_evict_connection(self):
+        foo = self.pool.acquire('foo', self._connection_factory)
+        self.pool.evict('foo')
+        self.assertNotIn('foo', self.pool)
+        self.assertTrue(foo.session.close.called)
+
+    def test_clear_connections(self):
+        foo = self.pool.acquire('foo', self._connection_factory)
+        bar = self.pool.acquire('bar', self._connection_factory)
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
+        self.assertTrue(foo.session.close.called)
+        self.assertTrue(bar.session.close.called)
+
+    def test_connection_stubs_are_built_once(self):
+        connection = self._connection_factory()
+        factory = mock.MagicMock(side_effect=[object(), object()])
+        first = connection.get_stub(('nsx_infra', 'Segments'), factory)
+        second = connection.get_stub(('nsx_infra', 'Segments'), factory)
+        other = connection.get_stub(('nsx_infra', 'Tier1s'), factory)
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(factory.call_count, 2)
@@ -0,0 +1,174 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk import metrics
+from nsx_t_sdk.common import NSXTResource
+from nsx_t_sdk.ratelimit import (
+    TokenBucket,
+    SharedTokenBucket,
+    get_rate_limiter,
+    get_shared_bucket_path,
+    clear_rate_limiters
+)
+
+
+@mock.patch('nsx_t_sdk.ratelimit.time.sleep')
+@mock.patch('nsx_t_sdk.ratelimit.time.time', return_value=100)
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_acquire_burst_then_wait(self, time_mock, sleep_mock):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+
+        def _sleep(seconds):
+            time_mock.return_value += seconds
+        sleep_mock.side_effect = _sleep
+        self.assertAlmostEqual(bucket.acquire(), 0.1)
+        sleep_mock.assert_called_once()
+
+    def test_refill_up_to_burst(self, time_mock, _):
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        time_mock.return_value = 200
+        for _ in range(2):
+            self.assertEqual(bucket.acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+    def test_shared_bucket(self, time_mock, _):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'bucket')
+        # Each bucket stands for another process that use the same file
+        first = SharedTokenBucket(rate=10, burst=2, path=path)
+        second = SharedTokenBucket(rate=10, burst=2, path=path)
+        self.assertEqual(first.try_acquire(), 0)
+        self.assertEqual(second.try_acquire(), 0)
+        self.assertAlmostEqual(first.try_acquire(), 0.1)
+        self.assertAlmostEqual(second.try_acquire(), 0.1)
+        time_mock.return_value += 0.1
+        self.assertEqual(second.try_acquire(), 0)
+
+    def test_shared_bucket_with_corrupted_file(self, *_):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, 'bucket')
+        with open(path, 'w') as bucket_file:
+            bucket_file.write('foo')
+        bucket = SharedTokenBucket(rate=10, burst=1, path=path)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+    def test_shared_bucket_with_symlink(self, *_):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        target = os.path.join(tmp_dir, 'target')
+        with open(target, 'w') as target_file:
+            target_file.write('foo')
+        path = os.path.join(tmp_dir, 'bucket')
+        os.symlink(target, path)
+        bucket = SharedTokenBucket(rate=10, burst=1, path=path)
+        # The requests are still limited by the bucket of the process
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+        with open(target) as target_file:
+            self.assertEqual(target_file.read(), 'foo')
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        super(RateLimiterTestCase, self).setUp()
+        clear_rate_limiters()
+        self.addCleanup(clear_rate_limiters)
+
+    def test_rate_is_respected_by_threads(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        start = time.time()
+        threads = [
+            threading.Thread(target=lambda: [bucket.acquire()
+                                             for _ in range(5)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 requests with burst of 1 at 100 requests per second
+        self.assertGreaterEqual(time.time() - start, 0.18)
+
+    def test_get_rate_limiter(self):
+        self.assertIsNone(get_rate_limiter(('foo', 443), None))
+        limiter = get_rate_limiter(('foo', 443), 50)
+        self.assertIs(get_rate_limiter(('foo', 443), 50), limiter)
+        self.assertIsNot(get_rate_limiter(('bar', 443), 50), limiter)
+        updated = get_rate_limiter(('foo', 443), 50, burst=10)
+        self.assertIsNot(updated, limiter)
+        self.assertEqual(updated.burst, 10)
+
+    @mock.patch('nsx_t_sdk.ratelimit.get_shared_bucket_path')
+    def test_get_shared_rate_limiter(self, path_mock):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path_mock.return_value = os.path.join(tmp_dir, 'bucket')
+        limiter = get_rate_limiter(('foo', 443), 50, shared=True)
+        self.assertIsInstance(limiter, SharedTokenBucket)
+        with mock.patch('nsx_t_sdk.ratelimit.fcntl', None):
+            limiter = get_rate_limiter(('foo', 443), 50, shared=True)
+        self.assertNotIsInstance(limiter, SharedTokenBucket)
+
+    @mock.patch.dict(os.environ, {'AGENT_WORK_DIR': '/opt/agent/work'})
+    def test_get_shared_bucket_path(self):
+        self.assertEqual(
+            get_shared_bucket_path(('foo/bar', 443)),
+            '/opt/agent/work/nsx-t-rate-limit-foo_bar_443'
+        )
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._prepare_nsx_t_client')
+    def test_invoke_with_rate_limit(self, _):
+        resource = NSXTResource(
+            client_config={
+                'host': 'foo',
+                'port': 443,
+                'auth_type': 'basic',
+                'rate_limit': 100
+            },
+            resource_config={'id': 'foo'},
+            logger=mock.MagicMock()
+        )
+        resource.resource_type = 'Segment'
+        resource.service_name = 'segments'
+        resource._api_client = mock.MagicMock()
+        with mock.patch.object(TokenBucket, 'acquire',
+                               return_value=0.5) as acquire_mock:
+            with metrics.collect() as collector:
+                resource._invoke('get', ('foo',))
+        acquire_mock.assert_called_once_with()
+        self.assertEqual(
+            collector.summary()['Segment.get']['rate_limit_delay'], 0.5
+        )
@@ -0,0 +1,51 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import json
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.registry import LazyModuleRegistry
+from nsx_t_sdk.common import NSX_CLIENT_MODULES
+
+
+class LazyModuleRegistryTestCase(unittest.TestCase):
+
+    def test_import_on_first_lookup(self):
+        registry = LazyModuleRegistry({'json': 'json'})
+        self.assertFalse(registry.is_loaded('json'))
+        with mock.patch('importlib.import_module',
+                        return_value=json) as import_mock:
+            self.assertIs(registry['json'], json)
+            self.assertIs(registry['json'], json)
+        import_mock.assert_called_once_with('json')
+        self.assertTrue(registry.is_loaded('json'))
+
+    def test_mapping(self):
+        registry = LazyModuleRegistry({'json': 'json', 'foo': 'foo.bar'})
+        self.assertEqual(sorted(registry), ['foo', 'json'])
+        self.assertEqual(len(registry), 2)
+        self.assertIn('foo', registry)
+        self.assertIsNone(registry.get('invalid'))
+        # Nothing is imported by iterating over the names
+        self.assertFalse(registry.is_loaded('foo'))
+
+    def test_nsx_client_modules(self):
+        for name in NSX_CLIENT_MODULES:
+            self.assertTrue(hasattr(NSX_CLIENT_MODULES[name], 'StubFactory'))
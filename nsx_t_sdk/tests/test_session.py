@@ -0,0 +1,72 @@
+########
+# Copyright (c) 2020 Cloudify Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+# Standard Imports
+import unittest
+
+# Third parties imports
+import mock
+
+# Local imports
+from nsx_t_sdk.session import SessionToken, SessionTokenCache
+
+
+class SessionTokenCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        super(SessionTokenCacheTestCase, self).setUp()
+        self.cache = SessionTokenCache()
+
+    @staticmethod
+    def _login():
+        return SessionToken('foo-cookie', 'foo-token', timeout=600)
+
+    def test_session_token_headers(self):
+        self.assertEqual(
+            self._login().headers,
+            {'Cookie': 'foo-cookie', 'X-XSRF-TOKEN': 'foo-token'}
+        )
+
+    @mock.patch('nsx_t_sdk.session.time.time')
+    def test_session_token_is_expiring(self, time_mock):
+        time_mock.return_value = 1000
+        token = self._login()
+        self.assertFalse(token.is_expiring())
+        time_mock.return_value = 1550
+        self.assertTrue(token.is_expiring())
+        token.touch()
+        self.assertFalse(token.is_expiring())
+
+    def test_refresh_reuse_valid_token(self):
+        login = mock.MagicMock(side_effect=self._login)
+        first = self.cache.refresh('foo', login)
+        second = self.cache.refresh('foo', login)
+        self.assertIs(first, second)
+        self.assertEqual(login.call_count, 1)
+
+    def test_refresh_stale_token(self):
+        login = mock.MagicMock(side_effect=self._login)
+        first = self.cache.refresh('foo', login)
+        second = self.cache.refresh('foo', login, stale_token=first)
+        self.assertIsNot(first, second)
+        # Another caller holding the old token should not login again
+        third = self.cache.refresh('foo', login, stale_token=first)
+        self.assertIs(second, third)
+        self.assertEqual(login.call_count, 2)
+
+    def test_invalidate_token(self):
+        token = self.cache.refresh('foo', self._login)
+        self.assertIs(self.cache.invalidate('foo'), token)
+        self.assertNotIn('foo', self.cache)
+        self.assertIsNone(self.cache.invalidate('foo'))
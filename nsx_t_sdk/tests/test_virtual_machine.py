@@ -16,13 +16,18 @@
 # Third parties imports
 import mock
 
+from com.vmware.nsx_policy.model_client import (
+    VirtualMachine as vmVirtualMachine,
+    VirtualMachineListResult
+)
+
 # Local imports
 from nsx_t_sdk.tests.test_nsx_t_sdk import NSXTSDKTestCase
 from nsx_t_sdk.resources import (
     VirtualNetworkInterface,
     VirtualMachine
 )
-from nsx_t_sdk.exceptions import MethodNotAllowed
+from nsx_t_sdk.exceptions import MethodNotAllowed, NSXTSDKException
 from nsx_t_sdk.common import (
     ACTION_DELETE,
     ACTION_LIST
@@ -95,6 +100,9 @@ class VirtualMachineTestCase(NSXTSDKTestCase):
 
     @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
     def test_get_virtual_machine(self, invoke_mock):
+        invoke_mock.return_value = VirtualMachineListResult(results=[
+            vmVirtualMachine(display_name='test_vm', external_id='test_vm_id')
+        ])
         self.virtual_machine.get(
             args=(self.virtual_machine.resource_config['vm_name'],)
         )
@@ -109,6 +117,32 @@ class VirtualMachineTestCase(NSXTSDKTestCase):
 
         }
         invoke_mock.assert_called_with(ACTION_LIST, kwargs=filters)
+        self.assertEqual(self.virtual_machine.resource_id, 'test_vm_id')
+
+    @mock.patch('nsx_t_sdk.common.NSXTResource._invoke')
+    def test_get_virtual_machine_from_next_page(self, invoke_mock):
+        invoke_mock.side_effect = [
+            VirtualMachineListResult(
+                results=[
+                    vmVirtualMachine(
+                        display_name='test_vm',
+                        external_id='test_vm_id'
+                    )
+                ],
+                cursor='0001'
+            ),
+            VirtualMachineListResult(
+                results=[
+                    vmVirtualMachine(
+                        display_name='test_vm',
+                        external_id='test_vm_id'
+                    )
+                ]
+            )
+        ]
+        with self.assertRaises(NSXTSDKException):
+            self.virtual_machine.get()
+        self.assertEqual(invoke_mock.call_count, 2)
 
 
 class VirtualNetworkInterfaceTestCase(NSXTSDKTestCase):